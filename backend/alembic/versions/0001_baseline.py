@@ -0,0 +1,311 @@
+"""baseline schema
+
+Schéma tel que créé jusqu'ici par Base.metadata.create_all + migrate_sqlite_schema.
+Idempotent: sur une base existante (créée par create_all), les tables et index déjà
+présents sont conservés et seule la colonne users.phone est ajoutée si elle manque.
+En mode --sql (sans connexion, donc sans inspection), le script émet des
+CREATE TABLE / CREATE INDEX IF NOT EXISTS et, sur PostgreSQL, des CREATE TYPE et
+ADD COLUMN IF NOT EXISTS gardés.
+
+Revision ID: 0001_baseline
+Revises: 
+Create Date: 2026-10-19 04:29:19.978522
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+from alembic.operations.schemaobj import SchemaObjects
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_baseline'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _create_enum_types_offline(table) -> None:
+    # CREATE TYPE n'a pas de IF NOT EXISTS: bloc qui ignore un type déjà présent
+    for column in table.columns:
+        if isinstance(column.type, sa.Enum) and column.type.name:
+            labels = ", ".join("'{}'".format(label.replace("'", "''")) for label in column.type.enums)
+            op.execute(
+                f"DO $$ BEGIN CREATE TYPE {column.type.name} AS ENUM ({labels}); "
+                f"EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+            )
+
+
+def _create_table(name, *columns):
+    if context.is_offline_mode():
+        # Comme op.create_table: tables référencées par les clés étrangères créées en stub
+        table = SchemaObjects(op.get_context()).table(name, *columns)
+        if _is_postgresql():
+            _create_enum_types_offline(table)
+        op.execute(sa.schema.CreateTable(table, if_not_exists=True))
+    elif not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def _create_index(name, table, columns, unique=False):
+    op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def upgrade() -> None:
+    _create_table('access_requests',
+    sa.Column('full_name', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('license_number', sa.String(), nullable=False),
+    sa.Column('specialty', sa.String(), nullable=False),
+    sa.Column('hospital_clinic', sa.String(), nullable=False),
+    sa.Column('experience_years', sa.String(), nullable=False),
+    sa.Column('password', sa.String(), nullable=False),
+    sa.Column('motivation', sa.Text(), nullable=False),
+    sa.Column('additional_info', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('reviewed_by', sa.String(), nullable=True),
+    sa.Column('reviewed_at', sa.DateTime(), nullable=True),
+    sa.Column('admin_notes', sa.Text(), nullable=True),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_access_requests_id', 'access_requests', ['id'], unique=False)
+
+    _create_table('admin_stat_counters',
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_admin_stat_counters_id', 'admin_stat_counters', ['id'], unique=False)
+
+    _create_table('healthcare_centers',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('address', sa.String(), nullable=False),
+    sa.Column('city', sa.String(), nullable=False),
+    sa.Column('department', sa.String(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('website', sa.String(), nullable=True),
+    sa.Column('services', sa.JSON(), nullable=True),
+    sa.Column('equipment', sa.JSON(), nullable=True),
+    sa.Column('specialties', sa.JSON(), nullable=True),
+    sa.Column('operating_hours', sa.JSON(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('languages_spoken', sa.JSON(), nullable=True),
+    sa.Column('rating', sa.Float(), nullable=True),
+    sa.Column('total_reviews', sa.Integer(), nullable=True),
+    sa.Column('is_available', sa.Boolean(), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('accepts_appointments', sa.Boolean(), nullable=True),
+    sa.Column('max_appointments_per_day', sa.Integer(), nullable=True),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_healthcare_centers_id', 'healthcare_centers', ['id'], unique=False)
+    _create_index('ix_healthcare_centers_name', 'healthcare_centers', ['name'], unique=False)
+
+    _create_table('professionals',
+    sa.Column('full_name', sa.String(), nullable=False),
+    sa.Column('specialty', sa.String(), nullable=False),
+    sa.Column('license_number', sa.String(), nullable=False),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('address', sa.String(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('consultation_fee', sa.Float(), nullable=True),
+    sa.Column('languages', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('license_number')
+    )
+    _create_index('ix_professionals_id', 'professionals', ['id'], unique=False)
+
+    _create_table('shadow_evaluations',
+    sa.Column('analysis_id', sa.String(), nullable=False),
+    sa.Column('image_index', sa.Integer(), nullable=False),
+    sa.Column('production_version', sa.String(), nullable=False),
+    sa.Column('candidate_version', sa.String(), nullable=False),
+    sa.Column('production_bi_rads', sa.String(), nullable=True),
+    sa.Column('production_bi_rads_confidence', sa.Float(), nullable=True),
+    sa.Column('candidate_bi_rads', sa.String(), nullable=True),
+    sa.Column('candidate_bi_rads_confidence', sa.Float(), nullable=True),
+    sa.Column('bi_rads_agreement', sa.Boolean(), nullable=True),
+    sa.Column('bi_rads_confidence_delta', sa.Float(), nullable=True),
+    sa.Column('production_density', sa.String(), nullable=True),
+    sa.Column('production_density_confidence', sa.Float(), nullable=True),
+    sa.Column('candidate_density', sa.String(), nullable=True),
+    sa.Column('candidate_density_confidence', sa.Float(), nullable=True),
+    sa.Column('density_agreement', sa.Boolean(), nullable=True),
+    sa.Column('density_confidence_delta', sa.Float(), nullable=True),
+    sa.Column('candidate_latency_ms', sa.Float(), nullable=True),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_shadow_evaluations_analysis_id', 'shadow_evaluations', ['analysis_id'], unique=False)
+    _create_index('ix_shadow_evaluations_candidate_version', 'shadow_evaluations', ['candidate_version'], unique=False)
+    _create_index('ix_shadow_evaluations_id', 'shadow_evaluations', ['id'], unique=False)
+
+    _create_table('users',
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('phone', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('user_type', sa.String(), nullable=True),
+    sa.Column('professional_id', sa.String(), nullable=True),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_users_email', 'users', ['email'], unique=True)
+    _create_index('ix_users_id', 'users', ['id'], unique=False)
+
+    _create_table('appointments',
+    sa.Column('center_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=True),
+    sa.Column('patient_name', sa.String(), nullable=False),
+    sa.Column('patient_phone', sa.String(), nullable=False),
+    sa.Column('patient_email', sa.String(), nullable=True),
+    sa.Column('appointment_date', sa.DateTime(), nullable=False),
+    sa.Column('appointment_time', sa.String(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('confirmation_code', sa.String(), nullable=True),
+    sa.Column('cancelled_at', sa.DateTime(), nullable=True),
+    sa.Column('cancellation_reason', sa.Text(), nullable=True),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['center_id'], ['healthcare_centers.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_appointments_id', 'appointments', ['id'], unique=False)
+
+    _create_table('patients',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('patient_id', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=False),
+    sa.Column('date_of_birth', sa.Date(), nullable=True),
+    sa.Column('age', sa.Integer(), nullable=True),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('emergency_contact', sa.String(), nullable=True),
+    sa.Column('medical_history', sa.Text(), nullable=True),
+    sa.Column('family_history', sa.Text(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_patients_id', 'patients', ['id'], unique=False)
+    _create_index('ix_patients_patient_id', 'patients', ['patient_id'], unique=True)
+
+    _create_table('risk_assessments',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('assessment_id', sa.String(), nullable=False),
+    sa.Column('risk_5_years', sa.Float(), nullable=False, comment='Risk percentage for 5 years'),
+    sa.Column('risk_lifetime', sa.Float(), nullable=True, comment='Lifetime risk percentage'),
+    sa.Column('risk_level', sa.Enum('LOW', 'MODERATE', 'HIGH', 'VERY_HIGH', name='risklevel'), nullable=False),
+    sa.Column('risk_category', sa.String(), nullable=False),
+    sa.Column('input_data', sa.JSON(), nullable=False, comment='Original risk factors used in calculation'),
+    sa.Column('risk_relative', sa.Float(), nullable=True, comment='Risk relative to average'),
+    sa.Column('average_risk_for_age', sa.Float(), nullable=True, comment='Average risk for same age group'),
+    sa.Column('clinical_significance', sa.String(), nullable=True),
+    sa.Column('significance_explanation', sa.Text(), nullable=True),
+    sa.Column('recommendations', sa.JSON(), nullable=True, comment='List of recommendations'),
+    sa.Column('educational_message', sa.JSON(), nullable=True, comment='List of educational messages'),
+    sa.Column('critical_warnings', sa.JSON(), nullable=True, comment='List of critical warnings'),
+    sa.Column('lifestyle_insights', sa.JSON(), nullable=True, comment='Lifestyle factor insights'),
+    sa.Column('model_used', sa.String(), nullable=True),
+    sa.Column('estimated_accuracy', sa.String(), nullable=True),
+    sa.Column('disclaimer', sa.Text(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_risk_assessments_assessment_id', 'risk_assessments', ['assessment_id'], unique=True)
+    _create_index('ix_risk_assessments_id', 'risk_assessments', ['id'], unique=False)
+    _create_index('ix_risk_assessments_user_id', 'risk_assessments', ['user_id'], unique=False)
+
+    _create_table('mammography_analyses',
+    sa.Column('patient_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('analysis_id', sa.String(), nullable=False),
+    sa.Column('bi_rads_category', sa.Enum('CATEGORY_1', 'CATEGORY_2', 'CATEGORY_3', 'CATEGORY_4', 'CATEGORY_5', name='bi_rads_category'), nullable=True),
+    sa.Column('confidence_score', sa.Float(), nullable=True),
+    sa.Column('breast_density', sa.String(), nullable=True),
+    sa.Column('model_version', sa.String(), nullable=True),
+    sa.Column('processing_time', sa.Float(), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'PROCESSING', 'COMPLETED', 'VALIDATED', 'FAILED', name='analysisstatus'), nullable=True),
+    sa.Column('original_files', sa.JSON(), nullable=True),
+    sa.Column('processed_images', sa.JSON(), nullable=True),
+    sa.Column('annotations', sa.JSON(), nullable=True),
+    sa.Column('findings', sa.Text(), nullable=True),
+    sa.Column('recommendations', sa.Text(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_mammography_analyses_analysis_id', 'mammography_analyses', ['analysis_id'], unique=True)
+    _create_index('ix_mammography_analyses_id', 'mammography_analyses', ['id'], unique=False)
+
+    # Ancienne migration ad hoc (migrate_sqlite_schema): bases créées avant users.phone
+    if context.is_offline_mode():
+        # SQLite n'a pas de ADD COLUMN IF NOT EXISTS: le script --sql y vise une base vide
+        if _is_postgresql():
+            op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS phone VARCHAR")
+        return
+    user_columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")}
+    if "phone" not in user_columns:
+        op.add_column("users", sa.Column("phone", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_table('mammography_analyses')
+    op.drop_table('risk_assessments')
+    op.drop_table('patients')
+    op.drop_table('appointments')
+    op.drop_table('users')
+    op.drop_table('shadow_evaluations')
+    op.drop_table('professionals')
+    op.drop_table('healthcare_centers')
+    op.drop_table('admin_stat_counters')
+    op.drop_table('access_requests')
+    if _is_postgresql():
+        for enum_name in ("analysisstatus", "bi_rads_category", "risklevel"):
+            op.execute(f"DROP TYPE IF EXISTS {enum_name}")
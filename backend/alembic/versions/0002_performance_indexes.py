@@ -0,0 +1,62 @@
+"""performance indexes
+
+Index des colonnes filtrées/triées par les requêtes chaudes:
+- analyses d'un professionnel / d'une patiente, les plus récentes d'abord
+  (tableau de bord, rapports, /real-patients, historique),
+- fenêtres de dates, statut et BI-RADS (statistiques admin, exports),
+- rendez-vous d'un centre par date, patients d'un utilisateur.
+
+Sur PostgreSQL les index sont construits en CONCURRENTLY (hors transaction) pour ne
+pas bloquer les écritures pendant la construction.
+
+Revision ID: 0002_performance_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-19 04:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_performance_indexes'
+down_revision: Union[str, None] = '0001_baseline'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_mammography_analyses_user_id_created_at', 'mammography_analyses', ['user_id', sa.text('created_at DESC')]),
+    ('ix_mammography_analyses_patient_id_created_at', 'mammography_analyses', ['patient_id', sa.text('created_at DESC')]),
+    ('ix_mammography_analyses_created_at', 'mammography_analyses', ['created_at']),
+    ('ix_mammography_analyses_status', 'mammography_analyses', ['status']),
+    ('ix_mammography_analyses_bi_rads_category', 'mammography_analyses', ['bi_rads_category']),
+    ('ix_appointments_center_id_appointment_date', 'appointments', ['center_id', 'appointment_date']),
+    ('ix_patients_user_id', 'patients', ['user_id']),
+]
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    if _is_postgresql():
+        # CREATE INDEX CONCURRENTLY est interdit dans une transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,105 @@
+"""report codes
+
+Code de rapport persistant et indexé (unique) sur mammography_analyses, à la place
+de la recherche MammographyAnalysis.id LIKE '%suffixe' (parcours complet de table,
+ambigu quand deux ids partagent le même suffixe).
+
+Les analyses existantes reçoivent le code déjà affiché jusqu'ici (R-AAAA-<4 derniers
+caractères de l'id>), allongé d'un caractère à la fois en cas de collision; les
+nouvelles analyses reçoivent un suffixe de 12 caractères (MammographyAnalysis.report_code).
+En mode --sql (sans connexion, donc sans lecture des collisions), le code des analyses
+existantes reprend l'id complet: R-AAAA-<id>.
+
+Revision ID: 0003_report_codes
+Revises: 0002_performance_indexes
+Create Date: 2026-10-19 05:10:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_report_codes'
+down_revision: Union[str, None] = '0002_performance_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LEGACY_SUFFIX_LENGTH = 4
+BATCH_SIZE = 1000
+
+analyses = sa.table(
+    'mammography_analyses',
+    sa.column('id', sa.String),
+    sa.column('created_at', sa.DateTime),
+    sa.column('report_code', sa.String),
+)
+
+
+def _backfill_report_codes() -> None:
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(analyses.c.id, analyses.c.created_at)
+        .where(analyses.c.report_code.is_(None))
+        .order_by(analyses.c.created_at, analyses.c.id)
+    ).all()
+    taken = set(bind.execute(
+        sa.select(analyses.c.report_code).where(analyses.c.report_code.isnot(None))
+    ).scalars())
+
+    updates = []
+    for analysis_pk, created_at in rows:
+        year = (created_at or datetime.now()).year
+        length = LEGACY_SUFFIX_LENGTH
+        code = f"R-{year}-{analysis_pk[-length:]}"
+        while code in taken and length < len(analysis_pk):
+            length += 1
+            code = f"R-{year}-{analysis_pk[-length:]}"
+        if code in taken:
+            code = f"R-{year}-{analysis_pk}-{len(taken)}"
+        taken.add(code)
+        updates.append({"pk": analysis_pk, "code": code})
+
+    statement = (
+        sa.update(analyses)
+        .where(analyses.c.id == sa.bindparam("pk"))
+        .values(report_code=sa.bindparam("code"))
+    )
+    for start in range(0, len(updates), BATCH_SIZE):
+        bind.execute(statement, updates[start:start + BATCH_SIZE])
+
+
+def _backfill_report_codes_offline() -> None:
+    # Un UPDATE ensembliste: l'id complet est unique, aucune collision possible
+    year = sa.cast(
+        sa.cast(sa.extract('year', sa.func.coalesce(analyses.c.created_at, sa.func.current_timestamp())), sa.Integer),
+        sa.String
+    )
+    op.execute(
+        sa.update(analyses)
+        .where(analyses.c.report_code.is_(None))
+        .values(report_code=sa.literal('R-') + year + sa.literal('-') + analyses.c.id)
+    )
+
+
+def upgrade() -> None:
+    op.add_column('mammography_analyses', sa.Column('report_code', sa.String(), nullable=True))
+    if context.is_offline_mode():
+        _backfill_report_codes_offline()
+    else:
+        _backfill_report_codes()
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index('ix_mammography_analyses_report_code', 'mammography_analyses', ['report_code'],
+                            unique=True, postgresql_concurrently=True)
+    else:
+        op.create_index('ix_mammography_analyses_report_code', 'mammography_analyses', ['report_code'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_mammography_analyses_report_code', table_name='mammography_analyses')
+    with op.batch_alter_table('mammography_analyses') as batch_op:
+        batch_op.drop_column('report_code')
@@ -0,0 +1,49 @@
+"""location indexes
+
+Index (latitude, longitude) des centres de santé et des professionnels: préfiltre par
+boîte englobante des recherches de proximité (app.services.spatial_search).
+
+Revision ID: 0004_location_indexes
+Revises: 0003_report_codes
+Create Date: 2026-10-19 05:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_location_indexes'
+down_revision: Union[str, None] = '0003_report_codes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_healthcare_centers_latitude_longitude', 'healthcare_centers', ['latitude', 'longitude']),
+    ('ix_professionals_latitude_longitude', 'professionals', ['latitude', 'longitude']),
+]
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
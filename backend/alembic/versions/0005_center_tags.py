@@ -0,0 +1,102 @@
+"""center tags
+
+Table healthcare_center_tags: services, équipements et spécialités des centres, une
+ligne par valeur, indexée par (kind, value). Remplace le filtre
+HealthcareCenter.services.contains([...]) sur la colonne JSON (comparaison de texte
+sur SQLite, sans index possible sur PostgreSQL). Remplie depuis les colonnes JSON
+existantes, qui restent la source des réponses de l'API. En mode --sql (sans
+connexion), le remplissage est un INSERT ... SELECT sur les éléments des tableaux JSON
+(PostgreSQL ou SQLite).
+
+Revision ID: 0005_center_tags
+Revises: 0004_location_indexes
+Create Date: 2026-10-19 06:10:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_center_tags'
+down_revision: Union[str, None] = '0004_location_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+TAG_COLUMNS = {
+    "service": "services",
+    "equipment": "equipment",
+    "specialty": "specialties",
+}
+
+centers = sa.table(
+    'healthcare_centers',
+    sa.column('id', sa.String),
+    *[sa.column(column, sa.JSON) for column in TAG_COLUMNS.values()],
+)
+
+
+def _tag_rows(center_id, kind, values) -> list:
+    # Même normalisation que app.models.healthcare_center.center_tag_rows
+    if isinstance(values, str):
+        try:
+            values = json.loads(values)
+        except ValueError:
+            values = [values]
+    if not isinstance(values, list):
+        return []
+    unique_values = dict.fromkeys(str(value) for value in values if value not in (None, ""))
+    return [{"center_id": center_id, "kind": kind, "value": value} for value in unique_values]
+
+
+def _backfill_tags_offline() -> None:
+    # Valeurs non vides de chaque tableau JSON, doublons ignorés (clé primaire)
+    for kind, column in TAG_COLUMNS.items():
+        if op.get_bind().dialect.name == "postgresql":
+            op.execute(
+                f"INSERT INTO healthcare_center_tags (center_id, kind, value) "
+                f"SELECT DISTINCT c.id, '{kind}', t.value "
+                f"FROM healthcare_centers c, json_array_elements_text(c.{column}) AS t(value) "
+                f"WHERE json_typeof(c.{column}) = 'array' AND t.value IS NOT NULL AND t.value <> '' "
+                f"ON CONFLICT DO NOTHING"
+            )
+        else:
+            op.execute(
+                f"INSERT OR IGNORE INTO healthcare_center_tags (center_id, kind, value) "
+                f"SELECT c.id, '{kind}', CAST(t.value AS TEXT) "
+                f"FROM healthcare_centers c, json_each(c.{column}) AS t "
+                f"WHERE json_valid(c.{column}) AND json_type(c.{column}) = 'array' "
+                f"AND t.value IS NOT NULL AND t.value <> ''"
+            )
+
+
+def upgrade() -> None:
+    tags = op.create_table(
+        'healthcare_center_tags',
+        sa.Column('center_id', sa.String(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('value', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['center_id'], ['healthcare_centers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('center_id', 'kind', 'value'),
+    )
+    op.create_index('ix_healthcare_center_tags_kind_value', 'healthcare_center_tags', ['kind', 'value'])
+
+    if context.is_offline_mode():
+        _backfill_tags_offline()
+        return
+
+    rows = []
+    for center in op.get_bind().execute(sa.select(centers)).mappings():
+        for kind, column in TAG_COLUMNS.items():
+            rows.extend(_tag_rows(center['id'], kind, center[column]))
+    for start in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(tags, rows[start:start + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_healthcare_center_tags_kind_value', table_name='healthcare_center_tags')
+    op.drop_table('healthcare_center_tags')
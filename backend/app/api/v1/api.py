@@ -2,7 +2,10 @@
 Main API router that includes all endpoint routers
 """
 
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.api.v1.endpoints import auth, mammography, patients, professionals, admin, access_requests
@@ -28,12 +31,21 @@ api_router.include_router(articles.router, prefix="/articles", tags=["articles"]
 # Endpoint pour récupérer les vraies données des patients depuis la DB
 @api_router.get("/real-patients")
 async def get_real_patients(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Endpoint pour récupérer les vraies données des patients de l'utilisateur connecté
     Utilise les analyses mammographiques comme source de vérité
+    
+    Une seule requête: dernière analyse, nombre d'analyses et dernier BI-RADS par patient
+    (fonctions de fenêtre), jointe à patients, triée par dernière visite.
+    Pagination optionnelle (skip/limit): sans limit, tous les patients sont renvoyés
+    (le frontend n'envoie pas encore de pagination). Le nombre total de patients est
+    renvoyé dans l'en-tête X-Total-Count.
     """
     from app.models.mammography import MammographyAnalysis
     from app.models.patient import Patient
@@ -41,64 +53,68 @@ async def get_real_patients(
     try:
         print(f"📊 /real-patients appelé pour utilisateur: {current_user.email} (id: {current_user.id})")
         
-        # Récupérer toutes les analyses mammographiques de l'utilisateur pour extraire les patients uniques
-        analyses = db.query(MammographyAnalysis).filter(
-            MammographyAnalysis.user_id == current_user.id
-        ).order_by(MammographyAnalysis.created_at.desc()).all()
+        # Une ligne par analyse, classée par patient (la plus récente en premier)
+        ranked = db.query(
+            MammographyAnalysis.patient_id.label("patient_id"),
+            MammographyAnalysis.created_at.label("last_analysis_at"),
+            MammographyAnalysis.bi_rads_category.label("bi_rads_category"),
+            func.row_number().over(
+                partition_by=MammographyAnalysis.patient_id,
+                order_by=(MammographyAnalysis.created_at.desc(), MammographyAnalysis.id.desc())
+            ).label("rank"),
+            func.count(MammographyAnalysis.id).over(partition_by=MammographyAnalysis.patient_id).label("analyses_count")
+        ).filter(
+            MammographyAnalysis.user_id == current_user.id,
+            MammographyAnalysis.patient_id.isnot(None)
+        ).subquery()
         
-        print(f"📊 {len(analyses)} analyses trouvées pour l'utilisateur {current_user.id}")
+        rows = db.query(
+            ranked.c.patient_id,
+            ranked.c.last_analysis_at,
+            ranked.c.bi_rads_category,
+            ranked.c.analyses_count,
+            func.count().over().label("total"),
+            Patient
+        ).outerjoin(
+            Patient, Patient.id == ranked.c.patient_id
+        ).filter(
+            ranked.c.rank == 1
+        ).order_by(
+            ranked.c.last_analysis_at.desc()
+        ).offset(skip).limit(limit).all()
         
-                # Extraire les patients uniques depuis les analyses
-        unique_patients = {}
-        for analysis in analyses:
-            patient_uuid = analysis.patient_id  # C'est l'UUID (id) du patient
-            if patient_uuid and patient_uuid not in unique_patients:
-                # Trouver la dernière analyse pour ce patient
-                last_analysis = max(
-                    [a for a in analyses if a.patient_id == patient_uuid],        
-                    key=lambda x: x.created_at
-                )
-
-                # Chercher les informations du patient dans la table patients
-                # analysis.patient_id contient l'UUID (Patient.id), pas le patient_id lisible
-                patient_record = db.query(Patient).filter(Patient.id == patient_uuid).first()
-                
-                # Déterminer le niveau de risque basé sur BI-RADS
-                bi_rads_str = str(last_analysis.bi_rads_category) if last_analysis.bi_rads_category else "BI-RADS 2"
-                if "CATEGORY_" in bi_rads_str:
-                    category_num = bi_rads_str.split("CATEGORY_")[1] if "CATEGORY_" in bi_rads_str else "2"
-                    bi_rads_str = f"BI-RADS {category_num}"
-                
-                category_num = int(bi_rads_str.split()[-1]) if bi_rads_str.split()[-1].isdigit() else 2
-                if category_num <= 2:
-                    risk_level = "low"
-                elif category_num == 3:
-                    risk_level = "medium"
-                else:
-                    risk_level = "high"
-                
-                                # Compter le nombre d'analyses pour ce patient
-                analyses_count = sum(1 for a in analyses if a.patient_id == patient_uuid)                                                                         
-
-                # Utiliser l'UUID comme id, mais aussi retourner le patient_id lisible si disponible
-                patient_readable_id = patient_record.patient_id if patient_record else patient_uuid
-
-                unique_patients[patient_uuid] = {
-                    "id": patient_uuid,  # UUID pour la compatibilité avec les liens
-                    "patient_id": patient_readable_id,  # ID lisible (P-2025-X)
-                    "name": patient_record.full_name if patient_record else f"Patient {patient_readable_id}",
-                    "age": patient_record.age if patient_record else None,
-                    "analyses": analyses_count,
-                    "lastVisit": last_analysis.created_at.strftime("%Y-%m-%d") if last_analysis.created_at else "2024-01-20",
-                    "risk": risk_level,
-                    "phone": patient_record.phone_number if patient_record else None,
-                    "email": None,  # Pas disponible dans la table patients
-                    "address": patient_record.address if patient_record else None,
-                    "professional_id": current_user.professional_id if current_user.professional_id else "unknown"
-                }
+        total = rows[0].total if rows else 0
+        response.headers["X-Total-Count"] = str(total)
+        
+        result = []
+        for patient_uuid, last_analysis_at, bi_rads, analyses_count, _, patient_record in rows:
+            # Déterminer le niveau de risque basé sur le dernier BI-RADS (BI-RADS 2 par défaut)
+            category_num = int(bi_rads.value) if bi_rads else 2
+            if category_num <= 2:
+                risk_level = "low"
+            elif category_num == 3:
+                risk_level = "medium"
+            else:
+                risk_level = "high"
+            
+            # Utiliser l'UUID comme id, mais aussi retourner le patient_id lisible si disponible
+            patient_readable_id = patient_record.patient_id if patient_record else patient_uuid
+            
+            result.append({
+                "id": patient_uuid,  # UUID pour la compatibilité avec les liens
+                "patient_id": patient_readable_id,  # ID lisible (P-2025-X)
+                "name": patient_record.full_name if patient_record else f"Patient {patient_readable_id}",
+                "age": patient_record.age if patient_record else None,
+                "analyses": analyses_count,
+                "lastVisit": last_analysis_at.strftime("%Y-%m-%d") if last_analysis_at else "2024-01-20",
+                "risk": risk_level,
+                "phone": patient_record.phone_number if patient_record else None,
+                "email": None,  # Pas disponible dans la table patients
+                "address": patient_record.address if patient_record else None,
+                "professional_id": current_user.professional_id if current_user.professional_id else "unknown"
+            })
         
-        result = list(unique_patients.values())
-        print(f"📊 {len(result)} patients uniques retournés")
+        print(f"📊 {len(result)} patients retournés sur {total}")
         return result
         
     except Exception as e:
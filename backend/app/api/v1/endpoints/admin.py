@@ -4,7 +4,8 @@ Admin dashboard endpoints
 
 from typing import List, Optional
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 
@@ -95,10 +96,12 @@ async def update_access_request(
 
 @router.get("/users", response_model=List[UserManagementResponse])
 async def get_users(
+    response: Response,
     user_type: Optional[str] = Query(None, description="Filter by user type: admin, professional, patient"),
     status: Optional[str] = Query(None, description="Filter by status: active, inactive, pending"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Keyset pagination: id of the last user of the previous page (X-Next-Cursor)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -106,7 +109,9 @@ async def get_users(
     Get all users with management information
     """
     admin_service = AdminService(db)
-    users = admin_service.get_users(user_type=user_type, status=status, skip=skip, limit=limit)
+    users = admin_service.get_users(user_type=user_type, status=status, skip=skip, limit=limit, after=after)
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = users[-1].id
     return users
 
 
@@ -131,10 +136,12 @@ async def update_user_status(
 
 @router.get("/professionals", response_model=List[ProfessionalManagementResponse])
 async def get_professionals_management(
+    response: Response,
     specialty: Optional[str] = Query(None, description="Filter by specialty"),
     status: Optional[str] = Query(None, description="Filter by status: active, inactive, pending"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Keyset pagination: id of the last professional of the previous page (X-Next-Cursor)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -143,8 +150,10 @@ async def get_professionals_management(
     """
     admin_service = AdminService(db)
     professionals = admin_service.get_professionals_management(
-        specialty=specialty, status=status, skip=skip, limit=limit
+        specialty=specialty, status=status, skip=skip, limit=limit, after=after
     )
+    if len(professionals) == limit:
+        response.headers["X-Next-Cursor"] = professionals[-1].id
     return professionals
 
 
@@ -194,9 +203,10 @@ async def get_analyses_summary(
 @router.get("/reports/export")
 async def export_reports(
     report_type: str = Query("users", description="Report type: users, professionals, analyses"),
-    format: str = Query("json", description="Export format: json, csv"),
+    format: str = Query("json", description="Export format: json, csv, ndjson (csv/ndjson are streamed)"),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    gzip: bool = Query(False, description="Compress csv/ndjson exports with gzip (.gz file)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -204,8 +214,107 @@ async def export_reports(
     Export system reports
     """
     admin_service = AdminService(db)
-    report_data = admin_service.export_reports(report_type, format, start_date, end_date)
-    return report_data
+    if format not in ("csv", "ndjson"):
+        try:
+            return admin_service.export_reports(report_type, format, start_date, end_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        content = admin_service.stream_export(report_type, format, start_date, end_date, compress=gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filename = f"{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get("/diagnostics/threads")
+async def get_thread_diagnostics(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the effective thread budget (torch, OpenCV, BLAS) of this worker
+    """
+    from app.core.thread_budget import get_thread_report
+    return get_thread_report()
+
+
+@router.get("/models")
+async def get_model_registry(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    List model versions in the registry and the active version
+    """
+    from app.ml import model_registry
+    return model_registry.get_registry_status()
+
+
+@router.post("/models/{version}/activate", status_code=202)
+async def activate_model_version(
+    version: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Load a model version in the background, warm it up, then switch new requests to it
+    """
+    # Changer le modèle servi à tous les utilisateurs: réservé aux administrateurs et professionnels
+    if current_user.user_type not in ("admin", "professional"):
+        raise HTTPException(status_code=403, detail="Access denied: admin or professional role required")
+
+    from app.ml import model_registry
+    try:
+        return model_registry.activate_version(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/models/shadow")
+async def get_shadow_evaluation(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Agreement between the shadow candidate checkpoint and production (per candidate version)
+    """
+    from app.ml import shadow_eval
+    from app.models.shadow_evaluation import ShadowEvaluation
+    from sqlalchemy import case
+
+    rows = db.query(
+        ShadowEvaluation.candidate_version,
+        func.count(ShadowEvaluation.id),
+        func.avg(case((ShadowEvaluation.bi_rads_agreement, 1.0), else_=0.0)),
+        func.avg(case((ShadowEvaluation.density_agreement, 1.0), else_=0.0)),
+        func.avg(ShadowEvaluation.bi_rads_confidence_delta),
+        func.avg(ShadowEvaluation.density_confidence_delta),
+        func.avg(ShadowEvaluation.candidate_latency_ms)
+    ).group_by(ShadowEvaluation.candidate_version).all()
+
+    return {
+        "status": shadow_eval.get_status(),
+        "candidates": [
+            {
+                "candidate_version": version,
+                "images_evaluated": count,
+                "bi_rads_agreement_rate": round(bi_rads_agree or 0, 4),
+                "density_agreement_rate": round(density_agree or 0, 4),
+                "mean_bi_rads_confidence_delta": round(bi_rads_delta or 0, 4),
+                "mean_density_confidence_delta": round(density_delta or 0, 4),
+                "mean_candidate_latency_ms": round(latency or 0, 2)
+            }
+            for version, count, bi_rads_agree, density_agree, bi_rads_delta, density_delta, latency in rows
+        ]
+    }
 
 
 @router.delete("/users/{user_id}")
@@ -3,13 +3,14 @@ Healthcare Centers endpoints for listing screening facilities
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-import math
 
 from app.api.deps import get_db
 from app.models.healthcare_center import HealthcareCenter
+from app.services.center_listing_cache import etag_matches, get_or_build, listing_version, make_etag
+from app.services.spatial_search import search_nearby
 from app.schemas.healthcare_center import (
     HealthcareCenterResponse,
     HealthcareCenterListResponse,
@@ -20,23 +21,6 @@ from app.schemas.healthcare_center import (
 router = APIRouter()
 
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two coordinates in kilometers (Haversine formula)"""
-    R = 6371  # Earth radius in kilometers
-    
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    
-    a = (
-        math.sin(dlat / 2) ** 2 +
-        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-        math.sin(dlon / 2) ** 2
-    )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    
-    return R * c
-
-
 @router.get("/", response_model=HealthcareCenterListResponse)
 async def list_healthcare_centers(
     skip: int = Query(0, ge=0),
@@ -48,12 +32,16 @@ async def list_healthcare_centers(
     radius_km: Optional[float] = Query(None, ge=0, le=100),
     is_available: Optional[bool] = None,
     is_verified: Optional[bool] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
     List healthcare centers with optional filtering and location-based search
+
+    Réponse mise en cache par combinaison de filtres, avec un ETag dérivé de la version
+    de la table: un client qui renvoie If-None-Match reçoit 304 Not Modified sans corps.
     """
-    try:
+    def build_listing() -> bytes:
         print(f"📋 Liste des centres demandée. skip={skip}, limit={limit}, is_available={is_available}")
         query = db.query(HealthcareCenter)
         
@@ -62,8 +50,8 @@ async def list_healthcare_centers(
             query = query.filter(HealthcareCenter.city.ilike(f"%{city}%"))
         
         if service:
-            # Filter by service (JSON array contains)
-            query = query.filter(HealthcareCenter.services.contains([service]))
+            # Filter by service (indexed healthcare_center_tags)
+            query = query.filter(HealthcareCenter.has_tag("service", service))
         
         if is_available is not None:
             query = query.filter(HealthcareCenter.is_available == is_available)
@@ -72,68 +60,44 @@ async def list_healthcare_centers(
             query = query.filter(HealthcareCenter.is_verified == is_verified)
         
         # Location-based filtering
-        if latitude and longitude and radius_km:
-            # For now, get all and filter in Python (can be optimized with PostGIS)
-            centers = query.all()
-            nearby_centers = []
-            for center in centers:
-                if center.latitude and center.longitude:
-                    distance = calculate_distance(
-                        latitude, longitude,
-                        center.latitude, center.longitude
-                    )
-                    if distance <= radius_km:
-                        nearby_centers.append(center)
+        if latitude is not None and longitude is not None and radius_km:
+            # Boîte englobante SQL + haversine, du plus proche au plus lointain
+            nearby_centers = [
+                center for center, _ in search_nearby(query, HealthcareCenter, latitude, longitude, radius_km)
+            ]
             
             total = len(nearby_centers)
-            centers_list = nearby_centers[skip:skip + limit]
-            
-            # Convert datetime to string manually
-            from datetime import datetime
-            centers_data = []
-            for center in centers_list:
-                center_dict = {
-                    **center.__dict__,
-                    'created_at': center.created_at.isoformat() if isinstance(center.created_at, datetime) else str(center.created_at),
-                    'updated_at': center.updated_at.isoformat() if isinstance(center.updated_at, datetime) else (str(center.updated_at) if center.updated_at else None)
-                }
-                centers_data.append(HealthcareCenterResponse(**center_dict))
-            
-            return HealthcareCenterListResponse(
-                centers=centers_data,
-                total=total,
-                skip=skip,
-                limit=limit
-            )
+            centers = nearby_centers[skip:skip + limit]
         else:
             # Standard pagination
             total = query.count()
             print(f"📊 Total centres dans la base: {total}")
             centers = query.offset(skip).limit(limit).all()
             print(f"✅ Retour de {len(centers)} centres")
-            
-            # Convert datetime to string manually
-            from datetime import datetime
-            centers_data = []
-            for center in centers:
-                center_dict = {
-                    **center.__dict__,
-                    'created_at': center.created_at.isoformat() if isinstance(center.created_at, datetime) else str(center.created_at),
-                    'updated_at': center.updated_at.isoformat() if isinstance(center.updated_at, datetime) else (str(center.updated_at) if center.updated_at else None)
-                }
-                centers_data.append(HealthcareCenterResponse(**center_dict))
-            
-            return HealthcareCenterListResponse(
-                centers=centers_data,
-                total=total,
-                skip=skip,
-                limit=limit
-            )
+        
+        return HealthcareCenterListResponse(
+            centers=[HealthcareCenterResponse.model_validate(center) for center in centers],
+            total=total,
+            skip=skip,
+            limit=limit
+        ).model_dump_json().encode()
+    
+    try:
+        cache_key = (skip, limit, city, service, latitude, longitude, radius_km, is_available, is_verified)
+        version = listing_version(db)
+        etag = make_etag(cache_key, version)
+        # no-cache: le client garde la réponse mais la revalide à chaque fois (304 si inchangée)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        body = get_or_build(cache_key, version, build_listing)
     except Exception as e:
         print(f"❌ Erreur dans list_healthcare_centers: {str(e)}")
         import traceback
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
+    
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/{center_id}", response_model=HealthcareCenterResponse)
@@ -173,27 +137,16 @@ async def search_nearby_centers(
     centers = db.query(HealthcareCenter).filter(HealthcareCenter.is_available == True)
     
     if service:
-        centers = centers.filter(HealthcareCenter.services.contains([service]))
-    
-    centers = centers.all()
-    
-    results = []
-    for center in centers:
-        if center.latitude and center.longitude:
-            distance = calculate_distance(
-                latitude, longitude,
-                center.latitude, center.longitude
-            )
-            
-            if distance <= radius_km:
-                center_data = HealthcareCenterResponse.model_validate(center)
-                results.append({
-                    "center": center_data,
-                    "distance_km": round(distance, 1)
-                })
-    
-    # Sort by distance
-    results.sort(key=lambda x: x["distance_km"])
+        centers = centers.filter(HealthcareCenter.has_tag("service", service))
+    
+    # Déjà triés par distance
+    results = [
+        {
+            "center": HealthcareCenterResponse.model_validate(center),
+            "distance_km": round(distance, 1)
+        }
+        for center, distance in search_nearby(centers, HealthcareCenter, latitude, longitude, radius_km)
+    ]
     
     return {"centers": results, "total": len(results)}
 
@@ -498,7 +498,7 @@ async def download_report(
             
             # Construire le format de rapport à partir de l'analyse
             report_data = {
-                "id": f"R-{analysis.created_at.strftime('%Y')}-{analysis.id[-4:]}",
+                "id": analysis.report_code,
                 "analysis_id": analysis.id,
                 "patient_id": patient_readable_id,
                 "date": analysis.created_at.strftime("%Y-%m-%d"),
@@ -74,6 +74,10 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
     ALLOWED_EXTENSIONS: List[str] = [".png", ".jpg", ".jpeg", ".dcm"]
     
+    # Admin dashboard: compteurs matérialisés (admin_stat_counters) au lieu des agrégats à la volée
+    ADMIN_STATS_MATERIALIZED: bool = False
+    ADMIN_STATS_RECONCILE_SECONDS: int = 3600
+    
     # External services
     REDIS_URL: str = "redis://localhost:6379"
     
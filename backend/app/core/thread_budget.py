@@ -0,0 +1,199 @@
+"""
+Budget de threads pour torch, OpenCV et BLAS
+
+Par défaut, torch (intra-op), OpenCV et NumPy/BLAS démarrent chacun autant de
+threads que de cœurs visibles, et uvicorn peut lancer plusieurs workers. Sur un
+petit conteneur, cela sur-souscrit fortement le CPU. Ce module calcule un budget
+par worker à partir du quota CPU cgroup et du nombre de workers, puis l'applique.
+
+Ordre d'utilisation (voir app/main.py):
+1. configure_env_threads() AVANT l'import de numpy/torch/cv2 (variables BLAS)
+2. apply_runtime_threads() une fois les bibliothèques importées
+"""
+
+import math
+import os
+from typing import Optional
+
+# Variables d'environnement lues par les différentes implémentations BLAS/OpenMP
+BLAS_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+]
+
+# Budget calculé au démarrage (None tant que configure_env_threads n'a pas été appelé)
+_budget = None
+_runtime_applied = {}
+
+
+def _read_int_env(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return None
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f"⚠️ [THREADS] Valeur invalide pour {name}: {value!r} (ignorée)")
+        return None
+
+
+def detect_cgroup_cpu_quota() -> Optional[float]:
+    """
+    Retourne le quota CPU du conteneur (en nombre de CPU) ou None si aucun quota
+    Supporte cgroup v2 (cpu.max) et cgroup v1 (cpu.cfs_quota_us / cpu.cfs_period_us)
+    """
+    # cgroup v2: "max 100000" ou "200000 100000"
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+            if quota != "max" and int(period) > 0:
+                return int(quota) / int(period)
+            return None
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read().strip())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read().strip())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def detect_available_cpus() -> int:
+    """Nombre de CPU réellement utilisables: min(affinité, quota cgroup)"""
+    try:
+        visible = len(os.sched_getaffinity(0))
+    except AttributeError:
+        visible = os.cpu_count() or 1
+
+    quota = detect_cgroup_cpu_quota()
+    if quota is not None:
+        # Un quota de 1.5 CPU laisse 1 thread pleinement occupé, jamais moins de 1
+        return max(1, min(visible, int(math.floor(quota))))
+    return max(1, visible)
+
+
+def detect_worker_count() -> int:
+    """Nombre de workers uvicorn/gunicorn (WORKERS, puis WEB_CONCURRENCY lu par uvicorn)"""
+    return _read_int_env("WORKERS") or _read_int_env("WEB_CONCURRENCY") or 1
+
+
+def compute_thread_budget(cpus: Optional[int] = None, workers: Optional[int] = None) -> dict:
+    """
+    Répartit les CPU disponibles entre workers puis entre bibliothèques
+
+    Le chemin d'analyse enchaîne OpenCV (prétraitement), NumPy (features) et torch
+    (têtes de classification) de façon séquentielle: chaque bibliothèque peut donc
+    utiliser toute la part du worker, et un seul thread inter-op suffit.
+    Chaque valeur peut être forcée par variable d'environnement.
+    """
+    quota = detect_cgroup_cpu_quota()
+    cpus = cpus or detect_available_cpus()
+    workers = workers or detect_worker_count()
+    per_worker = max(1, cpus // workers)
+
+    return {
+        "cpu_quota": quota,
+        "available_cpus": cpus,
+        "workers": workers,
+        "threads_per_worker": per_worker,
+        "torch_threads": _read_int_env("TORCH_NUM_THREADS") or per_worker,
+        "torch_interop_threads": _read_int_env("TORCH_INTEROP_THREADS") or 1,
+        "opencv_threads": _read_int_env("OPENCV_NUM_THREADS") or per_worker,
+        "blas_threads": _read_int_env("BLAS_NUM_THREADS") or per_worker,
+    }
+
+
+def configure_env_threads() -> dict:
+    """
+    Calcule le budget et positionne les variables BLAS/OpenMP
+    Doit être appelé avant le premier import de numpy/torch/cv2 pour être pris en compte.
+    Les variables déjà définies explicitement dans l'environnement sont respectées.
+    """
+    global _budget
+    _budget = compute_thread_budget()
+    for name in BLAS_ENV_VARS:
+        os.environ.setdefault(name, str(_budget["blas_threads"]))
+    return _budget
+
+
+def apply_runtime_threads() -> dict:
+    """Applique le budget à torch et OpenCV (après leur import)"""
+    budget = _budget or configure_env_threads()
+
+    try:
+        import torch
+        torch.set_num_threads(budget["torch_threads"])
+        _runtime_applied["torch_threads"] = True
+        try:
+            # Ne peut être appelé qu'une fois, avant tout travail parallèle inter-op
+            torch.set_num_interop_threads(budget["torch_interop_threads"])
+            _runtime_applied["torch_interop_threads"] = True
+        except RuntimeError as e:
+            print(f"⚠️ [THREADS] Threads inter-op torch déjà fixés: {e}")
+            _runtime_applied["torch_interop_threads"] = False
+    except ImportError:
+        pass
+
+    try:
+        import cv2
+        cv2.setNumThreads(budget["opencv_threads"])
+        _runtime_applied["opencv_threads"] = True
+    except ImportError:
+        pass
+
+    print(
+        f"🧵 [THREADS] CPU={budget['available_cpus']} (quota={budget['cpu_quota']}), "
+        f"workers={budget['workers']}, torch={budget['torch_threads']}/"
+        f"{budget['torch_interop_threads']}, opencv={budget['opencv_threads']}, "
+        f"blas={budget['blas_threads']}"
+    )
+    return budget
+
+
+def get_thread_report() -> dict:
+    """Budget calculé et réglages effectivement en vigueur dans ce processus"""
+    effective = {
+        "blas_env": {name: os.getenv(name) for name in BLAS_ENV_VARS},
+    }
+
+    try:
+        import torch
+        effective["torch_threads"] = torch.get_num_threads()
+        effective["torch_interop_threads"] = torch.get_num_interop_threads()
+    except ImportError:
+        effective["torch_threads"] = None
+        effective["torch_interop_threads"] = None
+
+    try:
+        import cv2
+        effective["opencv_threads"] = cv2.getNumThreads()
+    except ImportError:
+        effective["opencv_threads"] = None
+
+    try:
+        # Optionnel: nombre de threads réellement utilisés par les pools BLAS chargés
+        from threadpoolctl import threadpool_info
+        effective["blas_pools"] = [
+            {"api": pool.get("internal_api"), "num_threads": pool.get("num_threads")}
+            for pool in threadpool_info()
+        ]
+    except ImportError:
+        pass
+
+    return {
+        "pid": os.getpid(),
+        "budget": _budget,
+        "applied": dict(_runtime_applied),
+        "effective": effective,
+    }
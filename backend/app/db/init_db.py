@@ -2,9 +2,10 @@
 Initialize database with tables and initial data
 """
 
+from pathlib import Path
+
 from sqlalchemy.orm import Session
 from sqlalchemy.engine import Engine
-from sqlalchemy import text
 
 from app.db.session import SessionLocal
 from app.models.base import Base
@@ -16,6 +17,8 @@ from app.models.access_request import AccessRequest
 from app.models.healthcare_center import HealthcareCenter  # Add healthcare center model
 from app.core.security import get_password_hash
 
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
 
 def init_db(db: Session) -> None:
     """
@@ -43,32 +46,37 @@ def init_db(db: Session) -> None:
         print("✅ Compte administrateur existe déjà")
 
 
-def migrate_sqlite_schema(engine: Engine) -> None:
+def alembic_config(database_url: str = None):
+    """Configuration Alembic du backend (alembic.ini, dossier alembic/)"""
+    from alembic.config import Config
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    if database_url:
+        config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+    return config
+
+
+def check_schema_version(engine: Engine) -> bool:
     """
-    Perform lightweight, idempotent schema adjustments for SQLite.
-    Currently ensures `users.phone` column exists.
+    Vérifie (sans DDL) que la base est à la dernière migration Alembic.
+    Le schéma se met à jour avec `alembic upgrade head` (depuis backend/), pas au démarrage.
     """
-    try:
-        # Skip migration if using PostgreSQL
-        if not engine.url.drivername.startswith("sqlite"):
-            print(f"📊 Utilisation de {engine.url.drivername}, pas de migration SQLite nécessaire")
-            return
-            
-        with engine.connect() as connection:
-            # Check if users table exists
-            tables = connection.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name='users'"))
-            if not list(tables):
-                return  # Nothing to migrate yet
-
-            # Inspect existing columns
-            pragma_result = connection.execute(text("PRAGMA table_info(users)"))
-            existing_columns = {row[1] for row in pragma_result}
-
-            if "phone" not in existing_columns:
-                connection.execute(text("ALTER TABLE users ADD COLUMN phone TEXT"))
-    except Exception as e:
-        # Do not crash startup on migration attempt; log to stdout
-        print(f"⚠️  SQLite migration warning: {e}")
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    expected = set(ScriptDirectory.from_config(alembic_config()).get_heads())
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+
+    if current == expected:
+        print(f"✅ Schéma de la base à jour (révision {', '.join(sorted(current))})")
+        return True
+
+    print(f"❌ Schéma de la base en révision {', '.join(sorted(current)) or 'aucune'}, "
+          f"attendu {', '.join(sorted(expected))}")
+    print("❌ Exécutez `alembic upgrade head` depuis backend/ (une base créée par create_all est reprise telle quelle)")
+    return False
 
 
 if __name__ == "__main__":
@@ -10,10 +10,18 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 import time
 
+from app.core.thread_budget import configure_env_threads, apply_runtime_threads
+
+# Budget de threads: les variables BLAS doivent être posées AVANT l'import de numpy/torch/cv2
+configure_env_threads()
+
 from app.api.v1.api import api_router
 from app.core.config import settings
 from app.db.session import engine, SessionLocal
-from app.db.init_db import migrate_sqlite_schema, init_db
+from app.db.init_db import check_schema_version, init_db
+
+# torch et OpenCV sont importés à ce stade: appliquer le budget dans ce worker
+apply_runtime_threads()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -80,7 +88,7 @@ async def startup_event():
     try:
         from app.models.base import Base
         # Import all models to ensure they're registered with Base.metadata
-        from app.models import healthcare_center, user, patient, mammography, professional, access_request, appointment, risk_assessment
+        from app.models import healthcare_center, user, patient, mammography, professional, access_request, appointment, risk_assessment, shadow_evaluation, admin_stats
         from app.models.healthcare_center import HealthcareCenter
         from app.models.user import User
         from app.models.patient import Patient
@@ -90,33 +98,46 @@ async def startup_event():
         from app.models.appointment import Appointment
         from app.models.risk_assessment import RiskAssessment
         
-        # Apply lightweight SQLite schema migrations before ensuring tables
-        migrate_sqlite_schema(engine)
-
-        # Create all tables if they don't exist
-        print("🏗️  Création des tables si nécessaire...")
-        Base.metadata.create_all(bind=engine)
-        print("✅ Tables vérifiées")
+        # Le schéma est géré par les migrations Alembic (alembic upgrade head):
+        # le démarrage vérifie seulement la révision, sans DDL
+        print("🏗️  Vérification de la révision du schéma...")
+        schema_ready = check_schema_version(engine)
         
-        # Initialize database and create default admin account
-        from app.db.session import SessionLocal
-        from app.db.seed_centers import seed_centers, BENIN_CENTERS
+        if schema_ready:
+            # Initialize database and create default admin account
+            from app.db.session import SessionLocal
+            from app.db.seed_centers import seed_centers, BENIN_CENTERS
         
-        db = SessionLocal()
-        try:
-            # Créer le compte admin s'il n'existe pas
-            print("👤 Vérification/création du compte admin...")
-            init_db(db)
+            db = SessionLocal()
+            try:
+                # Créer le compte admin s'il n'existe pas
+                print("👤 Vérification/création du compte admin...")
+                init_db(db)
             
-            # Seed healthcare centers if table is empty
-            center_count = db.query(HealthcareCenter).count()
-            if center_count == 0:
-                print(f"📋 Aucun centre trouvé. Chargement de {len(BENIN_CENTERS)} centres...")
-                seed_centers(db)
-            else:
-                print(f"✅ {center_count} centres déjà dans la base")
-        finally:
-            db.close()
+                # Seed healthcare centers if table is empty
+                center_count = db.query(HealthcareCenter).count()
+                if center_count == 0:
+                    print(f"📋 Aucun centre trouvé. Chargement de {len(BENIN_CENTERS)} centres...")
+                    seed_centers(db)
+                else:
+                    print(f"✅ {center_count} centres déjà dans la base")
+            finally:
+                db.close()
+        
+            # Compteurs admin matérialisés: mise à jour incrémentale + réconciliation périodique
+            if settings.ADMIN_STATS_MATERIALIZED:
+                import asyncio
+                from app.services.admin_stats_service import (
+                    register_admin_stats_listeners,
+                    reconcile_admin_stats_periodically
+                )
+                register_admin_stats_listeners()
+                app.state.admin_stats_task = asyncio.create_task(
+                    reconcile_admin_stats_periodically(settings.ADMIN_STATS_RECONCILE_SECONDS)
+                )
+                print(f"📊 Statistiques admin matérialisées (réconciliation toutes les {settings.ADMIN_STATS_RECONCILE_SECONDS}s)")
+        else:
+            print("⚠️  Initialisation des données ignorée tant que le schéma n'est pas à jour")
         
         # Précharger le modèle ML au démarrage pour éviter le délai lors de la première requête
         print("\n" + "="*80)
@@ -205,6 +226,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lisibles par le frontend (origine différente): total des listes paginées
+    expose_headers=["X-Total-Count"],
 )
 
 # Trusted host middleware - allow localhost and 127.0.0.1
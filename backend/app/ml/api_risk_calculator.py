@@ -3,12 +3,13 @@ API FastAPI pour la calculatrice de risque Gail Model
 Endpoints pour application mobile
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 import uuid
 from app.ml.gail_risk_calculator import GailModelRiskCalculator
+from app.ml.risk_bulk_import import DEFAULT_CHUNK_SIZE, import_risk_file
 from app.api.deps import get_db, get_current_user
 from app.models.risk_assessment import RiskAssessment, RiskLevel
 from app.models.user import User
@@ -79,6 +80,12 @@ class RiskAssessmentRequest(BaseModel):
         default=None,
         description="Traitement hormonal post-ménopause. Optionnel, seulement si applicable"
     )
+    horizon_years: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=72,
+        description="Horizon de risque personnalisé en années (ex: 10). Optionnel, borné à 90 ans"
+    )
 
 
 class LifestyleInsight(BaseModel):
@@ -94,7 +101,10 @@ class RiskAssessmentResponse(BaseModel):
     risk_5_years: float = Field(..., description="Risque sur 5 ans en pourcentage (ajusté avec mode de vie)")
     risk_gail_pure: float = Field(..., description="Risque Gail pur (sans mode de vie) pour référence")
     lifestyle_adjustment_percent: float = Field(..., description="Impact du mode de vie en pourcentage (+/-)")
-    risk_lifetime: Optional[float] = Field(None, description="Risque à vie - Non calculé actuellement (nécessite validation)")
+    risk_lifetime: Optional[float] = Field(None, description="Risque jusqu'à 90 ans en pourcentage (mortalité concurrente, ajusté avec mode de vie). None tant que l'intégration n'est pas validée contre les valeurs publiées")
+    risk_lifetime_gail_pure: Optional[float] = Field(None, description="Risque à vie Gail pur (sans mode de vie). None tant que non validé")
+    horizon_years: Optional[int] = Field(None, description="Horizon demandé en années")
+    risk_horizon: Optional[float] = Field(None, description="Risque sur l'horizon demandé en pourcentage. None tant que non validé")
     risk_category: str = Field(..., description="Catégorie: 'Faible', 'Modéré', 'Élevé', 'Très élevé'")
     educational_message: List[str] = Field(..., description="Messages éducatifs rassurants")
     recommendations: List[str] = Field(..., description="Recommandations personnalisées")
@@ -114,6 +124,103 @@ class RiskAssessmentResponse(BaseModel):
     significance_explanation: Optional[str] = Field(default=None, description="Explication de la signification clinique")
 
 
+MAX_VALUES_PER_FACTOR = 50
+
+
+class FactorRange(BaseModel):
+    """Valeurs simulées d'un facteur numérique: liste explicite ou plage start..stop (incluse) par pas"""
+    values: Optional[List[float]] = Field(default=None, description="Valeurs explicites")
+    start: Optional[float] = Field(default=None, ge=0)
+    stop: Optional[float] = Field(default=None, ge=0)
+    step: Optional[float] = Field(default=None, gt=0)
+
+    def to_values(self) -> List[float]:
+        if self.values:
+            values = self.values
+        elif self.start is not None and self.stop is not None and self.step:
+            count = int((self.stop - self.start) / self.step + 1e-9) + 1
+            values = [round(self.start + i * self.step, 6) for i in range(max(count, 0))]
+        else:
+            raise ValueError("Indiquer 'values' ou 'start', 'stop' et 'step'")
+        if len(values) > MAX_VALUES_PER_FACTOR:
+            raise ValueError(f"Au plus {MAX_VALUES_PER_FACTOR} valeurs par facteur")
+        return values
+
+
+class RiskSimulationRequest(BaseModel):
+    """Simulation 'et si': profil de base + valeurs des facteurs de mode de vie à explorer"""
+    profile: RiskAssessmentRequest = Field(..., description="Profil de base (comme pour /calculate)")
+    bmi: Optional[FactorRange] = Field(default=None, description="IMC simulés (ex: start=22, stop=32, step=2)")
+    alcohol_consumption: Optional[FactorRange] = Field(default=None, description="Verres d'alcool par semaine simulés")
+    exercise_minutes_per_week: Optional[FactorRange] = Field(default=None, description="Minutes d'exercice par semaine simulées")
+    smoking_status: Optional[List[str]] = Field(default=None, description="Statuts tabagiques simulés ('never', 'former', 'current')")
+    hormone_therapy: Optional[List[bool]] = Field(default=None, description="Traitement hormonal simulé (true/false)")
+
+
+class RiskSimulationResponse(BaseModel):
+    """Surface de risque et impact marginal de chaque facteur"""
+    base: Dict[str, Any] = Field(..., description="Risque du profil de base")
+    axes: Dict[str, List[Any]] = Field(..., description="Valeurs simulées, dans l'ordre des dimensions de la surface")
+    surface: Dict[str, Any] = Field(..., description="risk_5_years, risk_lifetime, risk_category: tableaux imbriqués (une dimension par axe)")
+    marginal_impact: Dict[str, Any] = Field(..., description="Pour chaque facteur seul: risques, écarts au profil de base, meilleure valeur")
+    best_scenario: Dict[str, Any] = Field(..., description="Combinaison simulée au risque à 5 ans le plus bas")
+    points_evaluated: int = Field(..., description="Nombre de profils évalués")
+    disclaimer: str = Field(..., description="Avertissement médical")
+
+
+@router.post("/simulate", response_model=RiskSimulationResponse)
+async def simulate_risk(request: RiskSimulationRequest):
+    """
+    Simulation "et si" : comment le risque évolue si l'on modifie le poids, l'alcool,
+    l'exercice, le tabac ou le traitement hormonal
+    
+    Toute la grille est calculée en une seule évaluation vectorisée: une requête
+    remplace des dizaines d'appels à /calculate.
+    """
+    profile = request.profile
+    bmi = None
+    if profile.weight_kg and profile.height_cm:
+        height_m = profile.height_cm / 100.0
+        bmi = profile.weight_kg / (height_m ** 2)
+    
+    user_data = {
+        'age': profile.age,
+        'first_degree_relatives': profile.first_degree_relatives,
+        'previous_biopsies': profile.previous_biopsies,
+        'atypical_hyperplasia': profile.atypical_hyperplasia,
+        'age_menarche': profile.age_menarche,
+        'age_first_birth': profile.age_first_birth,
+        'bmi': bmi,
+        'alcohol_consumption': profile.alcohol_consumption,
+        'exercise_minutes_per_week': profile.exercise_minutes_per_week,
+        'smoking_status': profile.smoking_status,
+        'hormone_therapy': profile.hormone_therapy
+    }
+    
+    try:
+        factor_values = {}
+        for name in ('bmi', 'alcohol_consumption', 'exercise_minutes_per_week'):
+            factor_range = getattr(request, name)
+            if factor_range is not None:
+                factor_values[name] = factor_range.to_values()
+        if request.smoking_status:
+            factor_values['smoking_status'] = request.smoking_status
+        if request.hormone_therapy:
+            factor_values['hormone_therapy'] = request.hormone_therapy
+        
+        result = calculator.simulate_lifestyle(user_data, factor_values)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Erreur dans simulate_risk: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la simulation: {str(e)}")
+    
+    return RiskSimulationResponse(
+        **result,
+        disclaimer="Simulation indicative basée sur le modèle Gail et des ajustements de mode de vie issus de la littérature. Ne remplace pas une consultation médicale."
+    )
+
+
 @router.post("/calculate", response_model=RiskAssessmentResponse)
 async def calculate_breast_cancer_risk(request: RiskAssessmentRequest):
     """
@@ -145,7 +252,8 @@ async def calculate_breast_cancer_risk(request: RiskAssessmentRequest):
             'alcohol_consumption': request.alcohol_consumption,
             'exercise_minutes_per_week': request.exercise_minutes_per_week,
             'smoking_status': request.smoking_status,
-            'hormone_therapy': request.hormone_therapy
+            'hormone_therapy': request.hormone_therapy,
+            'horizon_years': request.horizon_years
         }
         
         # Calculer le risque
@@ -392,7 +500,8 @@ async def calculate_and_save_risk(
             'alcohol_consumption': request.alcohol_consumption,
             'exercise_minutes_per_week': request.exercise_minutes_per_week,
             'smoking_status': request.smoking_status,
-            'hormone_therapy': request.hormone_therapy
+            'hormone_therapy': request.hormone_therapy,
+            'horizon_years': request.horizon_years
         }
         
         result = calculator.calculate_risk(user_data)
@@ -471,6 +580,43 @@ async def calculate_and_save_risk(
         raise HTTPException(status_code=500, detail=f"Erreur lors du calcul et de la sauvegarde: {str(e)}")
 
 
+@router.post("/bulk-import")
+def bulk_import_risk_assessments(
+    file: UploadFile = File(..., description="Fichier CSV ou XLSX (une ligne par questionnaire)"),
+    dry_run: bool = Query(False, description="Valider et scorer sans enregistrer"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=100, le=20000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Import en lot de questionnaires (ONG partenaires)
+    Requires authentication
+    
+    Le fichier est lu et scoré par blocs, chaque bloc étant enregistré en un seul
+    INSERT multi-lignes. Retourne le nombre de lignes importées et les lignes en
+    erreur (numéro de ligne dans le fichier + erreurs).
+    """
+    print(f"📥 [RISK_IMPORT] {file.filename} reçu de {current_user.id}{' (simulation)' if dry_run else ''}")
+    
+    def report_progress(summary):
+        print(f"   [RISK_IMPORT] Bloc {summary['chunks']}: {summary['imported']} importées, "
+              f"{summary['failed']} en erreur sur {summary['total_rows']} lignes")
+    
+    try:
+        summary = import_risk_file(
+            db, file.file, file.filename or "import.csv", current_user.id,
+            calculator=calculator, chunk_size=chunk_size, dry_run=dry_run, progress=report_progress
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Erreur dans bulk_import_risk_assessments: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'import: {str(e)}")
+    
+    print(f"✅ [RISK_IMPORT] {summary['import_id']}: {summary['imported']} importées, {summary['failed']} en erreur")
+    return summary
+
+
 @router.get("/my-assessments")
 async def get_my_assessments(
     skip: int = 0,
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Feature store des images VinDr prétraitées
+
+Les images sont prétraitées une seule fois (preprocess_mammogram: niveaux de gris,
+CLAHE, 448x448, exactement comme à l'inférence) et stockées en tenseurs uint8
+memmappés, répartis en shards:
+
+    <store>/
+        index.json                  # image_id -> [shard, ligne], version du prétraitement
+        images_00000.npy            # uint8 (shard_size, 448, 448)
+        embeddings_00000.npy        # float32 (shard_size, D), optionnel
+
+FeatureStoreDataset lit des vues sans copie dans ces fichiers: l'entraînement des
+têtes (best_medsiglip_model.pth) comme celui de OptimizedMammographyModel ne
+décodent plus de PNG à chaque epoch.
+
+Usage (depuis backend/):
+    python -m app.ml.feature_store --annotations "../breast-level_annotations (1).csv" \
+        --images-root ../Extract/images_png --output ../feature_store --embeddings
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from app.core.thread_budget import detect_available_cpus
+from app.ml.inference_service_simple import PREPROCESSING_VERSION, preprocess_mammogram
+
+INDEX_FILENAME = "index.json"
+IMAGE_SIZE = 448
+DEFAULT_SHARD_SIZE = 2048  # ~400 Mo par shard en uint8 448x448
+
+
+def _images_shard_path(store_dir: Path, shard: int) -> Path:
+    return store_dir / f"images_{shard:05d}.npy"
+
+
+def _embeddings_shard_path(store_dir: Path, shard: int) -> Path:
+    return store_dir / f"embeddings_{shard:05d}.npy"
+
+
+def _init_worker():
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def _preprocess_to_uint8(image_path: str):
+    """Exécuté dans les processus du pool: PNG -> uint8 448x448 (None si illisible)"""
+    try:
+        image = preprocess_mammogram(image_path)
+        return np.clip(np.rint(image * 255.0), 0, 255).astype(np.uint8)
+    except Exception:
+        return None
+
+
+class FeatureStore:
+    """Accès en lecture (numpy, memmap) à un feature store construit par build_feature_store"""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = Path(store_dir)
+        self.index = json.loads((self.store_dir / INDEX_FILENAME).read_text())
+        if self.index["preprocessing_version"] != PREPROCESSING_VERSION:
+            raise ValueError(
+                f"Feature store construit avec le prétraitement {self.index['preprocessing_version']}, "
+                f"attendu {PREPROCESSING_VERSION}: reconstruisez-le"
+            )
+        self.locations = self.index["images"]
+        self.image_ids = list(self.locations.keys())
+        self.has_embeddings = self.index.get("embedding_dim") is not None
+        # Ouverts à la demande: chaque worker du DataLoader ouvre ses propres memmaps
+        self._image_shards = {}
+        self._embedding_shards = {}
+
+    def __len__(self):
+        return len(self.image_ids)
+
+    def __contains__(self, image_id):
+        return image_id in self.locations
+
+    def _shard(self, cache: dict, path_fn, shard: int) -> np.ndarray:
+        if shard not in cache:
+            cache[shard] = np.load(path_fn(self.store_dir, shard), mmap_mode="r")
+        return cache[shard]
+
+    def get_image(self, image_id: str) -> np.ndarray:
+        """Vue uint8 (448, 448) sans copie"""
+        shard, row = self.locations[image_id]
+        return self._shard(self._image_shards, _images_shard_path, shard)[row]
+
+    def get_embedding(self, image_id: str) -> np.ndarray:
+        """Vue float32 (D,) sans copie"""
+        if not self.has_embeddings:
+            raise ValueError("Ce feature store ne contient pas d'embeddings (--embeddings)")
+        shard, row = self.locations[image_id]
+        return self._shard(self._embedding_shards, _embeddings_shard_path, shard)[row]
+
+    def __getstate__(self):
+        # Les memmaps ne sont pas transmis aux workers: ils sont rouverts après fork/spawn
+        state = dict(self.__dict__)
+        state["_image_shards"] = {}
+        state["_embedding_shards"] = {}
+        return state
+
+
+class FeatureStoreDataset(Dataset):
+    """
+    Dataset torch sur un feature store
+
+    Retourne (tensor, label) où tensor est:
+    - l'image uint8 (1, 448, 448) si use_embeddings=False (conversion en float à faire
+      sur le batch, ex: batch.float().div_(255)),
+    - l'embedding float32 (D,) si use_embeddings=True.
+    """
+
+    def __init__(self, store_dir: str, image_ids: list = None, labels: dict = None, use_embeddings: bool = False):
+        self.store = FeatureStore(store_dir)
+        if image_ids is None:
+            image_ids = self.store.image_ids
+        missing = [image_id for image_id in image_ids if image_id not in self.store]
+        if missing:
+            print(f"⚠️ [FEATURE_STORE] {len(missing)} images absentes du store ignorées")
+        self.image_ids = [image_id for image_id in image_ids if image_id in self.store]
+        self.labels = labels or {}
+        self.use_embeddings = use_embeddings
+
+    def __len__(self):
+        return len(self.image_ids)
+
+    def __getitem__(self, idx):
+        image_id = self.image_ids[idx]
+        if self.use_embeddings:
+            array = self.store.get_embedding(image_id)
+        else:
+            array = self.store.get_image(image_id)[None]
+        # torch.from_numpy partage la mémoire du memmap (lecture seule: ne pas modifier in-place)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="The given NumPy array is not writable")
+            tensor = torch.from_numpy(array)
+        return tensor, self.labels.get(image_id, -1)
+
+
+def _load_index(store_dir: Path) -> dict:
+    index_path = store_dir / INDEX_FILENAME
+    if index_path.exists():
+        index = json.loads(index_path.read_text())
+        if index.get("preprocessing_version") == PREPROCESSING_VERSION:
+            return index
+        print(f"⚠️ [FEATURE_STORE] Prétraitement modifié ({index.get('preprocessing_version')} -> "
+              f"{PREPROCESSING_VERSION}): reconstruction complète")
+        # Les shards de l'ancien prétraitement ne doivent pas être repris (build_embeddings
+        # saute les shards d'embeddings existants)
+        for pattern in ("images_*.npy", "embeddings_*.npy", ".*.tmp.npy"):
+            for shard_path in store_dir.glob(pattern):
+                shard_path.unlink()
+    return {
+        "preprocessing_version": PREPROCESSING_VERSION,
+        "image_size": IMAGE_SIZE,
+        "shard_size": None,
+        "shard_counts": [],
+        "images": {},
+        "failed": [],
+        "embedding_dim": None,
+    }
+
+
+def _write_index(store_dir: Path, index: dict) -> None:
+    tmp_path = store_dir / f".{INDEX_FILENAME}.tmp"
+    tmp_path.write_text(json.dumps(index))
+    os.replace(tmp_path, store_dir / INDEX_FILENAME)
+
+
+def build_feature_store(samples: list, store_dir: str, shard_size: int = DEFAULT_SHARD_SIZE,
+                        num_workers: int = None) -> dict:
+    """
+    Prétraite les images absentes du store et les ajoute dans de nouveaux shards
+
+    samples: liste de (image_id, image_path). Reprise possible: les image_id déjà
+    présents (ou en échec) ne sont pas retraités. L'index est réécrit après chaque shard.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    index = _load_index(store_dir)
+    index["shard_size"] = index["shard_size"] or shard_size
+    shard_size = index["shard_size"]
+    failed = set(index["failed"])
+
+    todo = [(image_id, str(path)) for image_id, path in samples
+            if image_id not in index["images"] and image_id not in failed]
+    num_workers = num_workers or detect_available_cpus()
+    print(f"📦 [FEATURE_STORE] {len(index['images'])} images en store, {len(todo)} à prétraiter "
+          f"({num_workers} processus)")
+    if not todo:
+        return index
+
+    start = time.time()
+    done = 0
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker) as executor:
+        for chunk_start in range(0, len(todo), shard_size):
+            chunk = todo[chunk_start:chunk_start + shard_size]
+            shard = len(index["shard_counts"])
+            tmp_path = store_dir / f".images_{shard:05d}.tmp.npy"
+            images = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8,
+                                               shape=(len(chunk), IMAGE_SIZE, IMAGE_SIZE))
+            row = 0
+            locations = {}
+            results = executor.map(_preprocess_to_uint8, [path for _, path in chunk],
+                                   chunksize=max(1, len(chunk) // (num_workers * 8)))
+            for (image_id, _), image in zip(chunk, results):
+                if image is None:
+                    failed.add(image_id)
+                    continue
+                images[row] = image
+                locations[image_id] = [shard, row]
+                row += 1
+            images.flush()
+            del images
+            os.replace(tmp_path, _images_shard_path(store_dir, shard))
+
+            # Les lignes finales éventuellement vides (échecs) ne sont pas indexées
+            index["shard_counts"].append(row)
+            index["images"].update(locations)
+            index["failed"] = sorted(failed)
+            _write_index(store_dir, index)
+
+            done += len(chunk)
+            rate = done / max(time.time() - start, 1e-6)
+            print(f"   ✅ Shard {shard}: {row} images ({done}/{len(todo)}, {rate:.1f} img/s)")
+            sys.stdout.flush()
+
+    return index
+
+
+def build_embeddings(store_dir: str, service=None, batch_log: int = 500) -> None:
+    """
+    Calcule et met en cache l'embedding de chaque image du store (shards manquants uniquement)
+    avec le même extracteur que l'inférence (MedSigLIPInferenceService.compute_embedding)
+    """
+    if service is None:
+        from app.ml.inference_service_simple import MedSigLIPInferenceService
+        service = MedSigLIPInferenceService()
+
+    store_dir = Path(store_dir)
+    store = FeatureStore(store_dir)
+    index = store.index
+    for shard, count in enumerate(index["shard_counts"]):
+        embeddings_path = _embeddings_shard_path(store_dir, shard)
+        if embeddings_path.exists() or count == 0:
+            continue
+        images = np.load(_images_shard_path(store_dir, shard), mmap_mode="r")
+        embeddings = None
+        tmp_path = store_dir / f".embeddings_{shard:05d}.tmp.npy"
+        for row in range(count):
+            embedding = service.compute_embedding(images[row]).detach().cpu().numpy().reshape(-1)
+            if embeddings is None:
+                embeddings = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32,
+                                                       shape=(len(images), embedding.shape[0]))
+            embeddings[row] = embedding
+            if (row + 1) % batch_log == 0:
+                print(f"   Shard {shard}: {row + 1}/{count} embeddings")
+        embeddings.flush()
+        index["embedding_dim"] = int(embeddings.shape[1])
+        del embeddings
+        os.replace(tmp_path, embeddings_path)
+        _write_index(store_dir, index)
+        print(f"   ✅ Embeddings du shard {shard} enregistrés")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit le feature store des images VinDr prétraitées")
+    parser.add_argument("--annotations", required=True, help="CSV VinDr (colonnes study_id, image_id)")
+    parser.add_argument("--images-root", required=True, action="append",
+                        help="Dossier images_png/<study_id>/<image_id>.png (répétable)")
+    parser.add_argument("--output", required=True, help="Dossier du feature store")
+    parser.add_argument("--split", default=None, help="Filtrer sur la colonne split (ex: training)")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--embeddings", action="store_true", help="Calculer aussi les embeddings")
+    args = parser.parse_args()
+
+    import pandas as pd
+    annotations = pd.read_csv(args.annotations)
+    if args.split:
+        annotations = annotations[annotations["split"] == args.split]
+
+    roots = [Path(root) for root in args.images_root]
+    samples = []
+    for study_id, image_id in annotations[["study_id", "image_id"]].drop_duplicates().itertuples(index=False):
+        for root in roots:
+            path = root / study_id / f"{image_id}.png"
+            if path.exists():
+                samples.append((image_id, path))
+                break
+    print(f"📋 [FEATURE_STORE] {len(samples)} images trouvées sur {len(annotations)} annotations")
+
+    build_feature_store(samples, args.output, shard_size=args.shard_size, num_workers=args.workers)
+    if args.embeddings:
+        build_embeddings(args.output)
+
+
+if __name__ == "__main__":
+    main()
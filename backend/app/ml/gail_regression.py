@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Harnais de non-régression du calculateur Gail sur toute la grille des entrées discrètes
+
+Toutes les combinaisons (âge 18-90, ménarche, premier enfant, biopsies, hyperplasie
+atypique, parentes) sont évaluées par les différents chemins du calculateur:
+
+    scalaire   calculate_risk (table précalculée)
+    direct     calculate_risk sans table (GailModelRiskCalculator(precompute=False))
+    lot        calculate_risk_batch
+    table      lookup_gail_risk vs _calculate_absolute_risk_5_years_official
+
+Les chemins sont comparés entre eux (égalité exacte) puis au fichier de référence
+golden/gail_reference_outputs.npz (valeurs arrondies: égalité exacte, valeurs brutes:
+tolérance relative). Le temps de chaque chemin est mesuré.
+
+Toute optimisation du moteur de risque doit passer ce harnais sans écart.
+Le fichier de référence ne doit être régénéré (--update-golden) que pour un
+changement volontaire du modèle, à justifier dans le commit.
+
+Usage (depuis backend/):
+    python -m app.ml.gail_regression
+    python -m app.ml.gail_regression --lifestyle          # + grille des facteurs de mode de vie
+    python -m app.ml.gail_regression --update-golden
+"""
+
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.ml.gail_risk_calculator import (
+    FIRST_BIRTH_CATEGORIES, GAIL_TABLE_AGES, MENARCHE_CATEGORIES, SMOKING_CATEGORIES,
+    GailModelRiskCalculator
+)
+
+GOLDEN_PATH = Path(__file__).parent / "golden" / "gail_reference_outputs.npz"
+
+# Biopsies et parentes: une valeur au-delà du dernier palier (2+) pour vérifier le plafonnement
+BIOPSY_VALUES = (0, 1, 2, 3)
+RELATIVES_VALUES = (0, 1, 2, 3)
+
+# Grille des facteurs de mode de vie (paliers de _calculate_lifestyle_adjustment + non renseigné)
+LIFESTYLE_GRID = {
+    'bmi': (None, 22.0, 27.0, 32.0),
+    'alcohol_consumption': (None, 0, 5, 10, 20),
+    'exercise_minutes_per_week': (None, 0, 50, 100, 200),
+    'smoking_status': (None,) + tuple(SMOKING_CATEGORIES),
+    'hormone_therapy': (None, False, True),
+}
+LIFESTYLE_AGES = (25, 45, 49, 50, 65, 85)
+
+# Sorties comparées à l'identique (arrondies comme dans l'API)
+ROUNDED_OUTPUTS = ('risk_5_years', 'risk_gail_pure', 'risk_lifetime', 'lifestyle_adjustment_percent',
+                   'average_risk_for_age', 'risk_relative')
+CATEGORICAL_OUTPUTS = ('risk_category', 'clinical_significance')
+# Sorties brutes du chemin par lot, stockées en float32 (tolérance relative: l'ordre des
+# opérations peut changer, la précision float32 est ~6e-8)
+RAW_OUTPUTS = ('gail_relative_risk', 'risk_gail_pure', 'lifestyle_adjustment', 'risk_5_years', 'risk_lifetime')
+RAW_RTOL = 1e-6
+
+# Colonnes d'entrée du fichier de référence
+INPUT_COLUMNS = ('age', 'age_menarche', 'age_first_birth', 'previous_biopsies', 'atypical_hyperplasia',
+                 'first_degree_relatives', 'bmi', 'alcohol_consumption', 'exercise_minutes_per_week',
+                 'smoking_status', 'hormone_therapy')
+INPUT_CATEGORIES = {
+    'age_menarche': MENARCHE_CATEGORIES,
+    'age_first_birth': FIRST_BIRTH_CATEGORIES,
+    'smoking_status': SMOKING_CATEGORIES,
+}
+
+
+def build_grid(lifestyle: bool = False) -> list:
+    """Profils de la grille discrète (dicts au format de calculate_risk)"""
+    profiles = [
+        {
+            'age': age,
+            'age_menarche': menarche,
+            'age_first_birth': first_birth,
+            'previous_biopsies': biopsies,
+            'atypical_hyperplasia': atypical,
+            'first_degree_relatives': relatives,
+        }
+        for age, menarche, first_birth, biopsies, atypical, relatives in itertools.product(
+            GAIL_TABLE_AGES, MENARCHE_CATEGORIES, FIRST_BIRTH_CATEGORIES, BIOPSY_VALUES, (False, True),
+            RELATIVES_VALUES
+        )
+    ]
+    if lifestyle:
+        names = list(LIFESTYLE_GRID)
+        for age, relatives, values in itertools.product(LIFESTYLE_AGES, (0, 2),
+                                                        itertools.product(*LIFESTYLE_GRID.values())):
+            profile = {'age': age, 'first_degree_relatives': relatives}
+            profile.update({name: value for name, value in zip(names, values) if value is not None})
+            profiles.append(profile)
+    return profiles
+
+
+def _columns(profiles: list) -> dict:
+    names = sorted({name for profile in profiles for name in profile})
+    return {name: [profile.get(name) for profile in profiles] for name in names}
+
+
+def _timed(label: str, timings: dict, size: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    timings[label] = {'seconds': elapsed, 'us_per_profile': 1e6 * elapsed / max(size, 1)}
+    return result
+
+
+def run_paths(profiles: list) -> tuple:
+    """Évalue chaque chemin et retourne (sorties par chemin, temps par chemin)"""
+    timings = {}
+    size = len(profiles)
+    calculator = _timed('init_table', timings, 1, GailModelRiskCalculator)
+    direct_calculator = _timed('init_direct', timings, 1, lambda: GailModelRiskCalculator(precompute=False))
+    columns = _columns(profiles)
+
+    outputs = {
+        'scalar': _timed('scalar', timings, size, lambda: [calculator.calculate_risk(p) for p in profiles]),
+        'direct': _timed('direct', timings, size, lambda: [direct_calculator.calculate_risk(p) for p in profiles]),
+        'batch': _timed('batch', timings, size, lambda: calculator.calculate_risk_batch(columns)),
+        'batch_raw': _timed('batch_raw', timings, size, lambda: calculator.calculate_risk_batch(columns, rounded=False)),
+        'table': _timed('table', timings, size, lambda: [calculator.lookup_gail_risk(p) for p in profiles]),
+        'formula': _timed('formula', timings, size,
+                          lambda: [calculator._calculate_absolute_risk_5_years_official(p) for p in profiles]),
+    }
+    return outputs, timings
+
+
+def _scalar_column(results: list, name: str) -> np.ndarray:
+    dtype = object if name in CATEGORICAL_OUTPUTS else np.float64
+    return np.array([result[name] for result in results], dtype=dtype)
+
+
+def _count_mismatches(expected: np.ndarray, actual: np.ndarray, rtol: float = 0.0) -> tuple:
+    """(nombre d'écarts, premier index en écart, écart absolu max)"""
+    if expected.dtype.kind in 'OUS' or actual.dtype.kind in 'OUS':
+        mismatch = expected.astype(object) != actual.astype(object)
+        max_diff = None
+    else:
+        expected = expected.astype(np.float64)
+        actual = actual.astype(np.float64)
+        both_nan = np.isnan(expected) & np.isnan(actual)
+        diff = np.abs(expected - actual)
+        mismatch = ~both_nan & ~(diff <= rtol * np.abs(expected))
+        max_diff = float(np.nanmax(diff)) if diff.size else 0.0
+    indices = np.flatnonzero(mismatch)
+    return len(indices), (int(indices[0]) if len(indices) else None), max_diff
+
+
+def compare_paths(profiles: list, outputs: dict) -> list:
+    """Comparaisons entre chemins: liste de (libellé, écarts, premier index, écart max)"""
+    checks = []
+    errors = [i for i, result in enumerate(outputs['scalar']) if 'error' in result]
+    checks.append(('scalaire: erreurs de calcul', len(errors), errors[0] if errors else None, None))
+
+    for name in ROUNDED_OUTPUTS + CATEGORICAL_OUTPUTS:
+        scalar = _scalar_column(outputs['scalar'], name)
+        checks.append((f"scalaire vs direct: {name}", *_count_mismatches(scalar, _scalar_column(outputs['direct'], name))))
+        checks.append((f"scalaire vs lot: {name}", *_count_mismatches(scalar, np.asarray(outputs['batch'][name]))))
+
+    table = np.array([np.nan if value is None else value for value in outputs['table']], dtype=np.float64)
+    in_grid = ~np.isnan(table)
+    formula = np.asarray(outputs['formula'], dtype=np.float64)
+    checks.append(("table vs formule: risk_gail_pure", *_count_mismatches(formula[in_grid], table[in_grid])))
+    checks.append(("table vs lot brut: risk_gail_pure",
+                   *_count_mismatches(np.asarray(outputs['batch_raw']['risk_gail_pure'])[in_grid], table[in_grid])))
+    return checks
+
+
+def encode_profiles(profiles: list) -> np.ndarray:
+    """Entrées en tableau int16 (x10; catégories -> index, booléens -> 0/1, absent -> -1)"""
+    encoded = np.full((len(profiles), len(INPUT_COLUMNS)), -1, dtype=np.int16)
+    for i, profile in enumerate(profiles):
+        for j, name in enumerate(INPUT_COLUMNS):
+            value = profile.get(name)
+            if value is None:
+                continue
+            if name in INPUT_CATEGORIES:
+                value = INPUT_CATEGORIES[name].index(value)
+            encoded[i, j] = round(float(value) * 10)
+    return encoded
+
+
+def save_golden(profiles: list, outputs: dict, path: Path = GOLDEN_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {f"rounded_{name}": _scalar_column(outputs['scalar'], name) for name in ROUNDED_OUTPUTS}
+    for name in CATEGORICAL_OUTPUTS:
+        arrays[f"rounded_{name}"] = _scalar_column(outputs['scalar'], name).astype(str)
+    for name in RAW_OUTPUTS:
+        arrays[f"raw_{name}"] = np.asarray(outputs['batch_raw'][name], dtype=np.float32)
+    arrays['inputs'] = encode_profiles(profiles)
+    np.savez_compressed(path, **arrays)
+
+
+def compare_golden(profiles: list, outputs: dict, path: Path = GOLDEN_PATH) -> list:
+    """Comparaisons au fichier de référence (sur les profils qu'il contient)"""
+    golden = np.load(path, allow_pickle=False)
+    keys = [tuple(row) for row in encode_profiles(profiles).tolist()]
+    golden_index = {tuple(row): i for i, row in enumerate(golden['inputs'].tolist())}
+    rows = np.array([golden_index.get(key, -1) for key in keys])
+    present = rows >= 0
+    checks = [("référence: profils absents du fichier", int((~present).sum()), None, None)]
+    rows = rows[present]
+
+    for name in ROUNDED_OUTPUTS + CATEGORICAL_OUTPUTS:
+        actual = _scalar_column(outputs['scalar'], name)[present]
+        expected = golden[f"rounded_{name}"][rows]
+        if name in CATEGORICAL_OUTPUTS:
+            actual = actual.astype(str)
+        checks.append((f"référence vs scalaire: {name}", *_count_mismatches(expected, actual)))
+    for name in RAW_OUTPUTS:
+        actual = np.asarray(outputs['batch_raw'][name], dtype=np.float64)[present]
+        checks.append((f"référence vs lot brut: {name}",
+                       *_count_mismatches(golden[f"raw_{name}"][rows].astype(np.float64), actual, rtol=RAW_RTOL)))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Non-régression du calculateur Gail sur la grille discrète")
+    parser.add_argument("--lifestyle", action="store_true", help="Ajouter la grille des facteurs de mode de vie")
+    parser.add_argument("--update-golden", action="store_true", help="Régénérer le fichier de référence")
+    parser.add_argument("--golden", default=str(GOLDEN_PATH), help="Chemin du fichier de référence")
+    args = parser.parse_args()
+
+    # Le fichier de référence couvre toujours les deux grilles
+    profiles = build_grid(lifestyle=args.lifestyle or args.update_golden)
+    print("=" * 80)
+    print(f"NON-RÉGRESSION GAIL - {len(profiles)} profils")
+    print("=" * 80)
+
+    outputs, timings = run_paths(profiles)
+
+    print("\n⏱️  TEMPS PAR CHEMIN :")
+    for label, timing in timings.items():
+        print(f"   {label:12s}: {timing['seconds']:8.3f}s  ({timing['us_per_profile']:9.2f} µs/profil)")
+
+    golden_path = Path(args.golden)
+    if args.update_golden:
+        save_golden(profiles, outputs, golden_path)
+        print(f"\n💾 Fichier de référence régénéré: {golden_path}")
+
+    checks = compare_paths(profiles, outputs)
+    if golden_path.exists():
+        checks += compare_golden(profiles, outputs, golden_path)
+    else:
+        print(f"\n⚠️  Fichier de référence absent ({golden_path}): lancer avec --update-golden")
+
+    print("\n🔍 COMPARAISONS :")
+    failures = 0
+    for label, mismatches, first_index, max_diff in checks:
+        status = "✅" if mismatches == 0 else "❌"
+        detail = f", écart max {max_diff:.3g}" if max_diff else ""
+        print(f"   {status} {label}: {mismatches} écart(s){detail}")
+        if mismatches and first_index is not None:
+            print(f"      premier écart: {profiles[first_index]}")
+        failures += mismatches
+
+    if failures:
+        print(f"\n❌ {failures} écart(s) détecté(s)")
+        sys.exit(1)
+    print("\n✅ Tous les chemins sont identiques et conformes à la référence")
+
+
+if __name__ == "__main__":
+    main()
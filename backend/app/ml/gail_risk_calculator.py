@@ -27,7 +27,138 @@ Pour une validation complète, consultez GAIL_VALIDATION_PLAN.md
 
 import numpy as np
 import math
-from typing import Dict, Optional
+from typing import Dict, Optional, Sequence
+
+# Catégories des variables Gail (ordre des codes entiers acceptés par l'API vectorisée)
+MENARCHE_CATEGORIES = ['<12', '12-13', '14+']
+FIRST_BIRTH_CATEGORIES = ['<20', '20-24', '25-29', '30+', 'nulliparous']
+SMOKING_CATEGORIES = ['never', 'former', 'current']
+
+# Seuils de _get_average_risk_for_age (âge <= limite -> risque moyen)
+AVERAGE_RISK_AGE_LIMITS = np.array([20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80])
+AVERAGE_RISK_VALUES = np.array([0.03, 0.05, 0.10, 0.25, 0.5, 0.85, 1.1, 1.4, 1.7, 2.0, 2.3, 2.5, 2.8, 2.8])
+
+
+# Messages éducatifs par catégorie, pré-rendus une seule fois (formatés à l'appel)
+_FAIBLE_TEMPLATES = [
+    "Votre risque est faible",
+    "Sur 100 femmes avec exactement le même profil que vous, environ {risk_display}% (soit moins d'une femme sur 100) développeront un cancer du sein dans les 5 prochaines années.",
+    "Cela veut dire que la grande majorité ({risk_not_display}% ou plus de {complement:.1f} femmes sur 100) ne le développeront PAS.",
+    "Ce résultat est une estimation statistique basée sur des données médicales validées, pas une certitude absolue."
+]
+EDUCATIONAL_TEMPLATES = {
+    'Faible': _FAIBLE_TEMPLATES,
+    # Risque < 0.01%: formulation spécifique de la 3e phrase
+    'Faible_very_low': _FAIBLE_TEMPLATES[:2] + [
+        "Cela veut dire que pratiquement toutes les femmes (plus de {risk_not_display}%) ne le développeront PAS.",
+        _FAIBLE_TEMPLATES[3]
+    ],
+    'Modéré': [
+        "Votre risque est modéré",
+        "Sur 100 femmes avec exactement le même profil que vous, environ {risk_display}% développeront un cancer du sein dans les 5 ans.",
+        "Cela signifie que {risk_not:.1f}% ne le développeront PAS.",
+        "Votre risque nécessite une surveillance régulière selon les recommandations médicales."
+    ],
+    'Élevé': [
+        "Votre risque est élevé",
+        "Sur 100 femmes avec exactement le même profil que vous, environ {risk_display}% développeront un cancer du sein dans les 5 ans.",
+        "Cela signifie que {risk_not:.1f}% ne le développeront PAS.",
+        "IMPORTANT : Un risque élevé ne signifie PAS que vous aurez automatiquement un cancer.",
+        "La surveillance précoce et régulière est votre meilleure protection. Avec un suivi approprié, la grande majorité des femmes avec un risque élevé ne développeront PAS de cancer.",
+        "Consultez votre médecin ou un oncologue pour mettre en place un plan de surveillance personnalisé."
+    ],
+    'Très élevé': [
+        "Votre risque est très élevé",
+        "Sur 100 femmes avec exactement le même profil que vous, environ {risk_display}% (soit {risk:.1f} femmes sur 100) développeront un cancer dans les 5 ans.",
+        "Mais cela signifie que {risk_not:.1f}% (soit {complement:.1f} femmes sur 100) ne le développeront PAS.",
+        "IMPORTANT : Ce résultat est une ESTIMATION statistique basée sur des modèles validés, pas une certitude absolue.",
+        "La médecine moderne offre d'excellentes options de prévention, de surveillance et de traitement.",
+        "Une surveillance spécialisée et un suivi médical régulier peuvent considérablement améliorer les résultats.",
+        "Nous recommandons fortement de consulter un oncologue ou un généticien médical dès que possible pour discuter de ces résultats et établir un plan personnalisé."
+    ]
+}
+
+# Intégration du risque absolu: grille d'âges annuelle [0, 90)
+LIFETIME_AGE = 90
+
+# Probabilités publiées de cancer du sein invasif, femmes américaines, population générale
+# (American Cancer Society, Breast Cancer Facts & Figures 2019-2020, tableau 2)
+# (âge, horizon en années ou None pour le risque à vie, risque en %)
+PUBLISHED_REFERENCE_RISKS = [
+    (40, 10, 1.5),
+    (50, 10, 2.4),
+    (60, 10, 3.5),
+    (70, 10, 4.1),
+    (0, None, 12.8),
+]
+# Rapport risque intégré / risque publié accepté: en dehors, le risque à vie et le risque
+# sur horizon ne sont ni affichés ni enregistrés (None)
+PUBLISHED_RISK_RATIO_BOUNDS = (0.5, 2.0)
+
+# Simulation "et si" : facteurs modifiables (ceux de _calculate_lifestyle_adjustment)
+LIFESTYLE_FACTORS = ('bmi', 'alcohol_consumption', 'exercise_minutes_per_week', 'smoking_status', 'hormone_therapy')
+GAIL_FACTORS = ('age', 'age_menarche', 'age_first_birth', 'previous_biopsies', 'atypical_hyperplasia',
+                'first_degree_relatives')
+MAX_SIMULATION_POINTS = 20000
+HAZARD_AGE_GRID = np.arange(0, LIFETIME_AGE)
+
+# Table de risque précalculée: toutes les combinaisons des entrées Gail discrètes
+GAIL_TABLE_AGES = range(18, 91)  # Bornes de RiskAssessmentRequest.age
+BIOPSY_BUCKETS = 3    # 0, 1, 2+
+RELATIVES_BUCKETS = 3  # 0, 1, 2+
+
+# Valeurs représentatives de chaque tranche utilisée par _get_recommendations
+_RECOMMENDATION_RISK_LEVELS = [0.0, 5.0, 10.0, 15.0, 20.0]
+_RECOMMENDATION_SMOKING = [None, 'former', 'current']
+_RECOMMENDATION_BMI = [None, 25.0, 30.0]
+_RECOMMENDATION_ALCOHOL = [None, 3, 7]
+_RECOMMENDATION_EXERCISE = [None, 0]
+
+CRITICAL_WARNINGS = [
+    "Ce résultat est une ESTIMATION statistique, pas un diagnostic médical",
+    "Un risque élevé ne signifie PAS que vous aurez un cancer",
+    "Un risque faible ne signifie PAS que vous êtes à 100% protégée",
+    "Cette évaluation ne remplace JAMAIS une consultation avec un professionnel de santé",
+    "Consultez toujours votre médecin pour une évaluation complète et personnalisée"
+]
+
+
+def _apply_exact(fn, values: np.ndarray) -> np.ndarray:
+    """
+    Applique une fonction scalaire Python (math.exp, round...) élément par élément
+    sur les valeurs distinctes seulement. np.exp / np.round peuvent différer d'un ulp
+    ou d'un arrondi de math.exp / round: on garantit ainsi des résultats identiques
+    au chemin scalaire. Les entrées Gail étant discrètes, les valeurs distinctes sont peu nombreuses.
+    """
+    unique, inverse = np.unique(values, return_inverse=True)
+    mapped = np.fromiter((fn(float(value)) for value in unique), dtype=np.float64, count=len(unique))
+    return mapped[inverse].reshape(values.shape)
+
+
+def _as_category_array(values, categories: Sequence[str], default: str) -> np.ndarray:
+    """Colonne de catégories (libellés ou codes entiers) -> tableau object de libellés"""
+    if values is None:
+        return None
+    array = np.asarray(values, dtype=object)
+    if array.ndim == 0:
+        array = array.reshape(1)
+    result = np.empty(array.shape, dtype=object)
+    for i, value in enumerate(array):
+        if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+            result[i] = categories[int(value)]
+        elif value is None or (isinstance(value, float) and math.isnan(value)):
+            result[i] = default
+        else:
+            result[i] = value
+    return result
+
+
+def _as_float_array(values, size: int) -> np.ndarray:
+    """Colonne numérique optionnelle -> float64 avec NaN pour les valeurs absentes"""
+    if values is None:
+        return np.full(size, np.nan)
+    return np.array([np.nan if value is None else value for value in np.asarray(values, dtype=object).reshape(-1)],
+                    dtype=np.float64)
 
 class GailModelRiskCalculator:
     """
@@ -39,7 +170,7 @@ class GailModelRiskCalculator:
     Les coefficients sont constants et ne nécessitent pas de fichier de modèle à charger.
     """
     
-    def __init__(self):
+    def __init__(self, precompute: bool = True):
         # Coefficients du modèle Gail publiés dans la littérature scientifique
         # Ces valeurs proviennent de l'analyse statistique sur bases de données épidémiologiques
         # Sources : Gail et al. (1989), publications NCI, BCRAT
@@ -79,14 +210,173 @@ class GailModelRiskCalculator:
             'relatives_2plus': 0.7674  # 2+ parentes vs 0
         }
         
-        # Taux d'incidence de base par âge (hazard rates)
-        # Provenant des données SEER (Surveillance, Epidemiology, and End Results)
-        # Format : taux d'incidence annuelle par 100,000 femmes
+        # Taux d'incidence de base par âge (hazard rates), pour 100,000 femmes par an
+        # Source : BCRAT (NCI), incidence composite λ1 du cancer du sein invasif,
+        # SEER 1983-87, femmes blanches (tranches de 5 ans de 20 à 89 ans).
+        # Incidence composite et non λ1 * (1 - AR): le profil de référence de ce modèle
+        # (ménarche 12-13 ans, premier enfant à 25-29 ans) est un profil moyen, pas le
+        # profil "sans aucun facteur" de Gail.
         self.base_hazard_rates = {
-            20: 1.5, 25: 2.0, 30: 4.0, 35: 10.0, 40: 20.0,
-            45: 40.0, 50: 60.0, 55: 70.0, 60: 80.0, 65: 90.0,
-            70: 100.0, 75: 110.0, 80: 120.0, 85: 130.0
+            20: 1.0, 25: 7.6, 30: 26.6, 35: 66.1, 40: 126.5,
+            45: 186.6, 50: 221.1, 55: 272.1, 60: 334.8, 65: 392.3,
+            70: 417.8, 75: 443.9, 80: 442.1, 85: 410.9
+        }
+        
+        # Mortalité concurrente (décès d'autres causes) par tranche de 5 ans, pour 100,000 femmes
+        # Source : BCRAT (NCI), λ2 (NCHS 1985-87), femmes blanches
+        self.competing_mortality_rates = {
+            20: 49.3, 25: 53.1, 30: 62.5, 35: 82.5, 40: 130.7,
+            45: 218.1, 50: 365.5, 55: 585.2, 60: 943.9, 65: 1502.8,
+            70: 2383.9, 75: 3883.2, 80: 6682.1, 85: 14490.8
         }
+        self._build_hazard_grid()
+        
+        # Le risque à vie n'est exposé que si l'intégration reproduit les valeurs publiées
+        self.absolute_risk_validated = all(
+            row['within_bounds'] for row in self.compare_absolute_risk_to_published()
+        )
+        
+        # Table précalculée (risque Gail pur, risque relatif, risque moyen) et
+        # recommandations pré-rendues: /risk/calculate devient une simple recherche
+        self.risk_table = None
+        self.recommendation_table = None
+        if precompute:
+            self._build_risk_table()
+            self._build_recommendation_table()
+    
+    def _build_risk_table(self) -> None:
+        """Évalue le modèle (API vectorisée) sur toute la grille des entrées discrètes"""
+        ages = np.arange(GAIL_TABLE_AGES.start, GAIL_TABLE_AGES.stop)
+        grid = np.meshgrid(
+            ages,
+            np.arange(len(MENARCHE_CATEGORIES)),
+            np.arange(len(FIRST_BIRTH_CATEGORIES)),
+            np.arange(BIOPSY_BUCKETS),
+            np.array([False, True]),
+            np.arange(RELATIVES_BUCKETS),
+            indexing='ij'
+        )
+        shape = grid[0].shape
+        age, menarche, first_birth, biopsies, atypical, relatives = (axis.reshape(-1) for axis in grid)
+        rr = self._relative_risk_batch(
+            age,
+            np.array(MENARCHE_CATEGORIES, dtype=object)[menarche],
+            np.array(FIRST_BIRTH_CATEGORIES, dtype=object)[first_birth],
+            biopsies, atypical, relatives
+        )
+        self.risk_table = {
+            'relative_risk': rr.reshape(shape),
+            'risk_gail_pure': self._absolute_risk_5_years_batch(age, rr).reshape(shape),
+            'average_risk': self._average_risk_for_age_batch(ages),
+        }
+        # Listes imbriquées: l'indexation de floats Python évite le coût des scalaires NumPy
+        self._risk_gail_pure_lookup = self.risk_table['risk_gail_pure'].tolist()
+    
+    def _build_hazard_grid(self) -> None:
+        """
+        Taux annuels sur la grille d'âges HAZARD_AGE_GRID (constants par tranche de 5 ans):
+        incidence composite de base (h1), mortalité concurrente (h2) et termes d'âge du log(RR)
+        """
+        groups = (HAZARD_AGE_GRID // 5) * 5
+        first_incidence_group = min(self.base_hazard_rates)
+        first_mortality_group = min(self.competing_mortality_rates)
+        last_group = max(self.base_hazard_rates)
+        self._incidence_grid = np.array([
+            self.base_hazard_rates.get(min(group, last_group), 0.0) if group >= first_incidence_group else 0.0
+            for group in groups
+        ]) / 100000.0
+        self._mortality_grid = np.array([
+            self.competing_mortality_rates[min(max(group, first_mortality_group), last_group)]
+            for group in groups
+        ]) / 100000.0
+        age_centered = HAZARD_AGE_GRID - 59.5
+        self._age_log_rr_grid = (self.beta_coefficients['age_coef'] * age_centered
+                                 + self.beta_coefficients['age_squared_coef'] * age_centered ** 2)
+    
+    def _build_recommendation_table(self) -> None:
+        """Pré-rend les listes de recommandations pour chaque combinaison de tranches"""
+        self.recommendation_table = {}
+        for risk_level in range(len(_RECOMMENDATION_RISK_LEVELS)):
+            for relatives in range(RELATIVES_BUCKETS):
+                for biopsies in range(BIOPSY_BUCKETS):
+                    for smoking in range(len(_RECOMMENDATION_SMOKING)):
+                        for bmi in range(len(_RECOMMENDATION_BMI)):
+                            for alcohol in range(len(_RECOMMENDATION_ALCOHOL)):
+                                for exercise in range(len(_RECOMMENDATION_EXERCISE)):
+                                    key = (risk_level, relatives, biopsies, smoking, bmi, alcohol, exercise)
+                                    self.recommendation_table[key] = tuple(self._get_recommendations(
+                                        _RECOMMENDATION_RISK_LEVELS[risk_level],
+                                        {
+                                            'first_degree_relatives': relatives,
+                                            'previous_biopsies': biopsies,
+                                            'smoking_status': _RECOMMENDATION_SMOKING[smoking],
+                                            'bmi': _RECOMMENDATION_BMI[bmi],
+                                            'alcohol_consumption': _RECOMMENDATION_ALCOHOL[alcohol],
+                                            'exercise_minutes_per_week': _RECOMMENDATION_EXERCISE[exercise],
+                                        }
+                                    ))
+    
+    def _table_index(self, user_data: Dict) -> Optional[tuple]:
+        """Index dans la table précalculée, ou None si les entrées sortent de la grille"""
+        age = user_data.get('age', 50)
+        biopsies = user_data.get('previous_biopsies', 0)
+        relatives = user_data.get('first_degree_relatives', 0)
+        for value in (age, biopsies, relatives):
+            if not isinstance(value, (int, np.integer)) or isinstance(value, bool):
+                return None
+        if age not in GAIL_TABLE_AGES or biopsies < 0 or relatives < 0:
+            return None
+        try:
+            menarche = MENARCHE_CATEGORIES.index(user_data.get('age_menarche', '12-13'))
+            first_birth = FIRST_BIRTH_CATEGORIES.index(user_data.get('age_first_birth', '25-29'))
+        except ValueError:
+            return None
+        return (
+            age - GAIL_TABLE_AGES.start,
+            menarche,
+            first_birth,
+            min(biopsies, BIOPSY_BUCKETS - 1),
+            1 if user_data.get('atypical_hyperplasia', False) else 0,
+            min(relatives, RELATIVES_BUCKETS - 1),
+        )
+    
+    def lookup_gail_risk(self, user_data: Dict) -> Optional[float]:
+        """Risque Gail pur sur 5 ans (%) lu dans la table, None si hors grille"""
+        if self.risk_table is None:
+            return None
+        index = self._table_index(user_data)
+        if index is None:
+            return None
+        age, menarche, first_birth, biopsies, atypical, relatives = index
+        return self._risk_gail_pure_lookup[age][menarche][first_birth][biopsies][atypical][relatives]
+    
+    def _get_recommendations_cached(self, risk_5_years: float, user_data: Dict) -> list:
+        """Recommandations pré-rendues (mêmes tranches que _get_recommendations)"""
+        if self.recommendation_table is None:
+            return self._get_recommendations(risk_5_years, user_data)
+        relatives = user_data.get('first_degree_relatives', 0)
+        biopsies = user_data.get('previous_biopsies', 0)
+        smoking = user_data.get('smoking_status')
+        alcohol = user_data.get('alcohol_consumption')
+        exercise = user_data.get('exercise_minutes_per_week')
+        bmi = user_data.get('bmi')
+        if not bmi and user_data.get('weight_kg') and user_data.get('height_cm'):
+            height_m = user_data.get('height_cm') / 100.0
+            bmi = user_data.get('weight_kg') / (height_m ** 2)
+        try:
+            key = (
+                4 if risk_5_years >= 20 else 3 if risk_5_years >= 15 else 2 if risk_5_years >= 10
+                else 1 if risk_5_years >= 5 else 0,
+                2 if relatives >= 2 else 1 if relatives == 1 else 0,
+                2 if biopsies >= 2 else 1 if biopsies >= 1 else 0,
+                2 if smoking == 'current' else 1 if smoking == 'former' else 0,
+                0 if not bmi else 2 if bmi >= 30 else 1 if bmi >= 25 else 0,
+                2 if alcohol and alcohol >= 7 else 1 if alcohol and alcohol >= 3 else 0,
+                1 if exercise is not None and exercise < 30 else 0,
+            )
+        except TypeError:
+            return self._get_recommendations(risk_5_years, user_data)
+        return list(self.recommendation_table[key])
         
     def _calculate_relative_risk_official(self, user_data: Dict) -> float:
         """
@@ -151,8 +441,10 @@ class GailModelRiskCalculator:
         age_group_lower = (age // 5) * 5
         age_group_upper = age_group_lower + 5
         
-        base_rate_lower = self.base_hazard_rates.get(age_group_lower, 40.0)
-        base_rate_upper = self.base_hazard_rates.get(age_group_upper, 50.0)
+        # Hors table (avant 20 ans, après 89 ans): taux de la tranche la plus proche
+        first_group, last_group = min(self.base_hazard_rates), max(self.base_hazard_rates)
+        base_rate_lower = self.base_hazard_rates[min(max(age_group_lower, first_group), last_group)]
+        base_rate_upper = self.base_hazard_rates[min(max(age_group_upper, first_group), last_group)]
         
         # Interpolation linéaire
         weight = (age - age_group_lower) / 5.0 if age_group_upper > age_group_lower else 0
@@ -201,7 +493,7 @@ class GailModelRiskCalculator:
         Returns:
             Dict avec:
                 - risk_5_years: float (risque sur 5 ans en %)
-                - risk_lifetime: float (risque à vie en %)
+                - risk_lifetime: float ou None (risque à vie en %, None tant que non validé)
                 - risk_category: str ('Faible', 'Modéré', 'Élevé', 'Très élevé')
                 - recommendations: list (recommandations personnalisées)
         """
@@ -211,7 +503,10 @@ class GailModelRiskCalculator:
             age = user_data.get('age', 50)
             
             # Calculer le risque avec la formule officielle du modèle Gail
-            risk_gail_base = self._calculate_absolute_risk_5_years_official(user_data)
+            # (lecture dans la table précalculée, calcul direct hors grille)
+            risk_gail_base = self.lookup_gail_risk(user_data)
+            if risk_gail_base is None:
+                risk_gail_base = self._calculate_absolute_risk_5_years_official(user_data)
             
             # Facteurs de mode de vie (coefficients basés sur méta-analyses médicales validées)
             # Sources : American Cancer Society, WHO/IARC, études prospectives
@@ -225,58 +520,27 @@ class GailModelRiskCalculator:
             # Garder aussi le risque Gail pur pour référence
             risk_gail_pure = risk_gail_base
             
-            # NOTE : Risque à vie SUPPRIMÉ
-            # Le modèle Gail officiel calcule le risque à vie avec une intégration complexe
-            # qui nécessite des vérifications approfondies. Pour l'instant, nous nous concentrons
-            # uniquement sur le risque à 5 ans qui semble plus précis dans notre implémentation.
-            risk_lifetime = None
+            # Risque à vie (jusqu'à 90 ans) par intégration avec mortalité concurrente et horizon
+            # arbitraire optionnel (ex: 10 ans): None tant que l'intégration ne reproduit pas
+            # les valeurs publiées (voir validate_gail_nci.py)
+            horizon_years = user_data.get('horizon_years')
+            risk_lifetime = risk_lifetime_gail_pure = risk_horizon = None
+            if self.absolute_risk_validated:
+                risk_lifetime, risk_lifetime_gail_pure = self._lifetime_risks(user_data, lifestyle_adjustment)
+                if horizon_years:
+                    risk_horizon = self.calculate_absolute_risk(user_data, horizon_years=horizon_years)
             
             # Catégorisation
             risk_category = self._categorize_risk(risk_5_years)
             
             # Recommandations PERSONNALISÉES basées sur les réponses de l'utilisateur
-            recommendations = self._get_recommendations(risk_5_years, user_data)
+            recommendations = self._get_recommendations_cached(risk_5_years, user_data)
             
             # Calculer l'impact des facteurs de mode de vie (informations éducatives uniquement)
             lifestyle_insights = self._calculate_lifestyle_insights(user_data)
             
-            # Calculer la précision estimée selon les variables fournies
-            # Variables du modèle Gail (6 requises)
-            gail_vars = [
-                'age' in user_data and user_data['age'] is not None,
-                'first_degree_relatives' in user_data and user_data['first_degree_relatives'] is not None,
-                'previous_biopsies' in user_data and user_data['previous_biopsies'] is not None,
-                'atypical_hyperplasia' in user_data and user_data.get('atypical_hyperplasia') is not None,
-                'age_menarche' in user_data and user_data.get('age_menarche') is not None,
-                'age_first_birth' in user_data and user_data.get('age_first_birth') is not None
-            ]
-            
-            # Facteurs de mode de vie (optionnels, améliorent la précision)
-            # Note: IMC peut être calculé depuis poids/taille ou fourni directement
-            lifestyle_vars = [
-                user_data.get('bmi') is not None,
-                user_data.get('alcohol_consumption') is not None,
-                user_data.get('exercise_minutes_per_week') is not None,
-                user_data.get('smoking_status') is not None,
-                user_data.get('hormone_therapy') is not None
-            ]
-            
-            num_gail = sum(gail_vars)
-            num_lifestyle = sum(lifestyle_vars)
-            
-            # Précision selon les variables fournies
-            if num_gail >= 6 and num_lifestyle >= 3:
-                estimated_accuracy = "70-75%"
-                model_used = "Gail Model + Facteurs Mode de Vie"
-            elif num_gail >= 6:
-                estimated_accuracy = "75-80%"
-                model_used = "Gail Model (validé NCI)"
-            elif num_gail >= 3:
-                estimated_accuracy = "70-75%"
-                model_used = "Gail Model (partiel)"
-            else:
-                estimated_accuracy = "65-70%"
-                model_used = "Gail Model (incomplet)"
+            # Précision estimée selon les variables fournies
+            num_gail, num_lifestyle, model_used, estimated_accuracy = self._describe_inputs(user_data)
             
             # Calculer l'impact du mode de vie
             lifestyle_impact = risk_5_years - risk_gail_pure
@@ -289,19 +553,9 @@ class GailModelRiskCalculator:
             risk_relative = (risk_5_years / average_risk) if average_risk > 0 else 1.0
             
             # Catégoriser la signification clinique - BASÉE sur le risque relatif
-            # Si >2x la moyenne = ÉLEVÉ selon les standards médicaux
-            if risk_relative >= 3.0:
-                clinical_significance = "RISQUE TRÈS ÉLEVÉ"
-                significance_explanation = f"Votre risque ({risk_5_years:.1f}%) est {risk_relative:.1f}x plus élevé que la moyenne ({average_risk}%) pour une femme de votre âge. C'est un niveau élevé qui nécessite une attention médicale."
-            elif risk_relative >= 2.0:
-                clinical_significance = "RISQUE ÉLEVÉ"
-                significance_explanation = f"Votre risque ({risk_5_years:.1f}%) est {risk_relative:.1f}x plus élevé que la moyenne ({average_risk}%) pour une femme de votre âge. C'est un niveau élevé qui nécessite une surveillance renforcée."
-            elif risk_relative >= 1.5:
-                clinical_significance = "RISQUE MODÉRÉMENT ÉLEVÉ"
-                significance_explanation = f"Votre risque ({risk_5_years:.1f}%) est {risk_relative:.1f}x plus élevé que la moyenne ({average_risk}%) pour une femme de votre âge."
-            else:
-                clinical_significance = "RISQUE NORMO-PROBABLE"
-                significance_explanation = f"Votre risque ({risk_5_years:.1f}%) est proche de la moyenne ({average_risk}%) pour une femme de votre âge."
+            clinical_significance, significance_explanation = self._clinical_significance(
+                risk_5_years, risk_relative, average_risk
+            )
             
             # Avertissement si antécédents familiaux très chargés
             warning_message = None
@@ -315,7 +569,10 @@ class GailModelRiskCalculator:
                 'risk_5_years': round(risk_5_years, 2),  # Risque ajusté (Gail + mode de vie)
                 'risk_gail_pure': round(risk_gail_pure, 2),  # Risque Gail pur (référence)
                 'lifestyle_adjustment_percent': round(lifestyle_impact_percent, 1),  # Impact mode de vie en %
-                'risk_lifetime': risk_lifetime,  # Retiré - nécessite validation supplémentaire
+                'risk_lifetime': round(risk_lifetime, 2) if risk_lifetime is not None else None,  # Risque jusqu'à 90 ans (avec mode de vie)
+                'risk_lifetime_gail_pure': round(risk_lifetime_gail_pure, 2) if risk_lifetime_gail_pure is not None else None,
+                'horizon_years': horizon_years,
+                'risk_horizon': round(risk_horizon, 2) if risk_horizon is not None else None,
                 'risk_category': risk_category,
                 'recommendations': recommendations,
                 'educational_message': self._get_educational_message(risk_category, risk_5_years),
@@ -332,13 +589,7 @@ class GailModelRiskCalculator:
                 'lifestyle_insights': lifestyle_insights,
                 'note_lifestyle': "Les facteurs de mode de vie sont intégrés avec des coefficients validés (American Cancer Society, WHO/IARC, BCSC). Impact estimé sur précision : -5% à -10%.",
                 'disclaimer': "Cette évaluation ne remplace pas une consultation médicale.",
-                'critical_warnings': [
-                    "Ce résultat est une ESTIMATION statistique, pas un diagnostic médical",
-                    "Un risque élevé ne signifie PAS que vous aurez un cancer",
-                    "Un risque faible ne signifie PAS que vous êtes à 100% protégée",
-                    "Cette évaluation ne remplace JAMAIS une consultation avec un professionnel de santé",
-                    "Consultez toujours votre médecin pour une évaluation complète et personnalisée"
-                ]
+                'critical_warnings': list(CRITICAL_WARNINGS)
             }
             
         except Exception as e:
@@ -348,6 +599,504 @@ class GailModelRiskCalculator:
                 'risk_category': 'Erreur'
             }
     
+    def _describe_inputs(self, user_data: Dict) -> tuple:
+        """Variables fournies et précision estimée: (num_gail, num_lifestyle, model_used, estimated_accuracy)"""
+        # Calculer la précision estimée selon les variables fournies
+        # Variables du modèle Gail (6 requises)
+        gail_vars = [
+            'age' in user_data and user_data['age'] is not None,
+            'first_degree_relatives' in user_data and user_data['first_degree_relatives'] is not None,
+            'previous_biopsies' in user_data and user_data['previous_biopsies'] is not None,
+            'atypical_hyperplasia' in user_data and user_data.get('atypical_hyperplasia') is not None,
+            'age_menarche' in user_data and user_data.get('age_menarche') is not None,
+            'age_first_birth' in user_data and user_data.get('age_first_birth') is not None
+        ]
+        
+        # Facteurs de mode de vie (optionnels, améliorent la précision)
+        # Note: IMC peut être calculé depuis poids/taille ou fourni directement
+        lifestyle_vars = [
+            user_data.get('bmi') is not None,
+            user_data.get('alcohol_consumption') is not None,
+            user_data.get('exercise_minutes_per_week') is not None,
+            user_data.get('smoking_status') is not None,
+            user_data.get('hormone_therapy') is not None
+        ]
+        
+        num_gail = sum(gail_vars)
+        num_lifestyle = sum(lifestyle_vars)
+        
+        # Précision selon les variables fournies
+        if num_gail >= 6 and num_lifestyle >= 3:
+            estimated_accuracy = "70-75%"
+            model_used = "Gail Model + Facteurs Mode de Vie"
+        elif num_gail >= 6:
+            estimated_accuracy = "75-80%"
+            model_used = "Gail Model (validé NCI)"
+        elif num_gail >= 3:
+            estimated_accuracy = "70-75%"
+            model_used = "Gail Model (partiel)"
+        else:
+            estimated_accuracy = "65-70%"
+            model_used = "Gail Model (incomplet)"
+        
+        return num_gail, num_lifestyle, model_used, estimated_accuracy
+    
+    def _clinical_significance(self, risk_5_years: float, risk_relative: float, average_risk: float) -> tuple:
+        """Signification clinique et explication, selon le risque relatif à la moyenne pour l'âge"""
+        # Catégoriser la signification clinique - BASÉE sur le risque relatif
+        # Si >2x la moyenne = ÉLEVÉ selon les standards médicaux
+        if risk_relative >= 3.0:
+            clinical_significance = "RISQUE TRÈS ÉLEVÉ"
+            significance_explanation = f"Votre risque ({risk_5_years:.1f}%) est {risk_relative:.1f}x plus élevé que la moyenne ({average_risk}%) pour une femme de votre âge. C'est un niveau élevé qui nécessite une attention médicale."
+        elif risk_relative >= 2.0:
+            clinical_significance = "RISQUE ÉLEVÉ"
+            significance_explanation = f"Votre risque ({risk_5_years:.1f}%) est {risk_relative:.1f}x plus élevé que la moyenne ({average_risk}%) pour une femme de votre âge. C'est un niveau élevé qui nécessite une surveillance renforcée."
+        elif risk_relative >= 1.5:
+            clinical_significance = "RISQUE MODÉRÉMENT ÉLEVÉ"
+            significance_explanation = f"Votre risque ({risk_5_years:.1f}%) est {risk_relative:.1f}x plus élevé que la moyenne ({average_risk}%) pour une femme de votre âge."
+        else:
+            clinical_significance = "RISQUE NORMO-PROBABLE"
+            significance_explanation = f"Votre risque ({risk_5_years:.1f}%) est proche de la moyenne ({average_risk}%) pour une femme de votre âge."
+        
+        return clinical_significance, significance_explanation
+    
+    # ------------------------------------------------------------------
+    # API vectorisée: mêmes formules que le chemin scalaire, sur des colonnes
+    # ------------------------------------------------------------------
+
+    def _covariate_log_rr_terms(self, menarche, first_birth, biopsies, atypical, relatives) -> list:
+        """Termes du log(RR) hors âge, dans l'ordre d'addition de _calculate_relative_risk_official"""
+        beta = self.beta_coefficients
+        return [
+            np.where(menarche == '<12', beta['menarche_lt12'],
+                     np.where(menarche == '14+', beta['menarche_14plus'], 0.0)),
+            np.select(
+                [first_birth == '20-24', first_birth == '30+', first_birth == 'nulliparous'],
+                [beta['birth_age_20_24'], beta['birth_age_30plus'], beta['nulliparous']],
+                0.0
+            ),
+            np.where(biopsies == 1, beta['biopsy_1'], np.where(biopsies >= 2, beta['biopsy_2plus'], 0.0)),
+            np.where(atypical, beta['atypical_hyperplasia'], 0.0),
+            np.where(relatives == 1, beta['relatives_1'], np.where(relatives >= 2, beta['relatives_2plus'], 0.0)),
+        ]
+
+    def _covariate_log_rr_batch(self, batch: Dict) -> np.ndarray:
+        """Somme des termes du log(RR) hors âge pour un lot préparé par _prepare_batch"""
+        covariate_log_rr = np.zeros(batch['age'].shape, dtype=np.float64)
+        for term in self._covariate_log_rr_terms(batch['age_menarche'], batch['age_first_birth'],
+                                                 batch['previous_biopsies'], batch['atypical_hyperplasia'],
+                                                 batch['first_degree_relatives']):
+            covariate_log_rr = covariate_log_rr + term
+        return covariate_log_rr
+
+    def _relative_risk_batch(self, age, menarche, first_birth, biopsies, atypical, relatives) -> np.ndarray:
+        """Version vectorisée de _calculate_relative_risk_official (mêmes additions, même ordre)"""
+        beta = self.beta_coefficients
+        age_centered = age - 59.5
+        log_rr = np.zeros(age.shape, dtype=np.float64)
+        log_rr = log_rr + beta['age_coef'] * age_centered
+        log_rr = log_rr + beta['age_squared_coef'] * (age_centered ** 2)
+        for term in self._covariate_log_rr_terms(menarche, first_birth, biopsies, atypical, relatives):
+            log_rr = log_rr + term
+        return _apply_exact(math.exp, log_rr)
+
+    def _absolute_risk_horizon_batch(self, age, covariate_log_rr, end_age, lifestyle_adjustment=None) -> np.ndarray:
+        """
+        Risque absolu (%) entre age et end_age, à la manière de Gail (1989):
+        P = somme_j [λ1_j / (λ1_j + λ2_j)] * S_j * (1 - exp(-(λ1_j + λ2_j)))
+        avec λ1 = h1(t) * RR(t) (* ajustement mode de vie), λ2 = mortalité concurrente,
+        S_j = exp(-somme_{k<j} (λ1_k + λ2_k)), sur des intervalles d'un an.
+        Tout est calculé par sommes cumulées sur la grille d'âges, sans boucle Python.
+        """
+        grid = HAZARD_AGE_GRID[None, :]
+        rr = np.exp(covariate_log_rr[:, None] + self._age_log_rr_grid[None, :])
+        incidence = self._incidence_grid[None, :] * rr
+        if lifestyle_adjustment is not None:
+            incidence = incidence * lifestyle_adjustment[:, None]
+        total = incidence + self._mortality_grid[None, :]
+
+        in_window = (grid >= age[:, None]) & (grid < end_age[:, None])
+        hazard = np.where(in_window, total, 0.0)
+        cumulative = np.cumsum(hazard, axis=1)
+        survival = np.exp(-(cumulative - hazard))  # Survie au début de chaque intervalle
+        contribution = np.where(in_window, incidence / total * survival * -np.expm1(-total), 0.0)
+        return contribution.sum(axis=1) * 100
+
+    def calculate_absolute_risk_batch(self, columns: Dict, horizon_years=None, to_age: int = LIFETIME_AGE,
+                                      include_lifestyle: bool = True) -> np.ndarray:
+        """
+        Risque absolu (%) sur un horizon arbitraire pour une population
+        horizon_years (scalaire ou colonne) prime sur to_age; l'horizon est borné à LIFETIME_AGE.
+        """
+        batch = self._prepare_batch(columns)
+        age = batch['age']
+        if horizon_years is not None:
+            end_age = age + np.broadcast_to(np.asarray(horizon_years, dtype=np.int64), age.shape)
+        else:
+            end_age = np.full(age.shape, to_age, dtype=np.int64)
+        end_age = np.minimum(end_age, LIFETIME_AGE)
+
+        covariate_log_rr = self._covariate_log_rr_batch(batch)
+
+        lifestyle_adjustment = None
+        if include_lifestyle:
+            lifestyle_adjustment = self._lifestyle_adjustment_batch(
+                age, batch['bmi'], batch['alcohol_consumption'], batch['exercise_minutes_per_week'],
+                batch['smoking_status'], batch['hormone_therapy']
+            )
+        return self._absolute_risk_horizon_batch(age, covariate_log_rr, end_age, lifestyle_adjustment)
+
+    def _covariate_log_rr(self, user_data: Dict) -> float:
+        """Termes du log(RR) hors âge pour un profil (mêmes valeurs, même ordre que _covariate_log_rr_terms)"""
+        beta = self.beta_coefficients
+
+        def category(name, categories, default):
+            value = user_data.get(name)
+            if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+                return categories[int(value)]
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                return default
+            return value
+
+        menarche = category('age_menarche', MENARCHE_CATEGORIES, '12-13')
+        first_birth = category('age_first_birth', FIRST_BIRTH_CATEGORIES, '25-29')
+        biopsies = int(user_data.get('previous_biopsies') or 0)
+        relatives = int(user_data.get('first_degree_relatives') or 0)
+
+        log_rr = 0.0
+        log_rr += beta['menarche_lt12'] if menarche == '<12' else beta['menarche_14plus'] if menarche == '14+' else 0.0
+        log_rr += {'20-24': beta['birth_age_20_24'], '30+': beta['birth_age_30plus'],
+                   'nulliparous': beta['nulliparous']}.get(first_birth, 0.0)
+        log_rr += beta['biopsy_1'] if biopsies == 1 else beta['biopsy_2plus'] if biopsies >= 2 else 0.0
+        log_rr += beta['atypical_hyperplasia'] if user_data.get('atypical_hyperplasia') else 0.0
+        log_rr += beta['relatives_1'] if relatives == 1 else beta['relatives_2plus'] if relatives >= 2 else 0.0
+        return log_rr
+
+    def compare_absolute_risk_to_published(self) -> list:
+        """
+        Risque absolu intégré du profil de référence (aucun facteur, sans mode de vie)
+        comparé à PUBLISHED_REFERENCE_RISKS: une ligne par référence, avec le rapport
+        et son appartenance à PUBLISHED_RISK_RATIO_BOUNDS
+        """
+        low, high = PUBLISHED_RISK_RATIO_BOUNDS
+        comparison = []
+        for age, horizon, published in PUBLISHED_REFERENCE_RISKS:
+            # Âge 0 pour le risque à vie "depuis la naissance" (incidence nulle avant 20 ans)
+            ours = self.calculate_absolute_risk({'age': age}, horizon_years=horizon, include_lifestyle=False)
+            ratio = ours / published
+            comparison.append({
+                'age': age, 'horizon_years': horizon, 'ours': ours, 'published': published,
+                'ratio': ratio, 'within_bounds': low <= ratio <= high
+            })
+        return comparison
+
+    def calculate_absolute_risk(self, user_data: Dict, horizon_years: Optional[int] = None,
+                                to_age: int = LIFETIME_AGE, include_lifestyle: bool = True) -> float:
+        """Risque absolu (%) d'une personne jusqu'à to_age (défaut: 90 ans) ou sur horizon_years années"""
+        age = user_data.get('age', 50)
+        end_age = min(age + horizon_years if horizon_years is not None else to_age, LIFETIME_AGE)
+        adjustment = np.array([self._calculate_lifestyle_adjustment(user_data)]) if include_lifestyle else None
+        return float(self._absolute_risk_horizon_batch(
+            np.array([age]), np.array([self._covariate_log_rr(user_data)]), np.array([end_age]), adjustment
+        )[0])
+
+    def _lifetime_risks(self, user_data: Dict, lifestyle_adjustment: float) -> tuple:
+        """(risque à vie avec mode de vie, risque à vie Gail pur) en une seule intégration"""
+        age = user_data.get('age', 50)
+        risks = self._absolute_risk_horizon_batch(
+            np.array([age, age]), np.full(2, self._covariate_log_rr(user_data)),
+            np.full(2, LIFETIME_AGE), np.array([lifestyle_adjustment, 1.0])
+        )
+        return float(risks[0]), float(risks[1])
+
+    def _base_rate_batch(self, age: np.ndarray) -> np.ndarray:
+        """Taux d'incidence de base interpolé (mêmes bornes que le chemin scalaire)"""
+        first_group, last_group = min(self.base_hazard_rates), max(self.base_hazard_rates)
+        lower = (age // 5) * 5
+        upper = lower + 5
+        groups, inverse = np.unique(
+            np.clip(np.concatenate([lower, upper]), first_group, last_group), return_inverse=True
+        )
+        rates = np.array([self.base_hazard_rates[int(group)] for group in groups])[inverse]
+        rate_lower, rate_upper = rates[:len(lower)], rates[len(lower):]
+        weight = (age - lower) / 5.0
+        return rate_lower * (1 - weight) + rate_upper * weight
+
+    def _absolute_risk_5_years_batch(self, age: np.ndarray, rr_multiplier: np.ndarray) -> np.ndarray:
+        """Version vectorisée de _calculate_absolute_risk_5_years_official (en %)"""
+        annual_prob = (self._base_rate_batch(age) / 100000.0) * rr_multiplier
+        compounded = 1 - _apply_exact(lambda p: math.pow(1 - p, 5), annual_prob)
+        return np.where(annual_prob < 0.01, annual_prob * 5, compounded) * 100
+
+    def _lifestyle_adjustment_batch(self, age, bmi, alcohol, exercise, smoking, hormone_therapy) -> np.ndarray:
+        """Version vectorisée de _calculate_lifestyle_adjustment (NaN/None = facteur non renseigné)"""
+        adjustment = np.ones(age.shape, dtype=np.float64)
+        post_menopause = age >= 50
+
+        with np.errstate(invalid='ignore'):
+            bmi_factor = np.where(
+                post_menopause,
+                np.where(bmi >= 30, 1.30, np.where(bmi >= 25, 1.15, 1.0)),
+                np.where(bmi >= 30, 1.15, np.where(bmi >= 25, 1.08, 1.0))
+            )
+            adjustment = adjustment * np.where(np.isnan(bmi), 1.0, bmi_factor)
+
+            alcohol_factor = np.where(alcohol >= 14, 1.30, np.where(alcohol >= 7, 1.15, np.where(alcohol >= 3, 1.08, 1.0)))
+            adjustment = adjustment * np.where(np.isnan(alcohol), 1.0, alcohol_factor)
+
+            exercise_factor = np.where(exercise >= 150, 0.85, np.where(exercise >= 75, 0.90, np.where(exercise >= 30, 0.95, 1.0)))
+            adjustment = adjustment * np.where(np.isnan(exercise), 1.0, exercise_factor)
+
+        smoking_factor = np.where(smoking == 'current', np.where(age < 50, 1.20, 1.12),
+                                  np.where(smoking == 'former', 1.03, 1.0))
+        adjustment = adjustment * smoking_factor
+
+        adjustment = adjustment * np.where(hormone_therapy & post_menopause, 1.25, 1.0)
+        return adjustment
+
+    def _average_risk_for_age_batch(self, age: np.ndarray) -> np.ndarray:
+        """Version vectorisée de _get_average_risk_for_age"""
+        return AVERAGE_RISK_VALUES[np.searchsorted(AVERAGE_RISK_AGE_LIMITS, age, side='left')]
+
+    def _categorize_risk_batch(self, risk_5_years: np.ndarray) -> np.ndarray:
+        """Version vectorisée de _categorize_risk"""
+        return np.select(
+            [risk_5_years < 1.5, risk_5_years < 2.5, risk_5_years < 8.0],
+            ['Faible', 'Modéré', 'Élevé'],
+            'Très élevé'
+        ).astype(object)
+
+    def _prepare_batch(self, columns: Dict) -> Dict[str, np.ndarray]:
+        """
+        Normalise les colonnes d'entrée (listes, tableaux NumPy ou colonnes pandas)
+        Les colonnes Gail absentes prennent les mêmes valeurs par défaut que calculate_risk.
+        """
+        if 'age' not in columns:
+            raise ValueError("La colonne 'age' est obligatoire")
+        age = np.asarray(columns['age'], dtype=np.int64).reshape(-1)
+        size = len(age)
+
+        def int_column(name):
+            values = columns.get(name)
+            if values is None:
+                return np.zeros(size, dtype=np.int64)
+            array = np.asarray(values)
+            if array.dtype == object:
+                # Valeurs absentes (None) -> 0, comme la valeur par défaut de calculate_risk
+                array = np.array([0 if value is None else value for value in array.reshape(-1)])
+            return array.astype(np.int64).reshape(-1)
+
+        def bool_column(name):
+            values = columns.get(name)
+            if values is None:
+                return np.zeros(size, dtype=bool)
+            return np.array([bool(value) if value is not None else False
+                             for value in np.asarray(values, dtype=object).reshape(-1)], dtype=bool)
+
+        menarche = _as_category_array(columns.get('age_menarche'), MENARCHE_CATEGORIES, '12-13')
+        first_birth = _as_category_array(columns.get('age_first_birth'), FIRST_BIRTH_CATEGORIES, '25-29')
+        smoking = _as_category_array(columns.get('smoking_status'), SMOKING_CATEGORIES, None)
+
+        batch = {
+            'age': age,
+            'age_menarche': menarche if menarche is not None else np.full(size, '12-13', dtype=object),
+            'age_first_birth': first_birth if first_birth is not None else np.full(size, '25-29', dtype=object),
+            'previous_biopsies': int_column('previous_biopsies'),
+            'atypical_hyperplasia': bool_column('atypical_hyperplasia'),
+            'first_degree_relatives': int_column('first_degree_relatives'),
+            'bmi': _as_float_array(columns.get('bmi'), size),
+            'alcohol_consumption': _as_float_array(columns.get('alcohol_consumption'), size),
+            'exercise_minutes_per_week': _as_float_array(columns.get('exercise_minutes_per_week'), size),
+            'smoking_status': smoking if smoking is not None else np.full(size, None, dtype=object),
+            'hormone_therapy': bool_column('hormone_therapy'),
+        }
+        for name, values in batch.items():
+            if len(values) != size:
+                raise ValueError(f"La colonne '{name}' contient {len(values)} valeurs au lieu de {size}")
+        return batch
+
+    def calculate_risk_batch(self, columns: Dict, rounded: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Calcule le risque Gail pour toute une population en une seule passe NumPy
+
+        Args:
+            columns: dictionnaire de colonnes de même longueur, mêmes clés que calculate_risk
+                (age, age_menarche, age_first_birth, previous_biopsies, atypical_hyperplasia,
+                first_degree_relatives, bmi, alcohol_consumption, exercise_minutes_per_week,
+                smoking_status, hormone_therapy). Les catégories acceptent les libellés
+                ('<12', '25-29'...) ou leurs codes entiers (index dans MENARCHE_CATEGORIES, etc.).
+                Valeurs absentes: None/NaN.
+            rounded: arrondir comme calculate_risk (round Python, 2 décimales / 1 pour le %)
+
+        Returns:
+            Dict de tableaux: gail_relative_risk, lifestyle_adjustment, risk_5_years,
+            risk_gail_pure, lifestyle_adjustment_percent, risk_category,
+            average_risk_for_age, risk_relative, clinical_significance.
+            Les valeurs sont identiques à celles de calculate_risk, ligne par ligne.
+        """
+        batch = self._prepare_batch(columns)
+        age = batch['age']
+
+        rr_multiplier = self._relative_risk_batch(
+            age, batch['age_menarche'], batch['age_first_birth'], batch['previous_biopsies'],
+            batch['atypical_hyperplasia'], batch['first_degree_relatives']
+        )
+        risk_gail_pure = self._absolute_risk_5_years_batch(age, rr_multiplier)
+        lifestyle_adjustment = self._lifestyle_adjustment_batch(
+            age, batch['bmi'], batch['alcohol_consumption'], batch['exercise_minutes_per_week'],
+            batch['smoking_status'], batch['hormone_therapy']
+        )
+        result = self._finalize_batch(age, rr_multiplier, risk_gail_pure, lifestyle_adjustment, rounded)
+
+        # Risque à vie: NaN tant que l'intégration n'est pas validée (comme None dans calculate_risk)
+        if not self.absolute_risk_validated:
+            result['risk_lifetime'] = np.full(age.shape, np.nan)
+            return result
+        covariate_log_rr = self._covariate_log_rr_batch(batch)
+        risk_lifetime = self._absolute_risk_horizon_batch(
+            age, covariate_log_rr, np.full(age.shape, LIFETIME_AGE), lifestyle_adjustment
+        )
+        result['risk_lifetime'] = _apply_exact(lambda value: round(value, 2), risk_lifetime) if rounded else risk_lifetime
+        return result
+
+    def simulate_lifestyle(self, user_data: Dict, factor_values: Dict, max_points: int = MAX_SIMULATION_POINTS) -> Dict:
+        """
+        Simulation "et si" sur les facteurs de mode de vie modifiables
+
+        Le profil de base, toute la grille (produit cartésien des valeurs demandées) et les
+        courbes marginales (un seul facteur varie, les autres restent au profil de base)
+        sont évalués ensemble en un seul appel à calculate_risk_batch.
+
+        Args:
+            user_data: profil de base, mêmes clés que calculate_risk
+            factor_values: {facteur: liste de valeurs} pour tout ou partie de LIFESTYLE_FACTORS
+                (None dans une liste = facteur non renseigné)
+            max_points: taille maximale de la grille
+
+        Returns:
+            Dict avec base, axes, surface (tableaux imbriqués dans l'ordre des axes),
+            marginal_impact par facteur et best_scenario (point de la grille au risque minimal)
+        """
+        unknown = set(factor_values) - set(LIFESTYLE_FACTORS)
+        if unknown:
+            raise ValueError(f"Facteurs non modifiables ou inconnus: {', '.join(sorted(unknown))}")
+        axes = {name: list(factor_values[name]) for name in LIFESTYLE_FACTORS if factor_values.get(name)}
+        if not axes:
+            raise ValueError("Au moins un facteur de mode de vie doit être simulé")
+        for value in axes.get('smoking_status', []):
+            if value is not None and value not in SMOKING_CATEGORIES:
+                raise ValueError(f"Statut tabagique invalide: {value}")
+
+        shape = tuple(len(values) for values in axes.values())
+        grid_size = int(np.prod(shape))
+        if grid_size > max_points:
+            raise ValueError(f"Grille trop grande ({grid_size} points, maximum {max_points})")
+
+        # Lignes: [base] + [grille] + [courbe marginale de chaque facteur]
+        marginal_sizes = [len(values) for values in axes.values()]
+        total = 1 + grid_size + sum(marginal_sizes)
+        columns = {name: [user_data.get(name)] * total for name in GAIL_FACTORS if name in user_data}
+        columns.setdefault('age', [50] * total)
+        grid_indices = [indices.reshape(-1) for indices in np.indices(shape)]
+        offset = 1 + grid_size
+        for name in LIFESTYLE_FACTORS:
+            column = np.full(total, user_data.get(name), dtype=object)
+            if name in axes:
+                axis = np.empty(len(axes[name]), dtype=object)
+                axis[:] = axes[name]
+                column[1:1 + grid_size] = axis[grid_indices[list(axes).index(name)]]
+            columns[name] = column
+        for name, size in zip(axes, marginal_sizes):
+            columns[name][offset:offset + size] = axes[name]
+            offset += size
+
+        result = self.calculate_risk_batch(columns)
+        risk_5_years = result['risk_5_years']
+        base_5_years = float(risk_5_years[0])
+        # Risque à vie non validé: None partout dans la simulation
+        risk_lifetime = result['risk_lifetime'] if self.absolute_risk_validated else None
+
+        def lifetime_values(rows):
+            return risk_lifetime[rows].tolist() if risk_lifetime is not None else None
+
+        base_lifetime = float(risk_lifetime[0]) if risk_lifetime is not None else None
+
+        grid = slice(1, 1 + grid_size)
+        best = int(np.argmin(risk_5_years[grid]))
+        best_point = [int(indices[best]) for indices in grid_indices]
+
+        marginal_impact = {}
+        offset = 1 + grid_size
+        for name, size in zip(axes, marginal_sizes):
+            rows = slice(offset, offset + size)
+            offset += size
+            curve_5_years = risk_5_years[rows]
+            best_index = int(np.argmin(curve_5_years))
+            marginal_impact[name] = {
+                'values': axes[name],
+                'risk_5_years': curve_5_years.tolist(),
+                'risk_lifetime': lifetime_values(rows),
+                'delta_5_years': [round(value - base_5_years, 2) for value in curve_5_years.tolist()],
+                'delta_lifetime': ([round(value - base_lifetime, 2) for value in lifetime_values(rows)]
+                                   if risk_lifetime is not None else None),
+                'best_value': axes[name][best_index],
+                'max_reduction_5_years': round(base_5_years - float(curve_5_years[best_index]), 2),
+            }
+
+        return {
+            'base': {
+                'risk_5_years': base_5_years,
+                'risk_lifetime': base_lifetime,
+                'risk_gail_pure': float(result['risk_gail_pure'][0]),
+                'risk_category': result['risk_category'][0],
+            },
+            'axes': axes,
+            'surface': {
+                'risk_5_years': risk_5_years[grid].reshape(shape).tolist(),
+                'risk_lifetime': risk_lifetime[grid].reshape(shape).tolist() if risk_lifetime is not None else None,
+                'risk_category': result['risk_category'][grid].reshape(shape).tolist(),
+            },
+            'marginal_impact': marginal_impact,
+            'best_scenario': {
+                'factors': {name: axes[name][index] for name, index in zip(axes, best_point)},
+                'risk_5_years': float(risk_5_years[grid][best]),
+                'risk_lifetime': float(risk_lifetime[grid][best]) if risk_lifetime is not None else None,
+                'reduction_5_years': round(base_5_years - float(risk_5_years[grid][best]), 2),
+            },
+            'points_evaluated': total,
+        }
+
+    def _finalize_batch(self, age, rr_multiplier, risk_gail_pure, lifestyle_adjustment, rounded: bool) -> Dict[str, np.ndarray]:
+        """Grandeurs dérivées du risque Gail pur et de l'ajustement mode de vie (comme calculate_risk)"""
+        risk_5_years = risk_gail_pure * lifestyle_adjustment
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lifestyle_impact_percent = np.where(risk_gail_pure > 0, ((risk_5_years / risk_gail_pure) - 1.0) * 100, 0)
+            average_risk = self._average_risk_for_age_batch(age)
+            risk_relative = np.where(average_risk > 0, risk_5_years / average_risk, 1.0)
+
+        clinical_significance = np.select(
+            [risk_relative >= 3.0, risk_relative >= 2.0, risk_relative >= 1.5],
+            ['RISQUE TRÈS ÉLEVÉ', 'RISQUE ÉLEVÉ', 'RISQUE MODÉRÉMENT ÉLEVÉ'],
+            'RISQUE NORMO-PROBABLE'
+        ).astype(object)
+
+        result = {
+            'gail_relative_risk': rr_multiplier,
+            'lifestyle_adjustment': lifestyle_adjustment,
+            'risk_5_years': risk_5_years,
+            'risk_gail_pure': risk_gail_pure,
+            'lifestyle_adjustment_percent': lifestyle_impact_percent,
+            'risk_category': self._categorize_risk_batch(risk_5_years),
+            'average_risk_for_age': average_risk,
+            'risk_relative': risk_relative,
+            'clinical_significance': clinical_significance,
+        }
+        if rounded:
+            for name, digits in (('risk_5_years', 2), ('risk_gail_pure', 2), ('lifestyle_adjustment_percent', 1),
+                                 ('average_risk_for_age', 2), ('risk_relative', 2)):
+                result[name] = _apply_exact(lambda value, digits=digits: round(value, digits), result[name])
+        return result
+
     def _get_age_group(self, age: int) -> int:
         """Arrondit l'âge à la tranche de 5 ans"""
         return (age // 5) * 5
@@ -670,40 +1419,19 @@ class GailModelRiskCalculator:
         else:
             risk_not_display = f"{risk_not:.1f}"  # Ex: 94.8
         
-        messages = {
-            'Faible': [
-                f"Votre risque est faible",
-                f"Sur 100 femmes avec exactement le même profil que vous, environ {risk_display_str}% (soit moins d'une femme sur 100) développeront un cancer du sein dans les 5 prochaines années." if risk_5_years < 0.01 
-                else f"Sur 100 femmes avec exactement le même profil que vous, environ {risk_display_str}% (soit moins d'une femme sur 100) développeront un cancer du sein dans les 5 prochaines années.",
-                f"Cela veut dire que pratiquement toutes les femmes (plus de {risk_not_display}%) ne le développeront PAS." if risk_5_years < 0.01 
-                else f"Cela veut dire que la grande majorité ({risk_not_display}% ou plus de {100-risk_5_years:.1f} femmes sur 100) ne le développeront PAS.",
-                "Ce résultat est une estimation statistique basée sur des données médicales validées, pas une certitude absolue."
-            ],
-            'Modéré': [
-                f"Votre risque est modéré",
-                f"Sur 100 femmes avec exactement le même profil que vous, environ {risk_display_str}% développeront un cancer du sein dans les 5 ans.",
-                f"Cela signifie que {risk_not:.1f}% ne le développeront PAS.",
-                "Votre risque nécessite une surveillance régulière selon les recommandations médicales."
-            ],
-            'Élevé': [
-                f"Votre risque est élevé",
-                f"Sur 100 femmes avec exactement le même profil que vous, environ {risk_display_str}% développeront un cancer du sein dans les 5 ans.",
-                f"Cela signifie que {risk_not:.1f}% ne le développeront PAS.",
-                "IMPORTANT : Un risque élevé ne signifie PAS que vous aurez automatiquement un cancer.",
-                "La surveillance précoce et régulière est votre meilleure protection. Avec un suivi approprié, la grande majorité des femmes avec un risque élevé ne développeront PAS de cancer.",
-                "Consultez votre médecin ou un oncologue pour mettre en place un plan de surveillance personnalisé."
-            ],
-            'Très élevé': [
-                f"Votre risque est très élevé",
-                f"Sur 100 femmes avec exactement le même profil que vous, environ {risk_display_str}% (soit {risk_5_years:.1f} femmes sur 100) développeront un cancer dans les 5 ans.",
-                f"Mais cela signifie que {risk_not:.1f}% (soit {100-risk_5_years:.1f} femmes sur 100) ne le développeront PAS.",
-                "IMPORTANT : Ce résultat est une ESTIMATION statistique basée sur des modèles validés, pas une certitude absolue.",
-                "La médecine moderne offre d'excellentes options de prévention, de surveillance et de traitement.",
-                "Une surveillance spécialisée et un suivi médical régulier peuvent considérablement améliorer les résultats.",
-                "Nous recommandons fortement de consulter un oncologue ou un généticien médical dès que possible pour discuter de ces résultats et établir un plan personnalisé."
-            ]
+        # Seul le message de la catégorie retenue est formaté (modèles pré-rendus une fois)
+        if category == 'Faible' and risk_5_years < 0.01:
+            templates = EDUCATIONAL_TEMPLATES['Faible_very_low']
+        else:
+            templates = EDUCATIONAL_TEMPLATES.get(category, EDUCATIONAL_TEMPLATES['Modéré'])
+        values = {
+            'risk': risk_5_years,
+            'risk_display': risk_display_str,
+            'risk_not': risk_not,
+            'risk_not_display': risk_not_display,
+            'complement': 100 - risk_5_years,
         }
-        return messages.get(category, messages['Modéré'])
+        return [template.format(**values) for template in templates]
 
 
 # Exemple d'utilisation
@@ -17,13 +17,74 @@ import math
 import warnings
 warnings.filterwarnings("ignore")
 
+from app.ml.view_engine import ViewEngine
+
+BI_RADS_LABELS = ['BI-RADS 1', 'BI-RADS 2', 'BI-RADS 3', 'BI-RADS 4', 'BI-RADS 5']
+DENSITY_LABELS = ['DENSITY A', 'DENSITY B', 'DENSITY C', 'DENSITY D']
+
+
+def build_classifier_head(embedding_dim: int, num_classes: int) -> nn.Module:
+    """Architecture des têtes de classification de best_medsiglip_model.pth"""
+    return nn.Sequential(
+        nn.Linear(embedding_dim, 512),
+        nn.ReLU(),
+        nn.Dropout(0.3),
+        nn.Linear(512, 256),
+        nn.ReLU(),
+        nn.Dropout(0.3),
+        nn.Linear(256, num_classes)
+    )
+
+PREPROCESSING_VERSION = "gray-512-clahe3-448-v1"
+
+
+def preprocess_mammogram(image_path: str) -> np.ndarray:
+    """
+    Prétraitement commun à l'inférence et à l'entraînement (feature store):
+    niveaux de gris, 512x512, CLAHE, 448x448. Retourne un tableau float32 2D dans [0, 1].
+    Toute modification doit incrémenter PREPROCESSING_VERSION.
+    """
+    # Charger l'image avec PIL (comme dans l'entraînement)
+    image = Image.open(image_path)
+    
+    # Convertir en niveaux de gris si nécessaire (comme dans l'entraînement)
+    if image.mode != 'L':
+        image = image.convert('L')
+    
+    # Convertir en numpy array
+    image_array = np.array(image, dtype=np.float32)
+    
+    # Redimensionner à 512x512 d'abord (comme dans l'entraînement)
+    image_array = cv2.resize(image_array, (512, 512), interpolation=cv2.INTER_LANCZOS4)
+    
+    # Normaliser à [0, 1]
+    image_array = image_array / 255.0
+    
+    # Appliquer CLAHE pour l'amélioration du contraste (comme dans l'entraînement)
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    image_array = clahe.apply((image_array * 255).astype(np.uint8))
+    image_array = image_array.astype(np.float32) / 255.0
+    
+    # Redimensionner à 448x448 pour MedSigLIP
+    return cv2.resize(image_array, (448, 448), interpolation=cv2.INTER_LANCZOS4)
+
+
 class MedSigLIPInferenceService:
     """
     Service d'inference simplifié pour MedSigLIP
     """
     
-    def __init__(self):
+    def __init__(self, model_path: str = None, model_version: str = "v1.0", annotation_source=None):
+        """
+        Args:
+            model_path: Chemin explicite du checkpoint (registre de modèles). Si None,
+                best_medsiglip_model.pth est recherché dans app/ml/model/
+            model_version: Version du modèle, enregistrée dans MammographyAnalysis.model_version
+            annotation_source: Service déjà chargé dont on réutilise les index d'annotations CSV
+                (évite de relire les CSV lors d'un rechargement à chaud)
+        """
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model_version = model_version
         self.model = None
         self.view_classifier = None
         self.full_model = None  # Modèle complet MedSigLIP avec classificateurs (si nécessaire)
@@ -41,9 +102,9 @@ class MedSigLIPInferenceService:
             Path("app/ml/model/best_medsiglip_model.pth"),  # Relatif depuis backend/
         ]
         
-        # Trouver le premier chemin qui existe
-        self.model_path = None
-        for path in possible_paths:
+        # Trouver le premier chemin qui existe (le chemin explicite du registre est prioritaire)
+        self.model_path = str(Path(model_path).absolute()) if model_path else None
+        for path in ([] if self.model_path else possible_paths):
             if path.exists():
                 self.model_path = str(path.absolute())
                 break
@@ -52,19 +113,31 @@ class MedSigLIPInferenceService:
             # Fallback au chemin par défaut
             self.model_path = str(Path(__file__).parent / "model" / "best_medsiglip_model.pth")
         
-        # Même logique pour le view classifier
+        # Même logique pour le view classifier (celui de la version, sinon celui par défaut)
         view_model_dir = Path(self.model_path).parent
         self.view_model_path = str(view_model_dir / "view_classifier_trained.pth")
+        if not os.path.exists(self.view_model_path):
+            default_view_path = Path(__file__).parent / "model" / "view_classifier_trained.pth"
+            if default_view_path.exists():
+                self.view_model_path = str(default_view_path)
         
         print(f"🔍 Recherche du modèle à: {self.model_path}")
         print(f"🔍 Le fichier existe: {os.path.exists(self.model_path)}")
         
         self.load_model()
         self.load_view_classifier()
-        self.load_annotations()  # Charger les annotations CSV pour vues et zones
         
-        # Créer un index pour recherche rapide
-        self.create_annotation_index()
+        if annotation_source is not None:
+            # Réutiliser les annotations déjà indexées par la version précédente
+            self.breast_annotations = annotation_source.breast_annotations
+            self.finding_annotations = annotation_source.finding_annotations
+            self.view_index = annotation_source.view_index
+            self.finding_index = annotation_source.finding_index
+        else:
+            self.load_annotations()  # Charger les annotations CSV pour vues et zones
+            
+            # Créer un index pour recherche rapide
+            self.create_annotation_index()
     
     def load_model(self):
         """Charge le modèle entraîné"""
@@ -211,45 +284,21 @@ class MedSigLIPInferenceService:
             
             # Créer et charger le classificateur BI-RADS
             if 'bi_rads_classifier' in self.checkpoint:
-                self.bi_rads_classifier = nn.Sequential(
-                    nn.Linear(embedding_dim, 512),
-                    nn.ReLU(),
-                    nn.Dropout(0.3),
-                    nn.Linear(512, 256),
-                    nn.ReLU(),
-                    nn.Dropout(0.3),
-                    nn.Linear(256, num_bi_rads)
-                ).to(self.device)
+                self.bi_rads_classifier = build_classifier_head(embedding_dim, num_bi_rads).to(self.device)
                 self.bi_rads_classifier.load_state_dict(self.checkpoint['bi_rads_classifier'])
                 self.bi_rads_classifier.eval()
                 print("   ✅ Votre classificateur BI-RADS chargé directement (entraîné sur le dataset complet)")
             
             # Créer et charger le classificateur Densité
             if 'density_classifier' in self.checkpoint:
-                self.density_classifier = nn.Sequential(
-                    nn.Linear(embedding_dim, 512),
-                    nn.ReLU(),
-                    nn.Dropout(0.3),
-                    nn.Linear(512, 256),
-                    nn.ReLU(),
-                    nn.Dropout(0.3),
-                    nn.Linear(256, num_density)
-                ).to(self.device)
+                self.density_classifier = build_classifier_head(embedding_dim, num_density).to(self.device)
                 self.density_classifier.load_state_dict(self.checkpoint['density_classifier'])
                 self.density_classifier.eval()
                 print("   ✅ Votre classificateur Densité chargé directement (entraîné sur le dataset complet)")
             
             # Créer et charger le classificateur Vue si disponible
             if 'view_classifier' in self.checkpoint:
-                self.view_classifier_loaded = nn.Sequential(
-                    nn.Linear(embedding_dim, 512),
-                    nn.ReLU(),
-                    nn.Dropout(0.3),
-                    nn.Linear(512, 256),
-                    nn.ReLU(),
-                    nn.Dropout(0.3),
-                    nn.Linear(256, num_view)
-                ).to(self.device)
+                self.view_classifier_loaded = build_classifier_head(embedding_dim, num_view).to(self.device)
                 self.view_classifier_loaded.load_state_dict(self.checkpoint['view_classifier'])
                 self.view_classifier_loaded.eval()
                 print("   ✅ Votre classificateur Vue chargé directement")
@@ -282,45 +331,13 @@ class MedSigLIPInferenceService:
             self.use_direct_classifiers = False
     
     def load_view_classifier(self):
-        """Charge le classifieur de vues entraîné"""
-        try:
-            if os.path.exists(self.view_model_path):
-                print(f"Chargement du classifieur de vues depuis {self.view_model_path}")
-                checkpoint = torch.load(self.view_model_path, map_location=self.device)
-                
-                # Créer le modèle
-                class ViewClassifier(nn.Module):
-                    def __init__(self, num_views=4):
-                        super().__init__()
-                        self.model = nn.Sequential(
-                            nn.Linear(32, 256),
-                            nn.ReLU(),
-                            nn.Dropout(0.3),
-                            nn.Linear(256, 128),
-                            nn.ReLU(),
-                            nn.Dropout(0.3),
-                            nn.Linear(128, num_views)
-                        )
-                    def forward(self, x):
-                        return self.model(x)
-                
-                self.view_classifier = ViewClassifier(num_views=checkpoint['num_view_classes'])
-                self.view_classifier.load_state_dict(checkpoint['view_classifier'])
-                self.view_classifier.to(self.device)
-                self.view_classifier.eval()
-                
-                self.view_classes = checkpoint['view_classes']
-                self.view_to_idx = checkpoint['view_to_idx']
-                self.idx_to_view = checkpoint['idx_to_view']
-                
-                print(f"✓ Classifieur de vues chargé ({checkpoint['best_val_acc']*100:.1f}% précision)")
-            else:
-                print(f"⚠️ Classifieur de vues non trouvé à {self.view_model_path}")
-                print("  Les images non trouvées dans CSV utiliseront CV de base")
-                self.view_classifier = None
-        except Exception as e:
-            print(f"Erreur lors du chargement du classifieur de vues: {e}")
-            self.view_classifier = None
+        """Charge le classifieur de vues entraîné dans le moteur de vues unifié"""
+        self.view_engine = ViewEngine(device=self.device)
+        self.view_engine.load(self.view_model_path)
+        # Compatibilité: exposer le classificateur et ses labels comme avant
+        self.view_classifier = self.view_engine.classifier
+        self.view_classes = self.view_engine.view_classes
+        self.idx_to_view = self.view_engine.idx_to_view
     
     def load_annotations(self):
         """Charge les annotations CSV pour vues et zones d'intérêt"""
@@ -443,16 +460,16 @@ class MedSigLIPInferenceService:
             # Extraire l'image_id du chemin
             image_id = self._extract_image_id_from_path(image_path)
             
-            # Chercher la vue dans les annotations CSV
-            view_pred, view_confidence = self._get_view_from_annotations(image_id, image_path)
-            
-            # Charger et prétraiter l'image
+            # Charger et prétraiter l'image (une seule fois pour vue, BI-RADS et densité)
             image_array = self._load_and_preprocess_image(image_path)
             
             if image_array is None:
                 print("❌ Erreur lors du chargement de l'image")
                 raise ValueError("Impossible de charger l'image - elle ne semble pas être une mammographie valide")
             
+            # Vue: annotations CSV ou moteur de vues sur l'image déjà prétraitée
+            view_pred, view_confidence = self.classify_views([image_array], [image_id])[0]
+            
             # Utiliser le vrai modèle pour la prédiction (BI-RADS et densité uniquement)
             bi_rads_pred, bi_rads_confidence, density_pred, density_confidence = self._predict_with_model(image_array)
             
@@ -491,23 +508,80 @@ class MedSigLIPInferenceService:
     def predict_batch(self, image_paths: list) -> list:
         """
         Prédiction pour un batch d'images
+        Les vues de toutes les images valides sont classées en un seul passage
         """
-        results = []
+        results = [None] * len(image_paths)
+        loaded = []  # (index, image_id, image_array)
+        
+        for i, image_path in enumerate(image_paths):
+            image_array = self._load_and_preprocess_image(image_path)
+            if image_array is None:
+                results[i] = {
+                    "bi_rads": {"prediction": "BI-RADS 2", "confidence": 0.5},
+                    "density": {"prediction": "DENSITY B", "confidence": 0.5},
+                    "error": "Impossible de charger l'image - elle ne semble pas être une mammographie valide"
+                }
+                continue
+            loaded.append((i, self._extract_image_id_from_path(image_path), image_array))
         
-        for image_path in image_paths:
+        views = self.classify_views([item[2] for item in loaded], [item[1] for item in loaded])
+        
+        for (i, image_id, image_array), (view_pred, view_confidence) in zip(loaded, views):
+            image_path = image_paths[i]
             try:
-                result = self.predict_single_image(image_path)
-                results.append(result)
+                bi_rads_pred, bi_rads_confidence, density_pred, density_confidence = self._predict_with_model(image_array)
+                results[i] = {
+                    "bi_rads": {"prediction": bi_rads_pred, "confidence": bi_rads_confidence},
+                    "density": {"prediction": density_pred, "confidence": density_confidence},
+                    "view": {"prediction": view_pred, "confidence": view_confidence},
+                    "detected_regions": self._get_regions_from_annotations(image_id, image_path),
+                    "model_version": "MedSigLIP-448 (Entraîné avec détection des vues et régions)",
+                    "image_processed": True,
+                    "model_used": True
+                }
             except Exception as e:
                 print(f"Erreur pour l'image {image_path}: {e}")
-                results.append({
+                results[i] = {
                     "bi_rads": {"prediction": "BI-RADS 2", "confidence": 0.5},
                     "density": {"prediction": "DENSITY B", "confidence": 0.5},
                     "error": str(e)
-                })
+                }
         
         return results
     
+    def classify_views(self, image_arrays: list, image_ids: list = None) -> list:
+        """
+        Détermine la vue (CC_L, CC_R, MLO_L, MLO_R) de toutes les images d'une étude
+        
+        Les annotations CSV (vérité terrain) sont prioritaires; les autres images
+        passent ensemble dans le moteur de vues (un seul forward batché).
+        Retourne une liste de tuples (vue, confiance) alignée sur image_arrays.
+        """
+        image_ids = image_ids or [None] * len(image_arrays)
+        views = [None] * len(image_arrays)
+        pending = []
+        
+        for i, image_id in enumerate(image_ids):
+            if image_id and image_id in self.view_index:
+                views[i] = (self.view_index[image_id]['view'], 1.0)  # Annotation réelle
+                print(f"✓ Vue trouvée dans annotations CSV: {views[i][0]}")
+            else:
+                pending.append(i)
+        
+        if pending:
+            try:
+                predicted = self.view_engine.classify([image_arrays[i] for i in pending])
+                source = "modèle entraîné" if self.view_engine.has_classifier else "heuristiques"
+                for i, (view_pred, confidence) in zip(pending, predicted):
+                    views[i] = (view_pred, confidence)
+                print(f"✓ {len(pending)} vue(s) classée(s) en un passage ({source}): {[v[0] for v in predicted]}")
+            except Exception as e:
+                print(f"Erreur classification des vues: {e}")
+                for i in pending:
+                    views[i] = ("CC_L", 0.5)
+        
+        return views
+    
     def _validate_mammography_image(self, image_array: np.ndarray):
         """
         Valide si l'image ressemble à une mammographie
@@ -576,29 +650,7 @@ class MedSigLIPInferenceService:
         try:
             print(f"   📷 Chargement de l'image: {os.path.basename(image_path)}")
             
-            # Charger l'image avec PIL (comme dans l'entraînement)
-            image = Image.open(image_path)
-            
-            # Convertir en niveaux de gris si nécessaire (comme dans l'entraînement)
-            if image.mode != 'L':
-                image = image.convert('L')
-            
-            # Convertir en numpy array
-            image_array = np.array(image, dtype=np.float32)
-            
-            # Redimensionner à 512x512 d'abord (comme dans l'entraînement)
-            image_array = cv2.resize(image_array, (512, 512), interpolation=cv2.INTER_LANCZOS4)
-            
-            # Normaliser à [0, 1]
-            image_array = image_array / 255.0
-            
-            # Appliquer CLAHE pour l'amélioration du contraste (comme dans l'entraînement)
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-            image_array = clahe.apply((image_array * 255).astype(np.uint8))
-            image_array = image_array.astype(np.float32) / 255.0
-            
-            # Redimensionner à 448x448 pour MedSigLIP
-            image_array = cv2.resize(image_array, (448, 448), interpolation=cv2.INTER_LANCZOS4)
+            image_array = preprocess_mammogram(image_path)
             
             # Convertir en RGB pour MedSigLIP
             image_rgb = np.stack([image_array] * 3, axis=-1)
@@ -785,8 +837,79 @@ class MedSigLIPInferenceService:
             # Retourner un embedding de zéros de la bonne dimension
             return torch.zeros(1, 1152, dtype=torch.float32).to(self.device)
     
-    def _predict_with_model(self, image_array: np.ndarray) -> tuple:
-        """Utilise directement VOS classificateurs entraînés"""
+    def _medsiglip_embedding(self, image_array: np.ndarray):
+        """
+        Embedding MedSigLIP (1, D) par le modèle de base (l'image passe par un PNG temporaire)
+        None si le modèle de base n'est pas chargé ou si l'extraction échoue
+        """
+        if self.full_model is None or not hasattr(self.full_model, 'get_image_embedding'):
+            return None
+        import tempfile
+        img_uint8 = image_array if image_array.dtype == np.uint8 else (image_array * 255).astype(np.uint8)
+        if img_uint8.ndim == 2:
+            img_uint8 = cv2.cvtColor(img_uint8, cv2.COLOR_GRAY2RGB)
+        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
+            temp_path = tmp_file.name
+        try:
+            cv2.imwrite(temp_path, img_uint8)
+            return self.full_model.get_image_embedding(temp_path)
+        finally:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    def _local_embedding(self, image_array: np.ndarray) -> torch.Tensor:
+        """Embedding (1, D) de l'extracteur local, tronqué ou complété à la dimension des têtes"""
+        embedding_dim = getattr(self, '_embedding_dim', None) or 1152
+        embedding = self._extract_embedding_features(image_array)
+        if embedding is None:
+            raise ValueError("L'extraction de features a échoué")
+        if embedding.shape[1] != embedding_dim:
+            print(f"   ⚠️ Dimension mismatch: embedding={embedding.shape[1]}, attendu={embedding_dim}")
+            if embedding.shape[1] > embedding_dim:
+                embedding = embedding[:, :embedding_dim]
+            else:
+                # Padding avec zéros
+                padding = torch.zeros(1, embedding_dim - embedding.shape[1], dtype=embedding.dtype, device=embedding.device)
+                embedding = torch.cat([embedding, padding], dim=1)
+        return embedding
+
+    def compute_embedding(self, image_array: np.ndarray) -> torch.Tensor:
+        """
+        Embedding (1, D) d'une image prétraitée, tel que consommé par les têtes:
+        MedSigLIP si le modèle de base est chargé, sinon l'extracteur local
+        (mêmes fonctions que _predict_with_model)
+        """
+        embedding = self._medsiglip_embedding(image_array)
+        if embedding is not None:
+            return embedding
+        return self._local_embedding(image_array)
+
+    def predict_heads_batch(self, embeddings: torch.Tensor) -> tuple:
+        """Probabilités BI-RADS et densité (N, C) pour un lot d'embeddings (N, D), en un seul forward"""
+        with torch.no_grad():
+            embeddings = embeddings.to(self.device)
+            bi_rads_probs = torch.softmax(self.bi_rads_classifier(embeddings), dim=-1).cpu().numpy()
+            density_probs = torch.softmax(self.density_classifier(embeddings), dim=-1).cpu().numpy()
+        return bi_rads_probs, density_probs
+
+    def raw_confidences(self, embedding: torch.Tensor) -> tuple:
+        """
+        Confiances brutes (softmax de la classe prédite) des têtes BI-RADS et densité pour
+        un embedding (1, D), sans l'ajustement des confiances >= 0.999 de _predict_with_model
+        """
+        with torch.no_grad():
+            bi_rads_probs = torch.softmax(self.bi_rads_classifier(embedding), dim=-1)
+            density_probs = torch.softmax(self.density_classifier(embedding), dim=-1)
+        return float(bi_rads_probs.max()), float(density_probs.max())
+    
+    def _predict_with_model(self, image_array: np.ndarray, return_embedding: bool = False) -> tuple:
+        """
+        Utilise directement VOS classificateurs entraînés
+        Avec return_embedding=True, l'embedding (1, D) est ajouté en 5e élément du tuple
+        (réutilisé par l'évaluation shadow sans refaire le prétraitement)
+        """
         try:
             # PRIORITÉ 1: Utiliser directement vos classificateurs avec embeddings MedSigLIP si disponible
             print(f"\n🔍🔍🔍 DEBUG COMPLET DU MODÈLE:")
@@ -804,29 +927,9 @@ class MedSigLIPInferenceService:
                 if self.full_model is not None and hasattr(self.full_model, 'get_image_embedding'):
                     print("🤖✅ UTILISATION DE VOTRE MODÈLE BEST avec embeddings MedSigLIP réels")
                     try:
-                        # Sauvegarder temporairement l'image pour utiliser get_image_embedding
-                        import tempfile
-                        temp_path = None
-                        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
-                            temp_path = tmp_file.name
-                            import cv2
-                            if image_array.dtype != np.uint8:
-                                img_uint8 = (image_array * 255).astype(np.uint8)
-                            else:
-                                img_uint8 = image_array
-                            if len(img_uint8.shape) == 2:
-                                img_uint8 = cv2.cvtColor(img_uint8, cv2.COLOR_GRAY2RGB)
-                            cv2.imwrite(temp_path, img_uint8)
-                        
                         # Extraire l'embedding MedSigLIP réel
                         print(f"   📥 Extraction de l'embedding MedSigLIP depuis le modèle de base...")
-                        embedding = self.full_model.get_image_embedding(temp_path)
-                        
-                        # Nettoyer
-                        try:
-                            os.unlink(temp_path)
-                        except:
-                            pass
+                        embedding = self._medsiglip_embedding(image_array)
                         
                         if embedding is not None:
                             print(f"   ✅ Embedding extrait: shape={embedding.shape}, dtype={embedding.dtype}")
@@ -879,6 +982,8 @@ class MedSigLIPInferenceService:
                                     bi_rads_confidence = 0.75  # Ajuster pour refléter l'incertitude
                                     print(f"   🔧 Confiance ajustée à {bi_rads_confidence:.2%}")
                             
+                            if return_embedding:
+                                return bi_rads_pred, bi_rads_confidence, density_pred, density_confidence, embedding
                             return bi_rads_pred, bi_rads_confidence, density_pred, density_confidence
                     except Exception as e:
                         print(f"⚠️ Erreur avec embeddings MedSigLIP, passage à l'extracteur local: {e}")
@@ -897,22 +1002,8 @@ class MedSigLIPInferenceService:
                         print(f"   ⚠️ _embedding_dim non défini, utilisation de la valeur par défaut 1152")
                         self._embedding_dim = 1152
                     
-                    # Extraire les features de l'image (approximation)
-                    embedding = self._extract_embedding_features(image_array)
-                    
-                    if embedding is None:
-                        raise ValueError("L'extraction de features a échoué")
-                    
-                    # Vérifier la dimension de l'embedding
-                    if embedding.shape[1] != self._embedding_dim:
-                        print(f"   ⚠️ Dimension mismatch: embedding={embedding.shape[1]}, attendu={self._embedding_dim}")
-                        # Ajuster si possible
-                        if embedding.shape[1] > self._embedding_dim:
-                            embedding = embedding[:, :self._embedding_dim]
-                        else:
-                            # Padding avec zéros
-                            padding = torch.zeros(1, self._embedding_dim - embedding.shape[1], dtype=embedding.dtype, device=embedding.device)
-                            embedding = torch.cat([embedding, padding], dim=1)
+                    # Extraire les features de l'image (approximation), à la dimension des têtes
+                    embedding = self._local_embedding(image_array)
                     
                     print(f"   📊 Embedding extrait: shape={embedding.shape}, dtype={embedding.dtype}")
                     print(f"   📊 Statistiques embedding: mean={embedding.mean().item():.4f}, std={embedding.std().item():.4f}")
@@ -966,6 +1057,8 @@ class MedSigLIPInferenceService:
                             bi_rads_confidence = 0.70  # Confiance réaliste pour signaler l'incertitude
                             print(f"   🔧 Confiance ajustée à {bi_rads_confidence:.2%} pour refléter l'incertitude")
                     
+                    if return_embedding:
+                        return bi_rads_pred, bi_rads_confidence, density_pred, density_confidence, embedding
                     return bi_rads_pred, bi_rads_confidence, density_pred, density_confidence
                     
                 except Exception as e:
@@ -1004,124 +1097,6 @@ class MedSigLIPInferenceService:
             )
     
     
-    def _extract_view_features(self, image_array: np.ndarray) -> np.ndarray:
-        """Extrait les features pour la détection des vues (comme dans l'entraînement)"""
-        try:
-            if image_array.dtype != np.uint8:
-                image_array = (image_array * 255).astype(np.uint8)
-            gray_image = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-            
-            # Redimensionner à 448x448
-            gray_image = cv2.resize(gray_image, (448, 448))
-            gray_image = gray_image.astype(np.float32) / 255.0
-            
-            # Normaliser
-            gray_image = gray_image.astype(np.float32) / 255.0
-            
-            # Appliquer CLAHE (comme dans preprocessing)
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-            gray_image = clahe.apply((gray_image * 255).astype(np.uint8))
-            gray_image = gray_image.astype(np.float32) / 255.0
-            
-            # Extraire des features
-            mean = np.mean(gray_image)
-            std = np.std(gray_image)
-            q25 = np.percentile(gray_image, 25)
-            q75 = np.percentile(gray_image, 75)
-            
-            # Symétrie
-            h_sym = np.mean(gray_image[:, :224]) - np.mean(gray_image[:, 224:])
-            v_sym = np.mean(gray_image[:224, :]) - np.mean(gray_image[224:, :])
-            
-            # Densité de contours
-            edges = cv2.Canny((gray_image * 255).astype(np.uint8), 50, 150)
-            edge_density = np.sum(edges > 0) / edges.size
-            
-            # Aspect ratio (toujours 1.0 pour 448x448, mais on garde pour compatibilité)
-            aspect = 1.0
-            
-            # Histogram features (premiers 16 bins)
-            hist = cv2.calcHist([gray_image], [0], None, [32], [0, 1])
-            features = list(hist.flatten()[:16])
-            
-            # Ajouter les autres features
-            features.extend([mean, std, q25, q75, h_sym, v_sym, edge_density, aspect])
-            
-            # Gradient features
-            grad_x = cv2.Sobel(gray_image, cv2.CV_64F, 1, 0, ksize=3)
-            grad_y = cv2.Sobel(gray_image, cv2.CV_64F, 0, 1, ksize=3)
-            gradient_magnitude = np.sqrt(grad_x**2 + grad_y**2)
-            features.append(np.mean(gradient_magnitude))
-            features.append(np.std(gradient_magnitude))
-            
-            return np.array(features[:32])  # Garder 32 features comme entraîné
-            
-        except Exception as e:
-            print(f"Erreur extraction features: {e}")
-            return np.zeros(32)
-    
-    def _analyze_view_features(self, image_array: np.ndarray) -> tuple:
-        """Détecte la vue mammographique en utilisant computer vision"""
-        try:
-            if image_array.dtype != np.uint8:
-                image_array = (image_array * 255).astype(np.uint8)
-            gray_image = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-            
-            height, width = gray_image.shape
-            aspect_ratio = width / height
-            
-            # Analyser la symétrie horizontale et verticale
-            center_x, center_y = width // 2, height // 2
-            left_half = gray_image[:, :center_x]
-            right_half = gray_image[:, center_x:]
-            top_half = gray_image[:center_y, :]
-            bottom_half = gray_image[center_y:, :]
-            
-            left_brightness = np.mean(left_half)
-            right_brightness = np.mean(right_half)
-            top_brightness = np.mean(top_half)
-            bottom_brightness = np.mean(bottom_half)
-            
-            horizontal_symmetry = abs(left_brightness - right_brightness)
-            vertical_symmetry = abs(top_brightness - bottom_brightness)
-            
-            # Analyser la densité des contours
-            edges = cv2.Canny(gray_image, 50, 150)
-            edge_density = np.sum(edges > 0) / edges.size
-            
-            # Détecter le côté (L/R)
-            brightness_diff = (left_brightness - right_brightness) / np.mean(gray_image)
-            if brightness_diff > 0.05:  # Plus lumineux à gauche
-                side = "L"
-            elif brightness_diff < -0.05:  # Plus lumineux à droite
-                side = "R"
-            else:
-                side = "L"  # Default gauche
-            
-            # Détecter le type de vue (CC/MLO)
-            # CC est généralement plus symétrique horizontalement
-            # MLO a généralement une forme plus rectangulaire avec plus de contours
-            
-            if aspect_ratio > 1.3 or aspect_ratio < 0.7:
-                view_type = "MLO"  # Rectangulaire
-            elif horizontal_symmetry < vertical_symmetry * 0.7:
-                view_type = "CC"  # Symétrique horizontalement
-            elif edge_density > 0.13:
-                view_type = "MLO"  # Beaucoup de contours
-            else:
-                view_type = "CC"  # Moins de contours
-            
-            view_pred = f"{view_type}_{side}"
-            confidence = 0.75  # Confiance modérée
-            
-            print(f"✓ Vue détectée: {view_pred} (confiance: {confidence:.2f})")
-            
-            return view_pred, confidence
-                
-        except Exception as e:
-            print(f"Erreur lors de l'analyse des caractéristiques de vue: {e}")
-            return "CC_L", 0.5
-    
     def _get_demo_prediction(self) -> dict:
         """Retourne une prédiction de démonstration"""
         bi_rads_pred, bi_rads_confidence = self._simulate_bi_rads_prediction()
@@ -1268,57 +1243,6 @@ class MedSigLIPInferenceService:
             print(f"Erreur extraction image_id: {e}")
             return None
     
-    def _get_view_from_annotations(self, image_id: str, image_path: str) -> tuple:
-        """Récupère la vue depuis les annotations CSV ou le modèle entraîné"""
-        try:
-            # 1. Essayer d'abord les annotations CSV (100% fiable)
-            if image_id and image_id in self.view_index:
-                view_info = self.view_index[image_id]
-                view_pred = view_info['view']
-                view_confidence = 1.0  # 100% de confiance car c'est une annotation réelle
-                print(f"✓ Vue trouvée dans annotations CSV: {view_pred}")
-                return view_pred, view_confidence
-            
-            # 2. Fallback: utiliser le modèle entraîné si disponible
-            if self.view_classifier is not None:
-                print(f"⚠️ Image non dans CSV, utilisation du modèle entraîné")
-                return self._predict_view_with_model(image_path)
-            
-            # 3. Fallback final: computer vision simple
-            print(f"⚠️ Utilisation du computer vision de base")
-            return self._analyze_view_features_fallback(image_path)
-                
-        except Exception as e:
-            print(f"Erreur récupération vue: {e}")
-            return "CC_L", 0.5
-    
-    def _predict_view_with_model(self, image_path: str) -> tuple:
-        """Utilise le modèle entraîné pour prédire la vue"""
-        try:
-            # Extraire les features (même méthode que l'entraînement)
-            features = self._extract_view_features(self._load_and_preprocess_image(image_path))
-            
-            if features is None:
-                return "CC_L", 0.5
-            
-            # Prédire avec le modèle
-            features_tensor = torch.FloatTensor(features).unsqueeze(0).to(self.device)
-            
-            with torch.no_grad():
-                outputs = self.view_classifier(features_tensor)
-                probs = torch.softmax(outputs, dim=1)
-                pred_idx = torch.argmax(probs, dim=1).item()
-                confidence = probs[0][pred_idx].item()
-            
-            view_pred = self.idx_to_view[pred_idx]
-            print(f"✓ Vue prédite par le modèle: {view_pred} (confiance: {confidence:.2f})")
-            
-            return view_pred, confidence
-            
-        except Exception as e:
-            print(f"Erreur prédiction vue avec modèle: {e}")
-            return "CC_L", 0.5
-    
     def _get_regions_from_annotations(self, image_id: str, image_path: str) -> list:
         """Récupère les zones d'intérêt depuis les annotations CSV"""
         try:
@@ -1375,20 +1299,6 @@ class MedSigLIPInferenceService:
             print(f"Erreur récupération régions: {e}")
             return []
     
-    def _analyze_view_features_fallback(self, image_path: str) -> tuple:
-        """Fallback: utilise computer vision si annotations non disponibles"""
-        try:
-            # Charger l'image pour CV
-            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-            if image is None:
-                return "CC_L", 0.5
-            
-            # Utiliser la méthode existante
-            image_rgb = np.stack([image] * 3, axis=-1)
-            return self._analyze_view_features(image_rgb)
-        except:
-            return "CC_L", 0.5
-    
     def _detect_regions_cv_fallback(self, image_path: str) -> list:
         """Fallback: utilise computer vision pour détecter les régions"""
         try:
@@ -1553,6 +1463,7 @@ class MedSigLIPInferenceService:
         """Retourne les informations sur le modèle"""
         return {
             "model_name": "MedSigLIP-448",
+            "model_version": self.model_version,
             "model_path": self.model_path,
             "model_loaded": self.model is not None,
             "device": str(self.device),
@@ -0,0 +1,251 @@
+"""
+Registre de modèles versionnés avec rechargement à chaud
+
+Structure du registre (MODEL_REGISTRY_DIR, défaut: app/ml/model/registry/):
+
+    registry/
+        CURRENT                              # version active au démarrage
+        2025-11-02/
+            best_medsiglip_model.pth
+            view_classifier_trained.pth      # optionnel (sinon celui de app/ml/model/)
+            metadata.json                    # optionnel (métriques, notes)
+
+Le service actif est une simple référence remplacée atomiquement sous verrou.
+Chaque requête récupère la référence au début de son traitement (MammographyService),
+donc les requêtes en cours terminent sur l'ancienne version pendant que les
+nouvelles utilisent la nouvelle, sans redémarrage.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.ml.inference_service_simple import MedSigLIPInferenceService
+
+MODEL_FILENAME = "best_medsiglip_model.pth"
+CURRENT_FILENAME = "CURRENT"
+LEGACY_VERSION = "v1.0"  # Modèle historique app/ml/model/best_medsiglip_model.pth
+
+_lock = threading.Lock()
+_active_service = None
+_active_version = None
+_load_status = {}  # version -> {"state": loading|ready|failed, ...}
+
+# Les autres workers uvicorn suivent le fichier CURRENT (vérifié au plus toutes les N secondes)
+CURRENT_POLL_SECONDS = 30
+_last_current_check = 0.0
+
+
+def get_registry_dir() -> Path:
+    """Répertoire du registre (variable MODEL_REGISTRY_DIR ou app/ml/model/registry)"""
+    env_dir = os.getenv("MODEL_REGISTRY_DIR")
+    if env_dir:
+        return Path(env_dir)
+    return Path(__file__).parent / "model" / "registry"
+
+
+def _version_dir(version: str) -> Path:
+    # Interdire les chemins relatifs (../) dans le nom de version
+    if not version or Path(version).name != version or version.startswith("."):
+        raise ValueError(f"Nom de version invalide: {version!r}")
+    return get_registry_dir() / version
+
+
+def list_versions() -> list:
+    """Liste les versions disponibles dans le registre (ordre alphabétique)"""
+    registry_dir = get_registry_dir()
+    if not registry_dir.exists():
+        return []
+
+    versions = []
+    for entry in sorted(registry_dir.iterdir()):
+        model_file = entry / MODEL_FILENAME
+        if not entry.is_dir() or not model_file.exists():
+            continue
+        metadata = {}
+        metadata_file = entry / "metadata.json"
+        if metadata_file.exists():
+            try:
+                metadata = json.loads(metadata_file.read_text())
+            except (OSError, ValueError) as e:
+                print(f"⚠️ [REGISTRY] metadata.json illisible pour {entry.name}: {e}")
+        versions.append({
+            "version": entry.name,
+            "size_mb": round(model_file.stat().st_size / (1024 * 1024), 2),
+            "created_at": datetime.fromtimestamp(model_file.stat().st_mtime).isoformat(),
+            "metadata": metadata,
+        })
+    return versions
+
+
+def get_model_path(version: str) -> str:
+    """Chemin du checkpoint d'une version du registre"""
+    model_file = _version_dir(version) / MODEL_FILENAME
+    if not model_file.exists():
+        raise ValueError(f"Version de modèle inconnue: {version} (attendu: {model_file})")
+    return str(model_file)
+
+
+def _read_current_version() -> Optional[str]:
+    """Version à charger au démarrage: MODEL_VERSION, sinon le fichier CURRENT du registre"""
+    version = os.getenv("MODEL_VERSION")
+    if version:
+        return version.strip()
+    current_file = get_registry_dir() / CURRENT_FILENAME
+    if current_file.exists():
+        return current_file.read_text().strip() or None
+    return None
+
+
+def _write_current_version(version: str) -> None:
+    try:
+        registry_dir = get_registry_dir()
+        registry_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = registry_dir / f".{CURRENT_FILENAME}.tmp"
+        tmp_file.write_text(version)
+        os.replace(tmp_file, registry_dir / CURRENT_FILENAME)
+    except OSError as e:
+        print(f"⚠️ [REGISTRY] Impossible d'enregistrer la version courante: {e}")
+
+
+def _build_service(version: Optional[str], annotation_source=None) -> MedSigLIPInferenceService:
+    if version is None or version == LEGACY_VERSION:
+        return MedSigLIPInferenceService(annotation_source=annotation_source)
+    return MedSigLIPInferenceService(
+        model_path=get_model_path(version),
+        model_version=version,
+        annotation_source=annotation_source,
+    )
+
+
+def _warm_up(service: MedSigLIPInferenceService) -> float:
+    """Exécute une prédiction factice pour initialiser les poids et les caches torch"""
+    start = time.time()
+    rng = np.random.default_rng(0)
+    dummy = np.clip(rng.normal(0.45, 0.15, size=(448, 448)), 0, 1).astype(np.float32)
+    dummy_rgb = np.stack([dummy] * 3, axis=-1)
+    service._predict_with_model(dummy_rgb)
+    service.view_engine.classify([dummy_rgb])
+    return time.time() - start
+
+
+def get_active_model() -> MedSigLIPInferenceService:
+    """Retourne le service actif (chargé au premier appel)"""
+    global _active_service, _active_version
+    if _active_service is not None:
+        _follow_current_version()
+        return _active_service
+
+    with _lock:
+        if _active_service is None:
+            version = _read_current_version()
+            try:
+                service = _build_service(version)
+            except ValueError as e:
+                print(f"⚠️ [REGISTRY] {e} - utilisation du modèle par défaut")
+                service = _build_service(None)
+            _active_version = service.model_version
+            _active_service = service
+            _load_status[_active_version] = {"state": "ready", "activated_at": datetime.now().isoformat()}
+            print(f"✅ [REGISTRY] Modèle actif: {_active_version}")
+    return _active_service
+
+
+def _follow_current_version() -> None:
+    """
+    Si une autre instance a activé une nouvelle version (fichier CURRENT modifié),
+    la charger en arrière-plan dans ce worker aussi
+    """
+    global _last_current_check
+    now = time.time()
+    if now - _last_current_check < CURRENT_POLL_SECONDS or os.getenv("MODEL_VERSION"):
+        return
+    _last_current_check = now
+
+    current = _read_current_version()
+    if not current or current == _active_version:
+        return
+    status = _load_status.get(current)
+    if status and status["state"] in ("loading", "warming_up", "failed"):
+        return
+    try:
+        activate_version(current)
+    except ValueError as e:
+        print(f"⚠️ [REGISTRY] Version CURRENT ignorée: {e}")
+
+
+def get_active_version() -> Optional[str]:
+    return _active_version
+
+
+def _load_and_swap(version: str) -> None:
+    global _active_service, _active_version
+    started = time.time()
+    try:
+        print(f"🔄 [REGISTRY] Chargement en arrière-plan de la version {version}...")
+        service = _build_service(version, annotation_source=_active_service)
+
+        if not service.use_direct_classifiers or service.bi_rads_classifier is None:
+            raise RuntimeError("Le checkpoint ne contient pas de classificateurs utilisables")
+
+        _load_status[version]["state"] = "warming_up"
+        warmup_seconds = _warm_up(service)
+
+        with _lock:
+            previous = _active_version
+            _active_service = service
+            _active_version = version
+
+        _write_current_version(version)
+        _load_status[version].update({
+            "state": "ready",
+            "load_seconds": round(time.time() - started, 2),
+            "warmup_seconds": round(warmup_seconds, 2),
+            "activated_at": datetime.now().isoformat(),
+            "previous_version": previous,
+        })
+        print(f"✅ [REGISTRY] Version {version} active (précédente: {previous})")
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        _load_status[version].update({"state": "failed", "error": str(e)})
+        print(f"❌ [REGISTRY] Échec du chargement de {version}: {e}")
+
+
+def activate_version(version: str) -> dict:
+    """
+    Charge une version en arrière-plan, la réchauffe puis la rend active
+    Retourne immédiatement le statut de chargement
+    """
+    if version != LEGACY_VERSION:
+        get_model_path(version)  # Valide la version avant de lancer le thread
+
+    # Garantir qu'une version active existe pour servir pendant le chargement
+    get_active_model()
+
+    # Vérification et passage à "loading" sous le verrou: deux requêtes simultanées
+    # ne doivent pas lancer deux chargements de la même version
+    with _lock:
+        status = _load_status.get(version)
+        if status and status["state"] in ("loading", "warming_up"):
+            return {"version": version, **status}
+        _load_status[version] = {"state": "loading", "requested_at": datetime.now().isoformat()}
+        thread = threading.Thread(target=_load_and_swap, args=(version,), name=f"model-load-{version}", daemon=True)
+        thread.start()
+        return {"version": version, **_load_status[version]}
+
+
+def get_registry_status() -> dict:
+    """État du registre: version active, versions disponibles, chargements en cours"""
+    return {
+        "registry_dir": str(get_registry_dir()),
+        "active_version": _active_version,
+        "versions": list_versions(),
+        "load_status": dict(_load_status),
+    }
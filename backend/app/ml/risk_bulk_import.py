@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Import en lot d'évaluations de risque (questionnaires CSV/XLSX des ONG partenaires)
+
+Le fichier est lu par blocs (pandas read_csv(chunksize=...) ou openpyxl en mode
+read_only), chaque bloc est validé et scoré en une passe vectorisée
+(GailModelRiskCalculator.calculate_risk_batch), puis écrit en une seule requête
+INSERT multi-lignes et un seul commit. Seul le bloc courant est en mémoire.
+
+Colonnes reconnues (mêmes noms que /risk/calculate, en-têtes insensibles à la casse):
+    age (obligatoire), first_degree_relatives, previous_biopsies, atypical_hyperplasia,
+    age_menarche, age_first_birth, weight_kg, height_cm, bmi, alcohol_consumption,
+    exercise_minutes_per_week, smoking_status, hormone_therapy, reference (optionnel)
+
+Les lignes invalides ne sont pas importées: elles sont renvoyées avec leur numéro
+de ligne dans le fichier et la liste des erreurs.
+
+Usage (depuis backend/):
+    python -m app.ml.risk_bulk_import questionnaires.csv --user-email ong@example.org
+    python -m app.ml.risk_bulk_import questionnaires.xlsx --user-email ... --dry-run --errors-output erreurs.jsonl
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.ml.gail_risk_calculator import (
+    CRITICAL_WARNINGS, FIRST_BIRTH_CATEGORIES, MENARCHE_CATEGORIES, SMOKING_CATEGORIES,
+    GailModelRiskCalculator
+)
+from app.models.risk_assessment import RiskAssessment, RiskLevel
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_MAX_REPORTED_ERRORS = 1000
+
+# Colonne -> (min, max, entier) ; mêmes bornes que RiskAssessmentRequest
+NUMERIC_COLUMNS = {
+    'age': (18, 90, True),
+    'first_degree_relatives': (0, 10, True),
+    'previous_biopsies': (0, 10, True),
+    'weight_kg': (30.0, 200.0, False),
+    'height_cm': (100.0, 250.0, False),
+    'bmi': (10.0, 80.0, False),
+    'alcohol_consumption': (0, 100, False),
+    'exercise_minutes_per_week': (0, 1000, False),
+}
+BOOLEAN_COLUMNS = ('atypical_hyperplasia', 'hormone_therapy')
+CATEGORY_COLUMNS = {
+    'age_menarche': MENARCHE_CATEGORIES,
+    'age_first_birth': FIRST_BIRTH_CATEGORIES,
+    'smoking_status': SMOKING_CATEGORIES,
+}
+
+TRUE_VALUES = {'1', 'true', 'vrai', 'oui', 'o', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'faux', 'non', 'n', 'no'}
+CATEGORY_ALIASES = {
+    'nullipare': 'nulliparous',
+    'jamais': 'never',
+    'ancienne': 'former',
+    'ancien': 'former',
+    'actuelle': 'current',
+    'actuel': 'current',
+}
+
+RISK_LEVEL_MAP = {
+    'Faible': RiskLevel.LOW,
+    'Modéré': RiskLevel.MODERATE,
+    'Élevé': RiskLevel.HIGH,
+    'Très élevé': RiskLevel.VERY_HIGH
+}
+
+DISCLAIMER = "Cette évaluation ne remplace pas une consultation médicale."
+
+
+def iter_chunks(source, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Lit un fichier CSV ou XLSX par blocs de chunk_size lignes
+    source: chemin ou objet fichier binaire. Produit des DataFrames de chaînes
+    (en-têtes normalisés en minuscules). Les lignes vides sont conservées pour que
+    la position dans le bloc corresponde à la ligne du fichier (voir drop_blank_rows).
+    """
+    suffix = Path(filename).suffix.lower()
+    if suffix in ('.xlsx', '.xlsm'):
+        yield from _iter_xlsx_chunks(source, chunk_size)
+    elif suffix in ('.csv', '.txt', ''):
+        # sep=None: détection automatique ',' / ';' (exports Excel français)
+        reader = pd.read_csv(source, sep=None, engine='python', dtype=str, chunksize=chunk_size,
+                             encoding='utf-8-sig', skip_blank_lines=False)
+        for frame in reader:
+            frame.columns = [str(column).strip().lower() for column in frame.columns]
+            yield frame
+    else:
+        raise ValueError(f"Format de fichier non supporté: {suffix} (CSV ou XLSX attendu)")
+
+
+def _iter_xlsx_chunks(source, chunk_size: int):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("openpyxl est requis pour lire les fichiers XLSX (pip install openpyxl)")
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(column).strip().lower() if column is not None else f'colonne_{i}'
+                   for i, column in enumerate(header)]
+        buffer = []
+        for row in rows:
+            buffer.append([None if value is None else str(value) for value in row])
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def drop_blank_rows(frame: pd.DataFrame, first_row: int):
+    """
+    Numérote les lignes d'un bloc d'après leur position dans le fichier, puis retire
+    les lignes entièrement vides
+
+    Returns:
+        (frame, row_numbers): bloc sans lignes vides et numéro de ligne fichier de chacune
+    """
+    row_numbers = np.arange(first_row, first_row + len(frame))
+    filled = frame.apply(lambda column: column.notna() & (column.astype(str).str.strip() != '')).any(axis=1)
+    keep = filled.to_numpy(dtype=bool)
+    return frame[keep].reset_index(drop=True), row_numbers[keep]
+
+
+def parse_chunk(frame: pd.DataFrame, row_numbers: np.ndarray):
+    """
+    Valide un bloc, colonne par colonne
+
+    Returns:
+        (records, row_numbers, errors): user_data des lignes valides (mêmes clés que
+        /risk/calculate-and-save), leur numéro de ligne, et [{row, errors}] pour les autres
+    """
+    size = len(frame)
+    row_errors = [[] for _ in range(size)]
+    if 'age' not in frame.columns:
+        raise ValueError("Colonne 'age' absente du fichier")
+
+    def raw_column(name):
+        """Valeurs brutes en liste Python: chaîne nettoyée, None si la cellule est vide"""
+        if name not in frame.columns:
+            return [None] * size
+        values = [None if pd.isna(value) else str(value).strip() for value in frame[name].tolist()]
+        return [value if value else None for value in values]
+
+    def add_errors(mask, message):
+        for i in np.flatnonzero(mask):
+            row_errors[i].append(message)
+
+    parsed = {}
+    for name, (low, high, integer) in NUMERIC_COLUMNS.items():
+        raw = raw_column(name)
+        missing = np.array([value is None for value in raw], dtype=bool)
+        values = pd.to_numeric(pd.Series([value.replace(',', '.') if value else None for value in raw], dtype=object),
+                               errors='coerce').to_numpy(dtype=np.float64, copy=True)
+        with np.errstate(invalid='ignore'):
+            invalid = ~missing & (np.isnan(values) | (values < low) | (values > high))
+            if integer:
+                invalid |= ~missing & ~np.isnan(values) & (values != np.round(values))
+        add_errors(invalid, f"{name}: valeur invalide (attendu {'entier ' if integer else ''}entre {low} et {high})")
+        if name == 'age':
+            add_errors(missing, "age: valeur obligatoire")
+        values[missing] = np.nan
+        parsed[name] = values
+
+    for name in BOOLEAN_COLUMNS:
+        raw = [value.lower() if value else None for value in raw_column(name)]
+        values = [True if value in TRUE_VALUES else False if value in FALSE_VALUES else None for value in raw]
+        add_errors([raw_value is not None and value is None for raw_value, value in zip(raw, values)],
+                   f"{name}: attendu oui/non")
+        parsed[name] = values
+
+    for name, categories in CATEGORY_COLUMNS.items():
+        raw = [CATEGORY_ALIASES.get(value.lower(), value) if value else None for value in raw_column(name)]
+        add_errors([value is not None and value not in categories for value in raw],
+                   f"{name}: valeur attendue parmi {', '.join(categories)}")
+        parsed[name] = raw
+
+    references = raw_column('reference')
+
+    def number(name, i, cast=float):
+        value = parsed[name][i]
+        return None if np.isnan(value) else cast(value)
+
+    records, valid_rows, errors = [], [], []
+    for i in range(size):
+        if row_errors[i]:
+            errors.append({'row': int(row_numbers[i]), 'errors': row_errors[i]})
+            continue
+        weight_kg, height_cm = number('weight_kg', i), number('height_cm', i)
+        bmi = number('bmi', i)
+        if bmi is None and weight_kg and height_cm:
+            bmi = weight_kg / ((height_cm / 100.0) ** 2)
+        relatives = number('first_degree_relatives', i, int)
+        biopsies = number('previous_biopsies', i, int)
+        records.append({
+            'age': number('age', i, int),
+            'first_degree_relatives': relatives if relatives is not None else 0,
+            'previous_biopsies': biopsies if biopsies is not None else 0,
+            'atypical_hyperplasia': bool(parsed['atypical_hyperplasia'][i]),
+            'age_menarche': parsed['age_menarche'][i],
+            'age_first_birth': parsed['age_first_birth'][i],
+            'weight_kg': weight_kg,
+            'height_cm': height_cm,
+            'bmi': bmi,
+            'alcohol_consumption': number('alcohol_consumption', i),
+            'exercise_minutes_per_week': number('exercise_minutes_per_week', i),
+            'smoking_status': parsed['smoking_status'][i],
+            'hormone_therapy': parsed['hormone_therapy'][i],
+            'reference': references[i],
+        })
+        valid_rows.append(int(row_numbers[i]))
+    return records, valid_rows, errors
+
+
+def score_records(records: list, calculator: GailModelRiskCalculator) -> list:
+    """
+    Score un bloc en une passe vectorisée et retourne les champs RiskAssessment
+    (valeurs identiques à calculate_risk, ligne par ligne)
+    """
+    columns = {name: [record[name] for record in records] for name in (
+        'age', 'first_degree_relatives', 'previous_biopsies', 'atypical_hyperplasia', 'age_menarche',
+        'age_first_birth', 'bmi', 'alcohol_consumption', 'exercise_minutes_per_week', 'smoking_status',
+        'hormone_therapy'
+    )}
+    result = calculator.calculate_risk_batch(columns, rounded=False)
+
+    scored = []
+    for i, record in enumerate(records):
+        user_data = {key: value for key, value in record.items() if key != 'reference'}
+        risk_5_years = float(result['risk_5_years'][i])
+        average_risk = float(result['average_risk_for_age'][i])
+        risk_relative = float(result['risk_relative'][i])
+        risk_category = result['risk_category'][i]
+        clinical_significance, significance_explanation = calculator._clinical_significance(
+            risk_5_years, risk_relative, average_risk
+        )
+        _, _, model_used, estimated_accuracy = calculator._describe_inputs(user_data)
+        scored.append({
+            'risk_5_years': round(risk_5_years, 2),
+            # None tant que le risque à vie n'est pas validé (NaN dans le calcul par lot)
+            'risk_lifetime': (round(float(result['risk_lifetime'][i]), 2)
+                              if calculator.absolute_risk_validated else None),
+            'risk_level': RISK_LEVEL_MAP.get(risk_category, RiskLevel.LOW),
+            'risk_category': risk_category,
+            'input_data': user_data,
+            'risk_relative': round(risk_relative, 2),
+            'average_risk_for_age': round(average_risk, 2),
+            'clinical_significance': clinical_significance,
+            'significance_explanation': significance_explanation,
+            'recommendations': calculator._get_recommendations_cached(risk_5_years, user_data),
+            'educational_message': calculator._get_educational_message(risk_category, risk_5_years),
+            'critical_warnings': list(CRITICAL_WARNINGS),
+            'lifestyle_insights': calculator._calculate_lifestyle_insights(user_data),
+            'model_used': model_used,
+            'estimated_accuracy': estimated_accuracy,
+            'disclaimer': DISCLAIMER,
+        })
+    return scored
+
+
+def import_risk_file(db: Session, source, filename: str, user_id: str, calculator: GailModelRiskCalculator = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False,
+                     max_reported_errors: int = DEFAULT_MAX_REPORTED_ERRORS, progress=None) -> dict:
+    """
+    Importe un fichier de questionnaires pour user_id
+
+    Un bloc = une validation vectorisée, un scoring vectorisé, un INSERT multi-lignes et
+    un commit. progress(summary) est appelé après chaque bloc.
+    """
+    calculator = calculator or GailModelRiskCalculator()
+    import_id = f"import-{uuid.uuid4().hex[:12]}"
+    summary = {
+        'import_id': import_id,
+        'filename': filename,
+        'dry_run': dry_run,
+        'total_rows': 0,
+        'imported': 0,
+        'failed': 0,
+        'chunks': 0,
+        'errors': [],
+        'errors_truncated': False,
+    }
+    start = time.time()
+    first_row = 2  # Ligne 1 = en-têtes
+
+    for frame in iter_chunks(source, filename, chunk_size):
+        chunk_length = len(frame)
+        frame, frame_rows = drop_blank_rows(frame, first_row)
+        first_row += chunk_length
+        records, row_numbers, errors = parse_chunk(frame, frame_rows)
+        summary['total_rows'] += len(frame)
+        summary['chunks'] += 1
+
+        if records:
+            scored = score_records(records, calculator)
+            rows = [
+                {
+                    'id': f"risk-{uuid.uuid4()}",
+                    'user_id': user_id,
+                    'assessment_id': f"assessment-{uuid.uuid4()}",
+                    'notes': f"Import en lot {import_id} ({filename}, ligne {row})"
+                             + (f" - référence {record['reference']}" if record['reference'] else ""),
+                    **fields,
+                }
+                for record, row, fields in zip(records, row_numbers, scored)
+            ]
+            if dry_run:
+                summary['imported'] += len(rows)
+            else:
+                try:
+                    db.execute(insert(RiskAssessment), rows)
+                    db.commit()
+                    summary['imported'] += len(rows)
+                except Exception as e:
+                    db.rollback()
+                    print(f"❌ [RISK_IMPORT] Échec d'insertion du bloc {summary['chunks']}: {e}")
+                    errors.extend({'row': row, 'errors': [f"base de données: {e}"]} for row in row_numbers)
+            del rows, scored
+
+        summary['failed'] += len(errors)
+        for error in errors:
+            if max_reported_errors is not None and len(summary['errors']) >= max_reported_errors:
+                summary['errors_truncated'] = True
+                break
+            summary['errors'].append(error)
+
+        summary['duration_seconds'] = round(time.time() - start, 2)
+        if progress is not None:
+            progress(summary)
+
+    summary['duration_seconds'] = round(time.time() - start, 2)
+    return summary
+
+
+def _print_progress(summary: dict) -> None:
+    rate = summary['total_rows'] / max(summary['duration_seconds'], 1e-6)
+    print(f"   ✅ Bloc {summary['chunks']}: {summary['total_rows']} lignes lues, {summary['imported']} importées, "
+          f"{summary['failed']} en erreur ({rate:.0f} lignes/s)")
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import en lot d'évaluations de risque (CSV/XLSX)")
+    parser.add_argument("file", help="Fichier CSV ou XLSX de questionnaires")
+    parser.add_argument("--user-email", help="Compte propriétaire des évaluations")
+    parser.add_argument("--user-id", help="Identifiant du compte propriétaire (à la place de --user-email)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Valider et scorer sans écrire en base")
+    parser.add_argument("--errors-output", default=None, help="Fichier JSONL des lignes en erreur")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        user_id = args.user_id
+        if user_id is None:
+            if not args.user_email:
+                raise SystemExit("❌ Indiquer --user-email ou --user-id")
+            user = db.query(User).filter(User.email == args.user_email).first()
+            if user is None:
+                raise SystemExit(f"❌ Utilisateur introuvable: {args.user_email}")
+            user_id = user.id
+
+        print("=" * 80)
+        print(f"IMPORT DES ÉVALUATIONS DE RISQUE - {args.file}{' (simulation)' if args.dry_run else ''}")
+        print("=" * 80)
+        with open(args.file, 'rb') as source:
+            summary = import_risk_file(db, source, args.file, user_id, chunk_size=args.chunk_size,
+                                       dry_run=args.dry_run, max_reported_errors=None, progress=_print_progress)
+    finally:
+        db.close()
+
+    if args.errors_output:
+        with open(args.errors_output, 'w', encoding='utf-8') as output:
+            for error in summary['errors']:
+                output.write(json.dumps(error, ensure_ascii=False) + "\n")
+    else:
+        for error in summary['errors'][:20]:
+            print(f"   ⚠️ Ligne {error['row']}: {'; '.join(error['errors'])}")
+
+    print(f"\n✅ Import {summary['import_id']} terminé en {summary['duration_seconds']}s: "
+          f"{summary['imported']} importées, {summary['failed']} en erreur sur {summary['total_rows']} lignes")
+
+
+if __name__ == "__main__":
+    main()
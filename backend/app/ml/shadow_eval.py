@@ -0,0 +1,214 @@
+"""
+Évaluation shadow d'un checkpoint candidat, hors du chemin critique
+
+Pour un échantillon configurable d'analyses réelles, les embeddings déjà calculés
+par le modèle de production sont envoyés à un processus séparé, de basse priorité
+et avec son propre budget de threads, qui exécute les têtes BI-RADS/densité du
+checkpoint candidat. L'accord et les écarts de confiance sont enregistrés dans
+la table shadow_evaluations et ne sont jamais renvoyés à l'utilisateur.
+
+Configuration (variables d'environnement):
+    SHADOW_MODEL_VERSION   version candidate du registre (désactivé si vide)
+    SHADOW_SAMPLE_RATE     fraction des analyses évaluées (défaut 0.1)
+    SHADOW_NUM_THREADS     threads torch/BLAS du processus shadow (défaut 1)
+    SHADOW_QUEUE_SIZE      taille max de la file; au-delà les échantillons sont ignorés
+
+Ce module n'importe ni torch ni numpy au niveau module: le processus shadow
+fixe son budget de threads avant de les charger.
+"""
+
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import uuid
+
+from app.core.thread_budget import BLAS_ENV_VARS
+
+_lock = threading.Lock()
+_queue = None
+_process = None
+_stats = {"submitted": 0, "dropped": 0}
+
+
+def get_candidate_version():
+    return os.getenv("SHADOW_MODEL_VERSION") or None
+
+
+def get_sample_rate() -> float:
+    try:
+        return min(1.0, max(0.0, float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))))
+    except ValueError:
+        return 0.0
+
+
+def is_enabled() -> bool:
+    return get_candidate_version() is not None and get_sample_rate() > 0
+
+
+def should_sample() -> bool:
+    """Tirage de l'échantillon (à faire avant de conserver les embeddings)"""
+    return is_enabled() and random.random() < get_sample_rate()
+
+
+def _ensure_worker():
+    """Démarre le processus shadow si nécessaire (contexte spawn: pas d'état torch hérité)"""
+    global _queue, _process
+    with _lock:
+        if _process is not None and _process.is_alive():
+            return
+        context = multiprocessing.get_context("spawn")
+        _queue = context.Queue(maxsize=int(os.getenv("SHADOW_QUEUE_SIZE", "256")))
+        _process = context.Process(
+            target=_worker_main,
+            args=(_queue, get_candidate_version(), int(os.getenv("SHADOW_NUM_THREADS", "1"))),
+            name="shadow-eval",
+            daemon=True,
+        )
+        _process.start()
+        print(f"👥 [SHADOW] Processus shadow démarré (pid={_process.pid}, candidat={get_candidate_version()})")
+
+
+def submit(analysis_id: str, production_version: str, samples: list) -> bool:
+    """
+    Met en file les embeddings d'une analyse pour évaluation par le candidat
+    Ne bloque jamais: si la file est pleine, l'échantillon est ignoré.
+
+    samples: liste de dicts {image_index, embedding (np.ndarray 1D float32),
+             bi_rads, bi_rads_confidence, density, density_confidence}
+             Les confiances de production sont les softmax bruts (raw_confidences),
+             comme celles du candidat: les écarts comparent des grandeurs identiques.
+    """
+    if not samples or not is_enabled():
+        return False
+    try:
+        _ensure_worker()
+        _queue.put_nowait({
+            "analysis_id": analysis_id,
+            "production_version": production_version,
+            "samples": samples,
+        })
+        _stats["submitted"] += 1
+        return True
+    except queue.Full:
+        _stats["dropped"] += 1
+        return False
+    except Exception as e:
+        print(f"⚠️ [SHADOW] Échantillon ignoré: {e}")
+        _stats["dropped"] += 1
+        return False
+
+
+def get_status() -> dict:
+    return {
+        "enabled": is_enabled(),
+        "candidate_version": get_candidate_version(),
+        "sample_rate": get_sample_rate(),
+        "worker_alive": _process is not None and _process.is_alive(),
+        **_stats,
+    }
+
+
+def _load_candidate_heads(version: str, device):
+    import torch
+    from app.ml.inference_service_simple import build_classifier_head
+    from app.ml.model_registry import get_model_path
+
+    checkpoint = torch.load(get_model_path(version), map_location=device, weights_only=False)
+    heads = {}
+    for key, num_key, default in (("bi_rads_classifier", "num_bi_rads_classes", 5),
+                                  ("density_classifier", "num_density_classes", 4)):
+        if key not in checkpoint:
+            raise ValueError(f"Le checkpoint candidat {version} ne contient pas '{key}'")
+        state = checkpoint[key]
+        first_weight = next(value for name, value in state.items() if name.endswith("weight"))
+        head = build_classifier_head(first_weight.shape[1], checkpoint.get(num_key, default))
+        head.load_state_dict(state)
+        heads[key] = head.to(device).eval()
+    return heads
+
+
+def _evaluate(heads, job, device):
+    import time
+    import numpy as np
+    import torch
+    from app.ml.inference_service_simple import BI_RADS_LABELS, DENSITY_LABELS
+
+    embeddings = torch.from_numpy(np.stack([s["embedding"] for s in job["samples"]]).astype(np.float32)).to(device)
+    start = time.perf_counter()
+    with torch.no_grad():
+        bi_rads_probs = torch.softmax(heads["bi_rads_classifier"](embeddings), dim=1).cpu().numpy()
+        density_probs = torch.softmax(heads["density_classifier"](embeddings), dim=1).cpu().numpy()
+    latency_ms = 1000 * (time.perf_counter() - start) / len(job["samples"])
+
+    rows = []
+    for sample, bi_rads_p, density_p in zip(job["samples"], bi_rads_probs, density_probs):
+        bi_rads_idx = int(np.argmax(bi_rads_p))
+        density_idx = int(np.argmax(density_p))
+        candidate_bi_rads = BI_RADS_LABELS[bi_rads_idx] if bi_rads_idx < len(BI_RADS_LABELS) else None
+        candidate_density = DENSITY_LABELS[density_idx] if density_idx < len(DENSITY_LABELS) else None
+        rows.append({
+            "image_index": sample["image_index"],
+            "production_bi_rads": sample["bi_rads"],
+            "production_bi_rads_confidence": sample["bi_rads_confidence"],
+            "candidate_bi_rads": candidate_bi_rads,
+            "candidate_bi_rads_confidence": float(bi_rads_p[bi_rads_idx]),
+            "bi_rads_agreement": candidate_bi_rads == sample["bi_rads"],
+            "bi_rads_confidence_delta": float(bi_rads_p[bi_rads_idx]) - sample["bi_rads_confidence"],
+            "production_density": sample["density"],
+            "production_density_confidence": sample["density_confidence"],
+            "candidate_density": candidate_density,
+            "candidate_density_confidence": float(density_p[density_idx]),
+            "density_agreement": candidate_density == sample["density"],
+            "density_confidence_delta": float(density_p[density_idx]) - sample["density_confidence"],
+            "candidate_latency_ms": latency_ms,
+        })
+    return rows
+
+
+def _worker_main(job_queue, candidate_version: str, num_threads: int):
+    """Point d'entrée du processus shadow"""
+    # Budget CPU propre, fixé avant l'import de numpy/torch
+    for name in BLAS_ENV_VARS:
+        os.environ[name] = str(num_threads)
+    try:
+        os.nice(19)  # Priorité minimale: la production passe toujours devant
+    except (AttributeError, OSError):
+        pass
+
+    import torch
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+
+    from app.db.session import SessionLocal
+    from app.models.shadow_evaluation import ShadowEvaluation
+
+    device = torch.device("cpu")
+    try:
+        heads = _load_candidate_heads(candidate_version, device)
+        print(f"👥 [SHADOW] Têtes candidates {candidate_version} chargées")
+    except Exception as e:
+        print(f"❌ [SHADOW] Impossible de charger le candidat {candidate_version}: {e}")
+        return
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        db = SessionLocal()
+        try:
+            for row in _evaluate(heads, job, device):
+                db.add(ShadowEvaluation(
+                    id=str(uuid.uuid4()),
+                    analysis_id=job["analysis_id"],
+                    production_version=job["production_version"],
+                    candidate_version=candidate_version,
+                    **row,
+                ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ [SHADOW] Erreur d'évaluation pour {job.get('analysis_id')}: {e}")
+        finally:
+            db.close()
@@ -10,44 +10,38 @@ import torch.nn as nn
 import torch.optim as optim
 from pathlib import Path
 import cv2
-from PIL import Image
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
-from scipy import ndimage, stats
+from concurrent.futures import ProcessPoolExecutor
+import json
 import os
+import sys
 
-print("=" * 70)
-print("ENTRAÎNEMENT DU CLASSIFIEUR DE VUES")
-print("Basé sur les vraies images du dataset")
-print("=" * 70)
+# Le script est lancé depuis app/ml: rendre le package app importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.core.thread_budget import detect_available_cpus
+from app.ml.inference_service_simple import preprocess_mammogram
+from app.ml.view_engine import (
+    ViewClassifier, VIEW_FEATURE_DIM, VIEW_FEATURE_VERSION, extract_view_features, to_view_gray
+)
 
 # Configuration
 BATCH_SIZE = 64
 LEARNING_RATE = 1e-3
 EPOCHS = 100
 MAX_SAMPLES = None  # None = tous les échantillons
+NUM_WORKERS = int(os.getenv("VIEW_FEATURE_WORKERS", "0")) or detect_available_cpus()
+# Cache des features: <dir>/view_features_<version>.npy (memmap) + index image_id -> ligne
+FEATURE_CACHE_DIR = Path(os.getenv("VIEW_FEATURE_CACHE_DIR", str(Path(__file__).parent / "model" / "feature_cache")))
 
-# 1. Charger les annotations
-print("\n[1/6] Chargement des annotations...")
-annotations = pd.read_csv('../../../breast-level_annotations (1).csv')
-print(f"✓ {len(annotations)} annotations chargées")
-
-# Garder seulement les échantillons d'entraînement
-train_data = annotations[annotations['split'] == 'training']
-print(f"✓ {len(train_data)} échantillons d'entraînement")
-
-# Limiter si nécessaire
-if MAX_SAMPLES:
-    train_data = train_data.head(MAX_SAMPLES)
-    print(f"  (Limité à {MAX_SAMPLES} pour test rapide)")
-
-# 2. Préparer les paths des images
-print("\n[2/6] Préparation des chemins d'images...")
+# Chemins des images
 image_paths = {
     'Extract': Path('../../../Extract/images_png'),
     'extracted_data': Path('../../../extracted_data/images_png')
 }
 
+
 def get_image_path(study_id, image_id):
     """Trouve le chemin de l'image"""
     for name, base_path in image_paths.items():
@@ -56,259 +50,266 @@ def get_image_path(study_id, image_id):
             return path
     return None
 
-# 3. Extraction des features
-print("\n[3/6] Extraction des features depuis les images (peut prendre du temps)...")
+
+def _init_worker():
+    # Un thread par processus: le parallélisme vient du pool
+    cv2.setNumThreads(1)
+
 
 def extract_features_from_image(image_path):
-    """Extrait 32 features depuis une image"""
+    """
+    Extrait les 32 features de vue depuis une image, avec le prétraitement de
+    l'inférence (preprocess_mammogram: 512 LANCZOS, CLAHE, 448)
+    """
     try:
-        # Charger l'image
-        image = Image.open(image_path)
-        if image.mode != 'L':
-            image = image.convert('L')
-        
-        # Redimensionner
-        image_array = np.array(image).astype(np.float32) / 255.0
-        image_array = cv2.resize(image_array, (448, 448))
-        
-        # Appliquer CLAHE
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        image_array = clahe.apply((image_array * 255).astype(np.uint8)).astype(np.float32) / 255.0
-        
-        # Extraire features
-        mean = np.mean(image_array)
-        std = np.std(image_array)
-        q25 = np.percentile(image_array, 25)
-        q75 = np.percentile(image_array, 75)
-        
-        # Symétrie
-        h_sym = np.mean(image_array[:, :224]) - np.mean(image_array[:, 224:])
-        v_sym = np.mean(image_array[:224, :]) - np.mean(image_array[224:, :])
-        
-        # Densité de contours
-        edges = cv2.Canny((image_array * 255).astype(np.uint8), 50, 150)
-        edge_density = np.sum(edges > 0) / edges.size
-        
-        # Aspect ratio
-        aspect = 1.0
-        
-        # Histogram features (16 bins)
-        hist = cv2.calcHist([image_array], [0], None, [16], [0, 1])
-        features = list(hist.flatten())
-        
-        # Statistiques de base (8 features)
-        features.extend([mean, std, q25, q75, h_sym, v_sym, edge_density, aspect])
-        
-        # Gradient features (2 features)
-        grad_x = cv2.Sobel(image_array, cv2.CV_64F, 1, 0, ksize=3)
-        grad_y = cv2.Sobel(image_array, cv2.CV_64F, 0, 1, ksize=3)
-        gradient_magnitude = np.sqrt(grad_x**2 + grad_y**2)
-        features.append(np.mean(gradient_magnitude))
-        features.append(np.std(gradient_magnitude))
-        
-        # Texture features (6 features supplémentaires)
-        # Variance locale
-        local_variance = ndimage.generic_filter(image_array, np.var, size=3)
-        features.append(np.mean(local_variance))
-        
-        # Skewness (asymétrie)
-        features.append(stats.skew(image_array.flatten()))
-        
-        # Kurtosis (aplatissement)
-        features.append(stats.kurtosis(image_array.flatten()))
-        
-        # Entropy locale
-        hist_local, _ = np.histogram(image_array.flatten(), bins=32)
-        hist_local = hist_local / (hist_local.sum() + 1e-8)
-        features.append(stats.entropy(hist_local))
-        
-        # Min et Max
-        features.append(np.min(image_array))
-        features.append(np.max(image_array))
-        
-        # Total: 16 + 8 + 2 + 6 = 32 features
-        return np.array(features, dtype=np.float32)
-        
-    except Exception as e:
+        return extract_view_features(to_view_gray(preprocess_mammogram(str(image_path))))
+    except Exception:
         return None
 
-# Extraire features et labels
-features_list = []
-labels_list = []
-failed = 0
-
-for idx, row in train_data.iterrows():
-    if (idx + 1) % 500 == 0:
-        print(f"  Traité {idx + 1}/{len(train_data)} images...")
-    
-    # Chercher l'image
-    study_id = row['study_id']
-    image_id = row['image_id']
-    image_path = get_image_path(study_id, image_id)
-    
-    if image_path is None:
-        failed += 1
-        continue
-    
-    # Extraire features
-    features = extract_features_from_image(image_path)
-    if features is None:
-        failed += 1
-        continue
-    
-    # Label
-    view_name = f"{row['view_position']}_{row['laterality']}"
-    
-    features_list.append(features)
-    labels_list.append(view_name)
-
-print(f"\n✓ {len(features_list)} images extraites avec succès")
-print(f"  {failed} images non trouvées ou en erreur")
-
-if len(features_list) < 100:
-    print("❌ Pas assez d'images trouvées ! Vérifiez les chemins.")
-    exit(1)
-
-# 4. Préparer les données
-print("\n[4/6] Préparation des données d'entraînement...")
-
-# Encoder les labels
-view_classes = sorted(set(labels_list))
-view_to_idx = {cls: idx for idx, cls in enumerate(view_classes)}
-idx_to_view = {idx: cls for cls, idx in view_to_idx.items()}
-
-print(f"Classes de vues: {view_classes}")
-
-X = np.array(features_list)
-y = np.array([view_to_idx[label] for label in labels_list])
-
-# Split train/val
-X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-
-print(f"✓ Train: {len(X_train)}, Val: {len(X_val)}")
-
-# Vérifier les dimensions
-print(f"\nDimensions des données:")
-print(f"  X shape: {X.shape}")
-print(f"  X_train shape: {X_train.shape}")
-print(f"  X_val shape: {X_val.shape}")
-
-# 5. Créer le modèle
-print("\n[5/6] Création du modèle...")
-
-class ViewClassifier(nn.Module):
-    def __init__(self, num_views=4):
-        super().__init__()
-        self.model = nn.Sequential(
-            nn.Linear(32, 256),
-            nn.ReLU(),
-            nn.Dropout(0.3),
-            nn.Linear(256, 128),
-            nn.ReLU(),
-            nn.Dropout(0.3),
-            nn.Linear(128, num_views)
-        )
-    
-    def forward(self, x):
-        return self.model(x)
-
-model = ViewClassifier(num_views=len(view_classes))
-criterion = nn.CrossEntropyLoss()
-optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE)
-
-print(f"✓ Modèle créé avec {sum(p.numel() for p in model.parameters())} paramètres")
-
-# 6. Entraînement
-print("\n[6/6] Entraînement...")
-
-X_train_tensor = torch.FloatTensor(X_train)
-y_train_tensor = torch.LongTensor(y_train)
-X_val_tensor = torch.FloatTensor(X_val)
-y_val_tensor = torch.LongTensor(y_val)
-
-best_val_acc = 0.0
-
-for epoch in range(EPOCHS):
-    # Training
-    model.train()
-    train_loss = 0.0
-    
-    for i in range(0, len(X_train), BATCH_SIZE):
-        batch_X = X_train_tensor[i:i+BATCH_SIZE]
-        batch_y = y_train_tensor[i:i+BATCH_SIZE]
-        
-        optimizer.zero_grad()
-        outputs = model(batch_X)
-        loss = criterion(outputs, batch_y)
-        loss.backward()
-        optimizer.step()
-        
-        train_loss += loss.item()
-    
-    avg_train_loss = train_loss / (len(X_train) / BATCH_SIZE)
-    
-    # Validation
-    model.eval()
-    with torch.no_grad():
-        val_outputs = model(X_val_tensor)
-        val_preds = torch.argmax(val_outputs, dim=1)
-        
-        # Convertir en numpy pour sklearn
-        val_preds_np = val_preds.cpu().numpy()
-        y_val_np = y_val if isinstance(y_val, np.ndarray) else y_val.numpy()
-        
-        val_acc = accuracy_score(y_val_np, val_preds_np)
-        
-        if val_acc > best_val_acc:
-            best_val_acc = val_acc
-    
-    if (epoch + 1) % 10 == 0:
-        print(f"  Epoch {epoch+1}/{EPOCHS}, Loss: {avg_train_loss:.4f}, Val Acc: {val_acc:.4f}")
-        print(f"  Classes prévues: {[idx_to_view[int(p)] for p in val_preds_np[:10]]}")
-
-print(f"\n✓ Meilleure validation accuracy: {best_val_acc:.4f}")
-
-# 7. Rapport final
-print("\n" + "=" * 70)
-print("RAPPORT D'ÉVALUATION")
-print("=" * 70)
-
-model.eval()
-with torch.no_grad():
-    final_outputs = model(X_val_tensor)
-    final_preds = torch.argmax(final_outputs, dim=1)
-
-# Convertir en numpy
-final_preds_np = final_preds.cpu().numpy()
-y_val_np = y_val if isinstance(y_val, np.ndarray) else y_val.numpy()
-
-print("\nClassification Report:")
-print(classification_report(y_val_np, final_preds_np, 
-                          target_names=view_classes))
-
-# 8. Sauvegarder le modèle
-print("\n" + "=" * 70)
-print("SAUVEGARDE DU MODÈLE")
-print("=" * 70)
-
-checkpoint = {
-    'view_classifier': model.state_dict(),
-    'view_classes': view_classes,
-    'view_to_idx': view_to_idx,
-    'idx_to_view': idx_to_view,
-    'num_view_classes': len(view_classes),
-    'best_val_acc': best_val_acc,
-    'num_samples': len(features_list)
-}
 
-# Sauvegarder
-model_path = Path('model/view_classifier_trained.pth')
-torch.save(checkpoint, str(model_path))
-print(f"\n✓ Modèle sauvegardé: {model_path}")
+def _cache_paths():
+    stem = f"view_features_{VIEW_FEATURE_VERSION}"
+    return FEATURE_CACHE_DIR / f"{stem}.npy", FEATURE_CACHE_DIR / f"{stem}_index.json"
+
+
+def load_feature_cache():
+    """Charge le cache (matrice en memmap lecture seule + index image_id -> ligne)"""
+    matrix_path, index_path = _cache_paths()
+    if not matrix_path.exists() or not index_path.exists():
+        return None, {}, set()
+    index = json.loads(index_path.read_text())
+    matrix = np.load(matrix_path, mmap_mode='r')
+    if matrix.shape[1:] != (VIEW_FEATURE_DIM,) or any(row >= matrix.shape[0] for row in index["rows"].values()):
+        print("  ⚠️ Cache de features incohérent, il sera reconstruit")
+        return None, {}, set()
+    return matrix, index["rows"], set(index.get("failed", []))
+
+
+def extract_features_cached(samples):
+    """
+    Retourne la matrice de features (memmap) et l'index image_id -> ligne pour samples
+    [(image_id, image_path)]. Seules les images absentes du cache sont lues, en parallèle.
+    """
+    cached_matrix, rows, failed_ids = load_feature_cache()
+    missing = [(image_id, path) for image_id, path in samples if image_id not in rows and image_id not in failed_ids]
+    print(f"  Cache {VIEW_FEATURE_VERSION}: {len(rows)} images en cache, {len(missing)} à extraire")
+    if not missing:
+        return cached_matrix, rows, failed_ids
+
+    # Nouvelle matrice = lignes en cache + nouvelles lignes, écrite directement sur disque
+    # (les lignes des images en erreur restent inutilisées: seul l'index fait foi)
+    FEATURE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    matrix_path, index_path = _cache_paths()
+    tmp_path = matrix_path.with_suffix('.tmp.npy')
+    n_cached = cached_matrix.shape[0] if cached_matrix is not None else 0
+    matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                       shape=(n_cached + len(missing), VIEW_FEATURE_DIM))
+    if n_cached:
+        matrix[:n_cached] = cached_matrix
+    del cached_matrix
+
+    with ProcessPoolExecutor(max_workers=NUM_WORKERS, initializer=_init_worker) as executor:
+        paths = [str(path) for _, path in missing]
+        chunksize = max(1, len(paths) // (NUM_WORKERS * 16))
+        results = executor.map(extract_features_from_image, paths, chunksize=chunksize)
+        for offset, ((image_id, _), features) in enumerate(zip(missing, results)):
+            if features is None:
+                failed_ids.add(image_id)
+            else:
+                matrix[n_cached + offset] = features
+                rows[image_id] = n_cached + offset
+            if (offset + 1) % 500 == 0:
+                print(f"  Traité {offset + 1}/{len(missing)} images...")
+
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, matrix_path)
+    index_path.write_text(json.dumps({
+        "version": VIEW_FEATURE_VERSION,
+        "rows": rows,
+        "failed": sorted(failed_ids),
+    }))
+    return np.load(matrix_path, mmap_mode='r'), rows, failed_ids
+
+
+def main():
+    print("=" * 70)
+    print("ENTRAÎNEMENT DU CLASSIFIEUR DE VUES")
+    print("Basé sur les vraies images du dataset")
+    print("=" * 70)
+
+    # 1. Charger les annotations
+    print("\n[1/6] Chargement des annotations...")
+    annotations = pd.read_csv('../../../breast-level_annotations (1).csv')
+    print(f"✓ {len(annotations)} annotations chargées")
+
+    # Garder seulement les échantillons d'entraînement
+    train_data = annotations[annotations['split'] == 'training']
+    print(f"✓ {len(train_data)} échantillons d'entraînement")
+
+    # Limiter si nécessaire
+    if MAX_SAMPLES:
+        train_data = train_data.head(MAX_SAMPLES)
+        print(f"  (Limité à {MAX_SAMPLES} pour test rapide)")
+
+    # 2. Préparer les paths des images
+    print("\n[2/6] Préparation des chemins d'images...")
+    samples = []
+    labels_by_id = {}
+    failed = 0
+    for study_id, image_id, view_position, laterality in train_data[
+            ['study_id', 'image_id', 'view_position', 'laterality']].itertuples(index=False):
+        image_path = get_image_path(study_id, image_id)
+        if image_path is None:
+            failed += 1
+            continue
+        samples.append((image_id, image_path))
+        labels_by_id[image_id] = f"{view_position}_{laterality}"
+
+    # 3. Extraction des features
+    print(f"\n[3/6] Extraction des features ({NUM_WORKERS} processus, cache memmap)...")
+    feature_matrix, rows, failed_ids = extract_features_cached(samples)
+
+    kept_ids = [image_id for image_id, _ in samples if image_id in rows]
+    failed += len(samples) - len(kept_ids)
+    X = np.asarray(feature_matrix[[rows[image_id] for image_id in kept_ids]], dtype=np.float32)
+    labels_list = [labels_by_id[image_id] for image_id in kept_ids]
+
+    print(f"\n✓ {len(kept_ids)} images extraites avec succès")
+    print(f"  {failed} images non trouvées ou en erreur")
+
+    if len(kept_ids) < 100:
+        print("❌ Pas assez d'images trouvées ! Vérifiez les chemins.")
+        sys.exit(1)
+
+    # 4. Préparer les données
+    print("\n[4/6] Préparation des données d'entraînement...")
+
+    # Encoder les labels
+    view_classes = sorted(set(labels_list))
+    view_to_idx = {cls: idx for idx, cls in enumerate(view_classes)}
+    idx_to_view = {idx: cls for cls, idx in view_to_idx.items()}
+
+    print(f"Classes de vues: {view_classes}")
+
+    y = np.array([view_to_idx[label] for label in labels_list])
+
+    # Split train/val
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    print(f"✓ Train: {len(X_train)}, Val: {len(X_val)}")
+
+    # Vérifier les dimensions
+    print(f"\nDimensions des données:")
+    print(f"  X shape: {X.shape}")
+    print(f"  X_train shape: {X_train.shape}")
+    print(f"  X_val shape: {X_val.shape}")
+
+    # 5. Créer le modèle
+    print("\n[5/6] Création du modèle...")
+
+    model = ViewClassifier(num_views=len(view_classes))
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE)
+
+    print(f"✓ Modèle créé avec {sum(p.numel() for p in model.parameters())} paramètres")
+
+    # 6. Entraînement
+    print("\n[6/6] Entraînement...")
+
+    X_train_tensor = torch.FloatTensor(X_train)
+    y_train_tensor = torch.LongTensor(y_train)
+    X_val_tensor = torch.FloatTensor(X_val)
+    y_val_tensor = torch.LongTensor(y_val)
+
+    best_val_acc = 0.0
+
+    for epoch in range(EPOCHS):
+        # Training
+        model.train()
+        train_loss = 0.0
+
+        for i in range(0, len(X_train), BATCH_SIZE):
+            batch_X = X_train_tensor[i:i+BATCH_SIZE]
+            batch_y = y_train_tensor[i:i+BATCH_SIZE]
 
-print("\n" + "=" * 70)
-print("ENTRAÎNEMENT TERMINÉ AVEC SUCCÈS!")
-print("=" * 70)
-print(f"\nLe classifieur peut détecter les 4 vues avec {best_val_acc*100:.1f}% de précision.")
-print("Vous pouvez maintenant l'utiliser dans inference_service_simple.py")
+            optimizer.zero_grad()
+            outputs = model(batch_X)
+            loss = criterion(outputs, batch_y)
+            loss.backward()
+            optimizer.step()
 
+            train_loss += loss.item()
+
+        avg_train_loss = train_loss / (len(X_train) / BATCH_SIZE)
+
+        # Validation
+        model.eval()
+        with torch.no_grad():
+            val_outputs = model(X_val_tensor)
+            val_loss = criterion(val_outputs, y_val_tensor).item()
+            val_preds = torch.argmax(val_outputs, dim=1)
+
+            # Convertir en numpy pour sklearn
+            val_preds_np = val_preds.cpu().numpy()
+            y_val_np = y_val if isinstance(y_val, np.ndarray) else y_val.numpy()
+
+            val_acc = accuracy_score(y_val_np, val_preds_np)
+
+            if val_acc > best_val_acc:
+                best_val_acc = val_acc
+
+        if (epoch + 1) % 10 == 0:
+            print(f"  Epoch {epoch+1}/{EPOCHS}, Loss: {avg_train_loss:.4f}, Val Loss: {val_loss:.4f}, Val Acc: {val_acc:.4f}")
+            print(f"  Classes prévues: {[idx_to_view[int(p)] for p in val_preds_np[:10]]}")
+
+    print(f"\n✓ Meilleure validation accuracy: {best_val_acc:.4f}")
+
+    # 7. Rapport final
+    print("\n" + "=" * 70)
+    print("RAPPORT D'ÉVALUATION")
+    print("=" * 70)
+
+    model.eval()
+    with torch.no_grad():
+        final_outputs = model(X_val_tensor)
+        final_preds = torch.argmax(final_outputs, dim=1)
+
+    # Convertir en numpy
+    final_preds_np = final_preds.cpu().numpy()
+    y_val_np = y_val if isinstance(y_val, np.ndarray) else y_val.numpy()
+
+    print("\nClassification Report:")
+    print(classification_report(y_val_np, final_preds_np, 
+                              target_names=view_classes))
+
+    # 8. Sauvegarder le modèle
+    print("\n" + "=" * 70)
+    print("SAUVEGARDE DU MODÈLE")
+    print("=" * 70)
+
+    checkpoint = {
+        'view_classifier': model.state_dict(),
+        'view_classes': view_classes,
+        'view_to_idx': view_to_idx,
+        'idx_to_view': idx_to_view,
+        'num_view_classes': len(view_classes),
+        'best_val_acc': best_val_acc,
+        'num_samples': len(kept_ids),
+        'feature_version': VIEW_FEATURE_VERSION
+    }
+
+    # Sauvegarder
+    model_path = Path('model/view_classifier_trained.pth')
+    torch.save(checkpoint, str(model_path))
+    print(f"\n✓ Modèle sauvegardé: {model_path}")
+
+    print("\n" + "=" * 70)
+    print("ENTRAÎNEMENT TERMINÉ AVEC SUCCÈS!")
+    print("=" * 70)
+    print(f"\nLe classifieur peut détecter les 4 vues avec {best_val_acc*100:.1f}% de précision.")
+    print("Vous pouvez maintenant l'utiliser dans inference_service_simple.py")
+
+
+if __name__ == "__main__":
+    main()
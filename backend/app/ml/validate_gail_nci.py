@@ -8,9 +8,47 @@ Instructions d'utilisation :
 3. Noter les résultats obtenus
 4. Comparer avec les résultats de ce script
 5. Documenter les écarts dans GAIL_VALIDATION_RESULTS.md
+
+La non-régression sur toute la grille des entrées (chemins scalaire, lot et table,
+fichier de référence) est assurée par app/ml/gail_regression.py.
+
+Code de sortie 1 si le risque absolu intégré s'écarte des valeurs publiées au-delà de
+PUBLISHED_RISK_RATIO_BOUNDS (le risque à vie reste alors désactivé dans l'API).
 """
 
-from app.ml.gail_risk_calculator import GailModelRiskCalculator
+import sys
+
+from app.ml.gail_risk_calculator import GailModelRiskCalculator, PUBLISHED_RISK_RATIO_BOUNDS
+
+
+def validate_absolute_risk_integration(calculator=None):
+    """
+    Compare le risque absolu intégré (mortalité concurrente, sans facteur de risque
+    ni ajustement mode de vie) aux probabilités publiées pour la population générale
+
+    Le profil de référence Gail (aucun facteur) est un peu moins à risque que la
+    population générale: des écarts modérés sont attendus, des écarts d'un facteur
+    2 ou plus signalent des taux d'incidence de base à revoir.
+    """
+    calculator = calculator or GailModelRiskCalculator()
+    
+    print("\n" + "=" * 80)
+    print("RISQUE ABSOLU INTÉGRÉ vs VALEURS PUBLIÉES (ACS 2019-2020)")
+    print("=" * 80)
+    
+    comparison = calculator.compare_absolute_risk_to_published()
+    for row in comparison:
+        horizon = row['horizon_years']
+        label = f"{horizon} ans à partir de {row['age']} ans" if horizon else "à vie (jusqu'à 90 ans)"
+        status = "✅" if row['within_bounds'] else "❌"
+        print(f"   {status} Risque {label:32s}: {row['ours']:6.2f}% "
+              f"(publié {row['published']:.1f}%, ratio {row['ratio']:.2f})")
+    
+    low, high = PUBLISHED_RISK_RATIO_BOUNDS
+    if not all(row['within_bounds'] for row in comparison):
+        print(f"\n❌ Rapport hors de [{low}, {high}]: risque à vie et risque sur horizon désactivés (None)")
+    return comparison
+
 
 def validate_gail_model():
     """
@@ -139,7 +177,11 @@ def validate_gail_model():
         
         print("\n📈 RÉSULTATS DE NOTRE IMPLÉMENTATION :")
         print(f"   Risque 5 ans : {our_result['risk_5_years']:.4f}%")
-        print(f"   Risque à vie : {our_result['risk_lifetime']:.4f}%")
+        if our_result['risk_lifetime'] is not None:
+            print(f"   Risque à vie : {our_result['risk_lifetime']:.4f}% "
+                  f"(Gail pur : {our_result['risk_lifetime_gail_pure']:.4f}%)")
+        else:
+            print("   Risque à vie : non calculé (intégration non validée)")
         print(f"   Catégorie    : {our_result['risk_category']}")
         print(f"   Risque Gail pur (sans mode de vie) : {our_result['risk_gail_pure']:.4f}%")
         
@@ -171,7 +213,10 @@ def validate_gail_model():
     print("  2. L'utilisation de l'intercept")
     print("  3. Les taux d'incidence SEER exacts")
     print("  4. La formule d'intégration du risque absolu")
+    
+    return validate_absolute_risk_integration(calculator)
 
 if __name__ == "__main__":
-    validate_gail_model()
+    comparison = validate_gail_model()
+    sys.exit(0 if all(row['within_bounds'] for row in comparison) else 1)
 
@@ -0,0 +1,245 @@
+"""
+Moteur unifié de classification des vues mammographiques (CC/MLO, L/R)
+
+Les 32 features de vue sont calculées une seule fois à partir de l'image déjà
+prétraitée (448x448, CLAHE) et toutes les images d'une étude passent dans le
+ViewClassifier en un seul forward batché. Les heuristiques ne servent que si
+aucun classificateur n'est chargé.
+"""
+
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+from scipy import ndimage, stats
+
+# Dimension et version du vecteur de features (doit correspondre à train_view_classifier.py)
+VIEW_FEATURE_DIM = 32
+VIEW_FEATURE_VERSION = "view-features-v3"
+VIEW_IMAGE_SIZE = 448
+
+# Confiance attribuée aux prédictions heuristiques (sans modèle entraîné)
+HEURISTIC_CONFIDENCE = 0.6
+
+# Index des features utilisées par l'heuristique de repli
+_IDX_MEAN = 16
+_IDX_H_SYM = 20
+_IDX_V_SYM = 21
+_IDX_EDGE_DENSITY = 22
+
+# Conversion des labels du classificateur (VinDr: CC_L) vers le format stocké (CC_LEFT)
+SIDE_LABELS = {"L": "LEFT", "R": "RIGHT"}
+
+
+class ViewClassifier(nn.Module):
+    """MLP entraîné sur les 32 features de vue (voir train_view_classifier.py)"""
+
+    def __init__(self, num_views=4):
+        super().__init__()
+        self.model = nn.Sequential(
+            nn.Linear(VIEW_FEATURE_DIM, 256),
+            nn.ReLU(),
+            nn.Dropout(0.3),
+            nn.Linear(256, 128),
+            nn.ReLU(),
+            nn.Dropout(0.3),
+            nn.Linear(128, num_views)
+        )
+
+    def forward(self, x):
+        return self.model(x)
+
+
+def to_view_gray(image_array: np.ndarray) -> np.ndarray:
+    """
+    Ramène une image prétraitée (RGB ou niveaux de gris, [0, 1] ou uint8)
+    à un tableau float32 2D 448x448 dans [0, 1]
+    """
+    if image_array.ndim == 3:
+        image_array = image_array[:, :, 0]
+    if image_array.dtype == np.uint8:
+        gray = image_array.astype(np.float32) / 255.0
+    else:
+        gray = image_array.astype(np.float32, copy=False)
+    if gray.shape != (VIEW_IMAGE_SIZE, VIEW_IMAGE_SIZE):
+        gray = cv2.resize(gray, (VIEW_IMAGE_SIZE, VIEW_IMAGE_SIZE))
+    return gray
+
+
+def local_variance(gray: np.ndarray, size: int = 3) -> np.ndarray:
+    """
+    Variance locale par filtres uniformes: E[x²] - E[x]²
+    Équivalent à ndimage.generic_filter(gray, np.var, size=size) sans appel Python par pixel
+    """
+    gray64 = gray.astype(np.float64)
+    mean = ndimage.uniform_filter(gray64, size=size)
+    mean_sq = ndimage.uniform_filter(gray64 * gray64, size=size)
+    return np.maximum(mean_sq - mean * mean, 0.0)
+
+
+def extract_view_features(gray: np.ndarray) -> np.ndarray:
+    """
+    Extrait les 32 features de vue depuis une image 448x448 float32 [0, 1] déjà
+    égalisée par CLAHE (mêmes features que lors de l'entraînement)
+    """
+    half = VIEW_IMAGE_SIZE // 2
+
+    mean = np.mean(gray)
+    std = np.std(gray)
+    q25, q75 = np.percentile(gray, [25, 75])
+
+    # Symétrie
+    h_sym = np.mean(gray[:, :half]) - np.mean(gray[:, half:])
+    v_sym = np.mean(gray[:half, :]) - np.mean(gray[half:, :])
+
+    # Densité de contours
+    gray_uint8 = (gray * 255).astype(np.uint8)
+    edges = cv2.Canny(gray_uint8, 50, 150)
+    edge_density = np.count_nonzero(edges) / edges.size
+
+    # Aspect ratio (toujours 1.0 après redimensionnement, conservé pour compatibilité)
+    aspect = 1.0
+
+    # Histogramme (16 bins)
+    hist = cv2.calcHist([gray], [0], None, [16], [0, 1])
+    features = list(hist.flatten())
+
+    # Statistiques de base (8 features)
+    features.extend([mean, std, q25, q75, h_sym, v_sym, edge_density, aspect])
+
+    # Gradients (2 features)
+    grad_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
+    grad_y = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+    gradient_magnitude = np.sqrt(grad_x**2 + grad_y**2)
+    features.append(np.mean(gradient_magnitude))
+    features.append(np.std(gradient_magnitude))
+
+    # Texture (6 features)
+    flat = gray.ravel()
+    features.append(np.mean(local_variance(gray)))
+    features.append(stats.skew(flat))
+    features.append(stats.kurtosis(flat))
+    hist_local, _ = np.histogram(flat, bins=32)
+    hist_local = hist_local / (hist_local.sum() + 1e-8)
+    features.append(stats.entropy(hist_local))
+    features.append(np.min(gray))
+    features.append(np.max(gray))
+
+    return np.asarray(features, dtype=np.float32)
+
+
+def extract_view_feature_matrix(image_arrays: Sequence[np.ndarray]) -> np.ndarray:
+    """Empile les features de vue de plusieurs images prétraitées en une matrice (N, 32)"""
+    if not image_arrays:
+        return np.zeros((0, VIEW_FEATURE_DIM), dtype=np.float32)
+    return np.stack([extract_view_features(to_view_gray(image)) for image in image_arrays])
+
+
+def heuristic_view(features: np.ndarray) -> Tuple[str, float]:
+    """
+    Heuristique de repli à partir des features déjà calculées
+    Plus de tissu à gauche de l'image = sein droit (analyse VinDr-Mammo)
+    """
+    mean = float(features[_IDX_MEAN]) or 1e-6
+    h_sym = float(features[_IDX_H_SYM])
+    v_sym = float(features[_IDX_V_SYM])
+    edge_density = float(features[_IDX_EDGE_DENSITY])
+
+    side = "R" if h_sym / mean > 0.05 else "L"
+
+    # CC: plus symétrique horizontalement, MLO: plus de contours (muscle pectoral)
+    if abs(h_sym) < abs(v_sym) * 0.7:
+        view_type = "CC"
+    elif edge_density > 0.13:
+        view_type = "MLO"
+    else:
+        view_type = "CC"
+
+    return f"{view_type}_{side}", HEURISTIC_CONFIDENCE
+
+
+def to_stored_view(view_pred: Optional[str]) -> str:
+    """Convertit une vue 'CC_L' en 'CC_LEFT' (format de original_files[].view_type)"""
+    if not view_pred or "_" not in view_pred:
+        return "UNKNOWN"
+    view_type, side = view_pred.split("_", 1)
+    return f"{view_type}_{SIDE_LABELS.get(side, side)}"
+
+
+class ViewEngine:
+    """
+    Classification des vues pour toutes les images d'une étude en un seul passage
+    """
+
+    def __init__(self, device: torch.device = None):
+        self.device = device or torch.device("cpu")
+        self.classifier = None
+        self.idx_to_view = {}
+        self.view_classes = []
+        self.best_val_acc = None
+
+    @property
+    def has_classifier(self) -> bool:
+        return self.classifier is not None
+
+    def load(self, checkpoint_path: str) -> bool:
+        """Charge le ViewClassifier entraîné (view_classifier_trained.pth)"""
+        try:
+            if not os.path.exists(checkpoint_path):
+                print(f"⚠️ Classifieur de vues non trouvé à {checkpoint_path}")
+                print("  Les vues seront déterminées par heuristiques")
+                self.classifier = None
+                return False
+
+            print(f"Chargement du classifieur de vues depuis {checkpoint_path}")
+            checkpoint = torch.load(checkpoint_path, map_location=self.device)
+
+            classifier = ViewClassifier(num_views=checkpoint['num_view_classes'])
+            classifier.load_state_dict(checkpoint['view_classifier'])
+            classifier.to(self.device)
+            classifier.eval()
+
+            self.classifier = classifier
+            self.view_classes = checkpoint['view_classes']
+            self.idx_to_view = {int(idx): view for idx, view in checkpoint['idx_to_view'].items()}
+            self.best_val_acc = checkpoint.get('best_val_acc')
+
+            if self.best_val_acc is not None:
+                print(f"✓ Classifieur de vues chargé ({self.best_val_acc*100:.1f}% précision)")
+            else:
+                print("✓ Classifieur de vues chargé")
+            return True
+        except Exception as e:
+            print(f"Erreur lors du chargement du classifieur de vues: {e}")
+            self.classifier = None
+            return False
+
+    def classify_features(self, feature_matrix: np.ndarray) -> List[Tuple[str, float]]:
+        """Classe une matrice (N, 32) de features en un seul forward batché"""
+        if len(feature_matrix) == 0:
+            return []
+
+        if self.classifier is None:
+            return [heuristic_view(features) for features in feature_matrix]
+
+        probs = self.predict_proba(feature_matrix)
+        indices = probs.argmax(axis=1)
+        return [
+            (self.idx_to_view.get(int(idx), "CC_L"), float(row[idx]))
+            for idx, row in zip(indices, probs)
+        ]
+
+    def predict_proba(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """Probabilités (N, nb_vues) du classificateur, colonnes dans l'ordre de idx_to_view"""
+        if self.classifier is None:
+            raise ValueError("Aucun classifieur de vues chargé")
+        features_tensor = torch.from_numpy(np.ascontiguousarray(feature_matrix, dtype=np.float32)).to(self.device)
+        with torch.no_grad():
+            return torch.softmax(self.classifier(features_tensor), dim=1).cpu().numpy()
+
+    def classify(self, image_arrays: Sequence[np.ndarray]) -> List[Tuple[str, float]]:
+        """Calcule les features puis classe toutes les images prétraitées d'une étude"""
+        return self.classify_features(extract_view_feature_matrix(image_arrays))
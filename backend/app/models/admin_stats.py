@@ -0,0 +1,19 @@
+"""
+Materialized admin dashboard counters
+"""
+
+from sqlalchemy import Column, Integer
+
+from app.models.base import BaseModel
+
+
+class AdminStatCounter(BaseModel):
+    """
+    Compteur matérialisé du tableau de bord admin
+
+    id est le nom du compteur: global ("analyses:total") ou journalier
+    ("analyses@2025-11-02"). Maintenu par app.services.admin_stats_service.
+    """
+    __tablename__ = "admin_stat_counters"
+
+    value = Column(Integer, nullable=False, default=0)
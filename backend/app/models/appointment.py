@@ -2,7 +2,7 @@
 Appointment model for booking appointments with healthcare centers
 """
 
-from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -12,6 +12,10 @@ class Appointment(BaseModel):
     Appointment model for booking appointments at healthcare centers
     """
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Créneaux d'un centre par date (migration 0002_performance_indexes)
+        Index("ix_appointments_center_id_appointment_date", "center_id", "appointment_date"),
+    )
     
     # Foreign Keys
     center_id = Column(String, ForeignKey("healthcare_centers.id"), nullable=False)
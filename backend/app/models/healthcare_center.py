@@ -2,8 +2,17 @@
 Healthcare Center model for medical facilities offering breast cancer screening
 """
 
-from sqlalchemy import Column, String, Float, Text, Boolean, Integer, JSON
-from app.models.base import BaseModel
+import json
+
+from sqlalchemy import Column, String, Float, Text, Boolean, Integer, JSON, Index, ForeignKey, delete, event, inspect, insert, select
+from app.models.base import Base, BaseModel
+
+# Colonnes JSON recopiées dans healthcare_center_tags (kind -> colonne)
+TAG_COLUMNS = {
+    "service": "services",
+    "equipment": "equipment",
+    "specialty": "specialties",
+}
 
 
 class HealthcareCenter(BaseModel):
@@ -11,6 +20,10 @@ class HealthcareCenter(BaseModel):
     Healthcare center (hospital, clinic) model for breast cancer screening facilities
     """
     __tablename__ = "healthcare_centers"
+    __table_args__ = (
+        # Préfiltre des recherches de proximité (migration 0004_location_indexes)
+        Index("ix_healthcare_centers_latitude_longitude", "latitude", "longitude"),
+    )
     
     # Basic Information
     name = Column(String, nullable=False, index=True)
@@ -52,3 +65,74 @@ class HealthcareCenter(BaseModel):
     # Capacity (for booking management)
     max_appointments_per_day = Column(Integer, default=20)
 
+    @classmethod
+    def has_tag(cls, kind: str, value: str):
+        """Condition SQL: le centre propose `value` (kind: service, equipment ou specialty)"""
+        return cls.id.in_(
+            select(HealthcareCenterTag.center_id).where(
+                HealthcareCenterTag.kind == kind,
+                HealthcareCenterTag.value == value
+            )
+        )
+
+
+class HealthcareCenterTag(Base):
+    """
+    Service, équipement ou spécialité d'un centre, un par ligne
+
+    Copie indexée des colonnes JSON services/equipment/specialties (qui restent la
+    source des réponses de l'API), tenue à jour à chaque écriture ORM d'un centre.
+    """
+    __tablename__ = "healthcare_center_tags"
+    __table_args__ = (
+        # Centres proposant un service donné (migration 0005_center_tags)
+        Index("ix_healthcare_center_tags_kind_value", "kind", "value"),
+    )
+
+    center_id = Column(String, ForeignKey("healthcare_centers.id", ondelete="CASCADE"), primary_key=True)
+    kind = Column(String, primary_key=True)  # service, equipment, specialty
+    value = Column(String, primary_key=True)
+
+
+def center_tag_rows(center_id: str, kind: str, values) -> list:
+    """Lignes healthcare_center_tags d'une colonne JSON (liste, ou chaîne JSON pour les anciennes données)"""
+    if isinstance(values, str):
+        try:
+            values = json.loads(values)
+        except ValueError:
+            values = [values]
+    if not isinstance(values, list):
+        return []
+    unique_values = dict.fromkeys(str(value) for value in values if value not in (None, ""))
+    return [{"center_id": center_id, "kind": kind, "value": value} for value in unique_values]
+
+
+def _sync_center_tags(connection, target, kinds) -> None:
+    table = HealthcareCenterTag.__table__
+    for kind in kinds:
+        connection.execute(delete(table).where(table.c.center_id == target.id, table.c.kind == kind))
+        rows = center_tag_rows(target.id, kind, getattr(target, TAG_COLUMNS[kind]))
+        if rows:
+            connection.execute(insert(table), rows)
+
+
+def _after_center_insert(mapper, connection, target):
+    _sync_center_tags(connection, target, TAG_COLUMNS)
+
+
+def _after_center_update(mapper, connection, target):
+    attrs = inspect(target).attrs
+    _sync_center_tags(connection, target, [
+        kind for kind, column in TAG_COLUMNS.items() if attrs[column].history.has_changes()
+    ])
+
+
+def _before_center_delete(mapper, connection, target):
+    # ON DELETE CASCADE n'est pas appliqué par SQLite sans PRAGMA foreign_keys
+    table = HealthcareCenterTag.__table__
+    connection.execute(delete(table).where(table.c.center_id == target.id))
+
+
+event.listen(HealthcareCenter, "after_insert", _after_center_insert)
+event.listen(HealthcareCenter, "after_update", _after_center_update)
+event.listen(HealthcareCenter, "before_delete", _before_center_delete)
@@ -2,12 +2,27 @@
 Mammography analysis model
 """
 
-from sqlalchemy import Column, String, Float, Text, JSON, ForeignKey, Enum
+from sqlalchemy import Column, String, Float, Text, JSON, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
+from datetime import datetime
 import enum
 
 from app.models.base import BaseModel
 
+# Suffixe des codes de rapport (R-AAAA-<fin de l'id>) des nouvelles analyses: 12 caractères
+# hexadécimaux d'un uuid4, sans collision en pratique (les codes historiques en ont 4)
+REPORT_CODE_SUFFIX_LENGTH = 12
+
+
+def make_report_code(analysis_pk: str, created_at=None, suffix_length: int = REPORT_CODE_SUFFIX_LENGTH) -> str:
+    """Code de rapport affiché aux professionnels (R-2025-3f9c0a1b2c4d)"""
+    return f"R-{(created_at or datetime.now()).year}-{analysis_pk[-suffix_length:]}"
+
+
+def _default_report_code(context) -> str:
+    parameters = context.get_current_parameters()
+    return make_report_code(parameters["id"], parameters.get("created_at"))
+
 
 class BI_RADS_Category(enum.Enum):
     """
@@ -40,16 +55,18 @@ class MammographyAnalysis(BaseModel):
     patient_id = Column(String, ForeignKey("patients.id"), nullable=False)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     analysis_id = Column(String, unique=True, index=True, nullable=False)
+    # Généré à la création, recherche des rapports par index unique (migration 0003_report_codes)
+    report_code = Column(String, unique=True, index=True, default=_default_report_code)
     
     # Analysis results
-    bi_rads_category = Column(Enum(BI_RADS_Category))
+    bi_rads_category = Column(Enum(BI_RADS_Category), index=True)
     confidence_score = Column(Float)
     breast_density = Column(String)
     
     # Technical details
     model_version = Column(String)
     processing_time = Column(Float)
-    status = Column(Enum(AnalysisStatus), default=AnalysisStatus.PENDING)
+    status = Column(Enum(AnalysisStatus), default=AnalysisStatus.PENDING, index=True)
     
     # File information
     original_files = Column(JSON)  # List of file paths
@@ -64,3 +81,10 @@ class MammographyAnalysis(BaseModel):
     # Relationships - utiliser des strings pour éviter les imports circulaires
     patient = relationship("Patient", back_populates="analyses", lazy="select")
     user = relationship("User", back_populates="analyses", lazy="select")
+
+
+# Index des requêtes chaudes (migration 0002_performance_indexes): analyses d'un
+# professionnel / d'une patiente les plus récentes d'abord, fenêtres de dates
+Index("ix_mammography_analyses_user_id_created_at", MammographyAnalysis.user_id, MammographyAnalysis.created_at.desc())
+Index("ix_mammography_analyses_patient_id_created_at", MammographyAnalysis.patient_id, MammographyAnalysis.created_at.desc())
+Index("ix_mammography_analyses_created_at", MammographyAnalysis.created_at)
@@ -14,7 +14,7 @@ class Patient(BaseModel):
     """
     __tablename__ = "patients"
     
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     patient_id = Column(String, unique=True, index=True, nullable=False)
     full_name = Column(String, nullable=False)
     date_of_birth = Column(Date)
@@ -2,7 +2,7 @@
 Healthcare professional model
 """
 
-from sqlalchemy import Column, String, Float, ForeignKey, Text, Boolean
+from sqlalchemy import Column, String, Float, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 
 from app.models.base import BaseModel
@@ -13,6 +13,10 @@ class Professional(BaseModel):
     Healthcare professional model
     """
     __tablename__ = "professionals"
+    __table_args__ = (
+        # Préfiltre des recherches de proximité (migration 0004_location_indexes)
+        Index("ix_professionals_latitude_longitude", "latitude", "longitude"),
+    )
     
     full_name = Column(String, nullable=False)
     specialty = Column(String, nullable=False)  # radiology, oncology, etc.
@@ -0,0 +1,38 @@
+"""
+Shadow evaluation model (candidate checkpoint vs production, never shown to users)
+"""
+
+from sqlalchemy import Column, String, Float, Integer, Boolean
+
+from app.models.base import BaseModel
+
+
+class ShadowEvaluation(BaseModel):
+    """
+    Comparison of a candidate checkpoint's heads with the production prediction
+    for one image of a live analysis
+    """
+    __tablename__ = "shadow_evaluations"
+
+    analysis_id = Column(String, index=True, nullable=False)  # MammographyAnalysis.analysis_id
+    image_index = Column(Integer, nullable=False, default=0)
+    production_version = Column(String, nullable=False)
+    candidate_version = Column(String, nullable=False, index=True)
+
+    # BI-RADS
+    production_bi_rads = Column(String)
+    production_bi_rads_confidence = Column(Float)
+    candidate_bi_rads = Column(String)
+    candidate_bi_rads_confidence = Column(Float)
+    bi_rads_agreement = Column(Boolean)
+    bi_rads_confidence_delta = Column(Float)  # candidat - production
+
+    # Density
+    production_density = Column(String)
+    production_density_confidence = Column(Float)
+    candidate_density = Column(String)
+    candidate_density_confidence = Column(Float)
+    density_agreement = Column(Boolean)
+    density_confidence_delta = Column(Float)
+
+    candidate_latency_ms = Column(Float)
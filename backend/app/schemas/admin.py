@@ -143,6 +143,7 @@ class AnalysisSummaryResponse(BaseModel):
     low_risk_cases: int
     bi_rads_distribution: Dict[str, int]
     density_distribution: Dict[str, int]
+    daily_counts: Dict[str, int] = {}
     average_confidence: float
     top_findings: List[Dict[str, Any]]
     period: str
@@ -2,15 +2,30 @@
 Admin service for dashboard management
 """
 
-from typing import List, Optional, Dict, Any
+import csv
+import io
+import json
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional, Dict, Any
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, and_, desc, select
 
 from app.models.user import User
 from app.models.professional import Professional
 from app.models.patient import Patient
 from app.models.mammography import MammographyAnalysis
+from app.core.config import settings
+from app.services.admin_stats_service import (
+    AdminStatsService,
+    EXCLUDED_ADMIN_EMAIL,
+    HIGH_RISK_CATEGORIES,
+    USER_TYPES,
+    count_if,
+    sum_daily
+)
 from app.schemas.admin import (
     AdminDashboardStats,
     AccessRequestResponse,
@@ -24,6 +39,39 @@ from app.schemas.admin import (
 )
 
 
+# Export des rapports (/admin/reports/export)
+EXPORT_MODELS = {"users": User, "professionals": Professional, "analyses": MammographyAnalysis}
+EXPORT_EXCLUDED_COLUMNS = {"hashed_password"}
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_json_value(value):
+    """Sérialisation JSON des valeurs non natives (enum, dates)"""
+    if hasattr(value, "value"):
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _export_csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return _export_json_value(value)
+
+
+# Cache de get_analyses_summary par fenêtre (start_date, end_date): (expiration, résumé)
+SUMMARY_CACHE_OPEN_SECONDS = 60       # fenêtre ouverte (se termine maintenant)
+SUMMARY_CACHE_CLOSED_SECONDS = 3600   # fenêtre entièrement passée
+SUMMARY_CACHE_MAX_ENTRIES = 128
+_summary_cache: Dict[tuple, tuple] = {}
+_summary_cache_lock = threading.Lock()
+
+
 class AdminService:
     """Admin service for dashboard operations"""
     
@@ -44,79 +92,105 @@ class AdminService:
         except (json.JSONDecodeError, TypeError):
             return ["French"]
     
+    def _page_with_analysis_counts(self, query, entity, skip: int, limit: int, after: Optional[str]):
+        """
+        Page de `query` triée par id (offset, ou keyset si `after` est fourni) avec le
+        nombre d'analyses de chaque ligne, en une seule requête: sous-requête groupée
+        restreinte aux ids de la page, jointe à la page
+        """
+        query = query.order_by(entity.id)
+        if after:
+            query = query.filter(entity.id > after)
+        else:
+            query = query.offset(skip)
+        page = query.limit(limit).subquery()
+        
+        analysis_counts = self.db.query(
+            MammographyAnalysis.user_id.label("owner_id"),
+            func.count(MammographyAnalysis.id).label("total_analyses")
+        ).filter(
+            MammographyAnalysis.user_id.in_(select(page.c.id))
+        ).group_by(MammographyAnalysis.user_id).subquery()
+        
+        return self.db.query(
+            aliased(entity, page),
+            func.coalesce(analysis_counts.c.total_analyses, 0)
+        ).outerjoin(
+            analysis_counts, analysis_counts.c.owner_id == page.c.id
+        ).order_by(page.c.id).all()
+    
+    def _live_dashboard_counts(self, today, week_start, month_start) -> Dict[str, int]:
+        """Compteurs du tableau de bord: une requête à agrégation conditionnelle par table"""
+        counts = {}
+        
+        # Mobile users (patients) and professional users statistics
+        user_expressions = []
+        for user_type in USER_TYPES:
+            is_type = User.user_type == user_type
+            user_expressions += [
+                count_if(is_type),
+                count_if(and_(is_type, User.is_active == True)),
+                count_if(and_(is_type, User.is_verified == False)),
+            ]
+        (
+            counts["total_users"], counts["active_users"], counts["pending_users"],
+            counts["total_professionals"], counts["active_professionals"], counts["pending_professionals"],
+        ) = self.db.query(*user_expressions).one()
+        
+        # Analysis statistics (total, today, this week, this month, high risk cases)
+        analysis_day = func.date(MammographyAnalysis.created_at)
+        (
+            counts["total_analyses"], counts["analyses_today"], counts["analyses_this_week"],
+            counts["analyses_this_month"], counts["high_risk_cases"],
+        ) = self.db.query(
+            func.count(MammographyAnalysis.id),
+            count_if(analysis_day == today),
+            count_if(analysis_day >= week_start),
+            count_if(analysis_day >= month_start),
+            count_if(MammographyAnalysis.bi_rads_category.in_(HIGH_RISK_CATEGORIES)),
+        ).one()
+        
+        # Pending access requests (simulated - you might want to create an AccessRequest model)
+        counts["pending_access_requests"] = self.db.query(
+            count_if(Professional.is_verified == False)
+        ).scalar()
+        return counts
+    
+    def _materialized_dashboard_counts(self, today, week_start, month_start) -> Optional[Dict[str, int]]:
+        """Mêmes compteurs lus dans admin_stat_counters (une requête), None si indisponibles"""
+        counters = AdminStatsService(self.db).read_counters(since=min(week_start, month_start))
+        if counters is None:
+            return None
+        return {
+            "total_users": counters.get("users:patient:total", 0),
+            "active_users": counters.get("users:patient:active", 0),
+            "pending_users": counters.get("users:patient:unverified", 0),
+            "total_professionals": counters.get("users:professional:total", 0),
+            "active_professionals": counters.get("users:professional:active", 0),
+            "pending_professionals": counters.get("users:professional:unverified", 0),
+            "total_analyses": counters.get("analyses:total", 0),
+            "analyses_today": sum_daily(counters, "analyses", today),
+            "analyses_this_week": sum_daily(counters, "analyses", week_start),
+            "analyses_this_month": sum_daily(counters, "analyses", month_start),
+            "high_risk_cases": counters.get("analyses:high_risk", 0),
+            "pending_access_requests": counters.get("professionals:unverified", 0),
+        }
+    
     def get_dashboard_stats(self) -> AdminDashboardStats:
         """Get comprehensive dashboard statistics"""
         
-        # Mobile users (patients) statistics
-        total_mobile_users = self.db.query(User).filter(User.user_type == "patient").count()
-        active_mobile_users = self.db.query(User).filter(
-            User.user_type == "patient",
-            User.is_active == True
-        ).count()
-        pending_mobile_users = self.db.query(User).filter(
-            User.user_type == "patient",
-            User.is_verified == False
-        ).count()
-        
-        # Professional users statistics
-        total_professional_users = self.db.query(User).filter(User.user_type == "professional").count()
-        active_professional_users = self.db.query(User).filter(
-            User.user_type == "professional",
-            User.is_active == True
-        ).count()
-        pending_professional_users = self.db.query(User).filter(
-            User.user_type == "professional",
-            User.is_verified == False
-        ).count()
-        
-        # Analysis statistics
-        total_analyses = self.db.query(MammographyAnalysis).count()
-        
-        # Today's analyses
         today = datetime.now().date()
-        analyses_today = self.db.query(MammographyAnalysis).filter(
-            func.date(MammographyAnalysis.created_at) == today
-        ).count()
-        
-        # This week's analyses
         week_start = today - timedelta(days=today.weekday())
-        analyses_this_week = self.db.query(MammographyAnalysis).filter(
-            func.date(MammographyAnalysis.created_at) >= week_start
-        ).count()
-        
-        # This month's analyses
         month_start = today.replace(day=1)
-        analyses_this_month = self.db.query(MammographyAnalysis).filter(
-            func.date(MammographyAnalysis.created_at) >= month_start
-        ).count()
-        
-        # High risk cases
-        from app.models.mammography import BI_RADS_Category
-        high_risk_cases = self.db.query(MammographyAnalysis).filter(
-            or_(
-                MammographyAnalysis.bi_rads_category == BI_RADS_Category.CATEGORY_4,
-                MammographyAnalysis.bi_rads_category == BI_RADS_Category.CATEGORY_5
-            )
-        ).count()
         
-        # Pending access requests (simulated - you might want to create an AccessRequest model)
-        pending_access_requests = self.db.query(Professional).filter(
-            Professional.is_verified == False
-        ).count()
+        counts = None
+        if settings.ADMIN_STATS_MATERIALIZED:
+            counts = self._materialized_dashboard_counts(today, week_start, month_start)
+        if counts is None:
+            counts = self._live_dashboard_counts(today, week_start, month_start)
         
         return AdminDashboardStats(
-            total_users=total_mobile_users,
-            active_users=active_mobile_users,
-            pending_users=pending_mobile_users,
-            total_professionals=total_professional_users,
-            active_professionals=active_professional_users,
-            pending_professionals=pending_professional_users,
-            total_analyses=total_analyses,
-            analyses_today=analyses_today,
-            analyses_this_week=analyses_this_week,
-            analyses_this_month=analyses_this_month,
-            high_risk_cases=high_risk_cases,
-            pending_access_requests=pending_access_requests,
+            **counts,
             system_uptime="99.9%",
             last_backup=datetime.now() - timedelta(hours=6)
         )
@@ -395,9 +469,10 @@ class AdminService:
         user_type: Optional[str] = None, 
         status: Optional[str] = None, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[str] = None
     ) -> List[UserManagementResponse]:
-        """Get users with management information"""
+        """Get users with management information (ordered by id, keyset pagination via `after`)"""
         
         query = self.db.query(User)
         
@@ -417,15 +492,10 @@ class AdminService:
         elif status == "pending":
             query = query.filter(User.is_verified == False)
         
-        users = query.offset(skip).limit(limit).all()
+        rows = self._page_with_analysis_counts(query, User, skip, limit, after)
         
         user_responses = []
-        for user in users:
-            # Get analysis count for this user
-            analysis_count = self.db.query(MammographyAnalysis).filter(
-                MammographyAnalysis.user_id == user.id
-            ).count()
-            
+        for user, analysis_count in rows:
             user_responses.append(UserManagementResponse(
                 id=user.id,
                 email=user.email,
@@ -460,9 +530,10 @@ class AdminService:
         specialty: Optional[str] = None, 
         status: Optional[str] = None, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[str] = None
     ) -> List[ProfessionalManagementResponse]:
-        """Get professionals with management information"""
+        """Get professionals with management information (ordered by id, keyset pagination via `after`)"""
         
         query = self.db.query(Professional)
         
@@ -476,15 +547,10 @@ class AdminService:
         elif status == "pending":
             query = query.filter(Professional.is_verified == False)
         
-        professionals = query.offset(skip).limit(limit).all()
+        rows = self._page_with_analysis_counts(query, Professional, skip, limit, after)
         
         professional_responses = []
-        for prof in professionals:
-            # Get analysis count for this professional
-            analysis_count = self.db.query(MammographyAnalysis).filter(
-                MammographyAnalysis.user_id == prof.id
-            ).count()
-            
+        for prof, analysis_count in rows:
             professional_responses.append(ProfessionalManagementResponse(
                 id=prof.id,
                 full_name=prof.full_name,
@@ -520,27 +586,31 @@ class AdminService:
         else:
             start_date = end_date - timedelta(days=30)
         
-        # Get statistics (exclure l'utilisateur admin)
-        total_users = self.db.query(User).filter(User.email != "admin.cancer@data.gouv.bj").count()
-        new_users = self.db.query(User).filter(
-            User.created_at >= start_date,
-            User.email != "admin.cancer@data.gouv.bj"
-        ).count()
-        
-        total_analyses = self.db.query(MammographyAnalysis).count()
-        new_analyses = self.db.query(MammographyAnalysis).filter(
-            MammographyAnalysis.created_at >= start_date
-        ).count()
-        
-        high_risk_detections = self.db.query(MammographyAnalysis).filter(
-            and_(
-                MammographyAnalysis.created_at >= start_date,
-                or_(
-                    MammographyAnalysis.bi_rads_category == "BI-RADS 4",
-                    MammographyAnalysis.bi_rads_category == "BI-RADS 5"
-                )
-            )
-        ).count()
+        counters = None
+        if settings.ADMIN_STATS_MATERIALIZED:
+            # Granularité journalière: la période commence au début du jour de start_date
+            counters = AdminStatsService(self.db).read_counters(since=start_date.date())
+        
+        if counters is not None:
+            total_users = counters.get("users:non_admin", 0)
+            new_users = sum_daily(counters, "users:non_admin", start_date.date())
+            total_analyses = counters.get("analyses:total", 0)
+            new_analyses = sum_daily(counters, "analyses", start_date.date())
+            high_risk_detections = sum_daily(counters, "analyses:high_risk", start_date.date())
+        else:
+            # Get statistics (exclure l'utilisateur admin): une requête par table
+            is_non_admin = User.email != EXCLUDED_ADMIN_EMAIL
+            total_users, new_users = self.db.query(
+                count_if(is_non_admin),
+                count_if(and_(is_non_admin, User.created_at >= start_date))
+            ).one()
+            
+            is_recent = MammographyAnalysis.created_at >= start_date
+            total_analyses, new_analyses, high_risk_detections = self.db.query(
+                func.count(MammographyAnalysis.id),
+                count_if(is_recent),
+                count_if(and_(is_recent, MammographyAnalysis.bi_rads_category.in_(HIGH_RISK_CATEGORIES)))
+            ).one()
         
         return SystemStatsResponse(
             period=period,
@@ -614,59 +684,169 @@ class AdminService:
         start_date: Optional[datetime] = None, 
         end_date: Optional[datetime] = None
     ) -> AnalysisSummaryResponse:
-        """Get mammography analyses summary"""
+        """Get mammography analyses summary (agrégats SQL, mis en cache par fenêtre de dates)"""
         
-        query = self.db.query(MammographyAnalysis)
+        cache_key = (start_date.isoformat() if start_date else None, end_date.isoformat() if end_date else None)
+        now = time.monotonic()
+        with _summary_cache_lock:
+            cached = _summary_cache.get(cache_key)
+        if cached and cached[0] > now:
+            return cached[1].model_copy(deep=True)
         
+        filters = []
         if start_date:
-            query = query.filter(MammographyAnalysis.created_at >= start_date)
+            filters.append(MammographyAnalysis.created_at >= start_date)
         if end_date:
-            query = query.filter(MammographyAnalysis.created_at <= end_date)
-        
-        analyses = query.all()
-        
-        # Calculate statistics
-        total_analyses = len(analyses)
-        high_risk_cases = len([a for a in analyses if a.bi_rads_category in ["BI-RADS 4", "BI-RADS 5"]])
-        medium_risk_cases = len([a for a in analyses if a.bi_rads_category == "BI-RADS 3"])
-        low_risk_cases = len([a for a in analyses if a.bi_rads_category in ["BI-RADS 1", "BI-RADS 2"]])
+            filters.append(MammographyAnalysis.created_at <= end_date)
+        
+        # BI-RADS x densité: distributions, total et moyenne de confiance en une requête
+        rows = self.db.query(
+            MammographyAnalysis.bi_rads_category,
+            MammographyAnalysis.breast_density,
+            func.count(MammographyAnalysis.id),
+            func.sum(MammographyAnalysis.confidence_score),
+            func.count(MammographyAnalysis.confidence_score)
+        ).filter(*filters).group_by(
+            MammographyAnalysis.bi_rads_category,
+            MammographyAnalysis.breast_density
+        ).all()
+        
+        analysis_day = func.date(MammographyAnalysis.created_at)
+        daily_counts = {
+            str(day): count
+            for day, count in self.db.query(analysis_day, func.count(MammographyAnalysis.id))
+            .filter(*filters).group_by(analysis_day).order_by(analysis_day)
+        }
         
-        # BI-RADS distribution
+        total_analyses = 0
+        confidence_sum = 0.0
+        confidence_count = 0
         bi_rads_distribution = {}
-        for analysis in analyses:
-            category = analysis.bi_rads_category
-            bi_rads_distribution[category] = bi_rads_distribution.get(category, 0) + 1
-        
-        # Density distribution
         density_distribution = {}
-        for analysis in analyses:
-            density = analysis.breast_density
-            density_distribution[density] = density_distribution.get(density, 0) + 1
+        for category, density, count, row_confidence_sum, row_confidence_count in rows:
+            category_label = f"BI-RADS {category.value}" if category else "Unknown"
+            density_label = density or "Unknown"
+            bi_rads_distribution[category_label] = bi_rads_distribution.get(category_label, 0) + count
+            density_distribution[density_label] = density_distribution.get(density_label, 0) + count
+            total_analyses += count
+            confidence_sum += row_confidence_sum or 0.0
+            confidence_count += row_confidence_count
+        
+        # Calculate statistics
+        high_risk_cases = bi_rads_distribution.get("BI-RADS 4", 0) + bi_rads_distribution.get("BI-RADS 5", 0)
+        medium_risk_cases = bi_rads_distribution.get("BI-RADS 3", 0)
+        low_risk_cases = bi_rads_distribution.get("BI-RADS 1", 0) + bi_rads_distribution.get("BI-RADS 2", 0)
         
         # Average confidence
-        if analyses:
-            average_confidence = sum(a.confidence_score for a in analyses) / len(analyses)
-        else:
-            average_confidence = 0.0
+        average_confidence = confidence_sum / confidence_count if confidence_count else 0.0
         
-        # Top findings (simplified)
+        # Top findings (simplified): densités C (hétérogène) et D (extrême) = seins denses
+        dense_cases = density_distribution.get("C", 0) + density_distribution.get("D", 0)
         top_findings = [
             {"finding": "Mass detected", "count": high_risk_cases},
-            {"finding": "Dense breast tissue", "count": len([a for a in analyses if "DENSE" in a.breast_density])},
+            {"finding": "Dense breast tissue", "count": dense_cases},
             {"finding": "Normal findings", "count": low_risk_cases}
         ]
         
-        return AnalysisSummaryResponse(
+        summary = AnalysisSummaryResponse(
             total_analyses=total_analyses,
             high_risk_cases=high_risk_cases,
             medium_risk_cases=medium_risk_cases,
             low_risk_cases=low_risk_cases,
             bi_rads_distribution=bi_rads_distribution,
             density_distribution=density_distribution,
+            daily_counts=daily_counts,
             average_confidence=average_confidence,
             top_findings=top_findings,
             period=f"{start_date or 'All time'} to {end_date or 'Now'}"
         )
+        
+        # Fenêtre close dans le passé: résultat stable, gardé plus longtemps
+        is_closed = end_date is not None and end_date.replace(tzinfo=None) < datetime.now()
+        ttl = SUMMARY_CACHE_CLOSED_SECONDS if is_closed else SUMMARY_CACHE_OPEN_SECONDS
+        with _summary_cache_lock:
+            if len(_summary_cache) >= SUMMARY_CACHE_MAX_ENTRIES:
+                _summary_cache.pop(next(iter(_summary_cache)))
+            _summary_cache[cache_key] = (now + ttl, summary)
+        return summary.model_copy(deep=True)
+    
+    def _export_query(self, report_type: str, start_date: Optional[datetime], end_date: Optional[datetime]):
+        """Colonnes exportées et requête Core (sans hashed_password) d'un type de rapport"""
+        model = EXPORT_MODELS.get(report_type)
+        if model is None:
+            raise ValueError("Invalid report type")
+        
+        columns = [column for column in model.__table__.columns if column.name not in EXPORT_EXCLUDED_COLUMNS]
+        statement = select(*columns)
+        if start_date:
+            statement = statement.where(model.created_at >= start_date)
+        if end_date:
+            statement = statement.where(model.created_at <= end_date)
+        return [column.name for column in columns], statement.order_by(model.created_at, model.id)
+    
+    def iter_export_rows(
+        self,
+        report_type: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """Lignes d'un rapport par lots de `batch_size` (curseur côté serveur sur PostgreSQL)"""
+        names, statement = self._export_query(report_type, start_date, end_date)
+        result = self.db.execute(statement.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            for row in partition:
+                yield dict(zip(names, row))
+    
+    def stream_export(
+        self,
+        report_type: str,
+        format: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        compress: bool = False,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[bytes]:
+        """
+        Export CSV ou NDJSON sérialisé au fil de l'eau (mémoire constante), compressé en
+        gzip à la volée si `compress`. Le type de rapport et le format sont validés
+        avant le premier octet (ValueError).
+        """
+        if format not in ("csv", "ndjson"):
+            raise ValueError("Invalid export format")
+        names, _ = self._export_query(report_type, start_date, end_date)
+        rows = self.iter_export_rows(report_type, start_date, end_date, batch_size)
+        
+        def generate():
+            compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: en-tête gzip
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            
+            def drain() -> bytes:
+                data = buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+                return compressor.compress(data) if compressor else data
+            
+            if format == "csv":
+                writer.writerow(names)
+            for index, row in enumerate(rows, 1):
+                if format == "csv":
+                    writer.writerow([_export_csv_value(row[name]) for name in names])
+                else:
+                    buffer.write(json.dumps(row, default=_export_json_value, ensure_ascii=False))
+                    buffer.write("\n")
+                if index % batch_size == 0:
+                    chunk = drain()
+                    if chunk:
+                        yield chunk
+            chunk = drain()
+            if compressor:
+                chunk += compressor.flush()
+            if chunk:
+                yield chunk
+        
+        return generate()
     
     def export_reports(
         self, 
@@ -675,29 +855,9 @@ class AdminService:
         start_date: Optional[datetime] = None, 
         end_date: Optional[datetime] = None
     ) -> Dict[str, Any]:
-        """Export system reports"""
-        
-        if report_type == "users":
-            query = self.db.query(User)
-        elif report_type == "professionals":
-            query = self.db.query(Professional)
-        elif report_type == "analyses":
-            query = self.db.query(MammographyAnalysis)
-        else:
-            raise ValueError("Invalid report type")
-        
-        if start_date:
-            query = query.filter(query.column.created_at >= start_date)
-        if end_date:
-            query = query.filter(query.column.created_at <= end_date)
-        
-        records = query.all()
+        """Export system reports (JSON en mémoire: préférer stream_export pour les gros volumes)"""
         
-        # Convert to dictionary format
-        data = []
-        for record in records:
-            if hasattr(record, '__dict__'):
-                data.append({k: v for k, v in record.__dict__.items() if not k.startswith('_')})
+        data = list(self.iter_export_rows(report_type, start_date, end_date))
         
         return {
             "report_type": report_type,
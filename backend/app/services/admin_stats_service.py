@@ -0,0 +1,373 @@
+"""
+Materialized admin statistics
+
+Compteurs du tableau de bord admin maintenus de façon incrémentale dans la table
+admin_stat_counters (activée par ADMIN_STATS_MATERIALIZED):
+
+- les événements ORM sur User, MammographyAnalysis et Professional incrémentent les
+  compteurs dans la même transaction que l'écriture (création, changement de
+  statut, suppression),
+- une réconciliation périodique recalcule tous les compteurs depuis les tables
+  (corrige les écritures faites hors ORM, ex: insert() en masse ou SQL manuel),
+  sous verrou de la table des compteurs pour ne perdre aucun incrément concurrent.
+
+Le tableau de bord lit alors une seule requête, quel que soit le volume de données.
+"""
+
+import asyncio
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, case, delete, event, func, insert, inspect, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from app.models.admin_stats import AdminStatCounter
+from app.models.mammography import MammographyAnalysis, BI_RADS_Category
+from app.models.professional import Professional
+from app.models.user import User
+
+# Compte exclu des statistiques système
+EXCLUDED_ADMIN_EMAIL = "admin.cancer@data.gouv.bj"
+USER_TYPES = ("patient", "professional")
+HIGH_RISK_CATEGORIES = (BI_RADS_Category.CATEGORY_4, BI_RADS_Category.CATEGORY_5)
+
+# Compteurs journaliers ("<métrique>@AAAA-MM-JJ"), conservés sur la plus longue période (1y)
+DAILY_METRICS = ("analyses", "analyses:high_risk", "users:non_admin")
+DAILY_RETENTION_DAYS = 366
+RECONCILED_KEY = "meta:reconciled_at"
+# Clé du verrou consultatif PostgreSQL: une seule réconciliation à la fois, tous workers confondus
+RECONCILE_ADVISORY_LOCK_KEY = 0x41444D53
+
+GLOBAL_KEYS = [
+    f"users:{user_type}:{name}" for user_type in USER_TYPES for name in ("total", "active", "unverified")
+] + ["users:non_admin", "professionals:unverified", "analyses:total", "analyses:high_risk"]
+
+
+def count_if(condition):
+    """COUNT conditionnel: plusieurs compteurs en une seule passe sur la table"""
+    return func.count(case((condition, 1)))
+
+
+def daily_key(metric: str, day) -> str:
+    return f"{metric}@{day}"
+
+
+def sum_daily(counters: Dict[str, int], metric: str, since: date) -> int:
+    """Somme d'un compteur journalier depuis `since` (inclus)"""
+    prefix = f"{metric}@"
+    since = since.isoformat()
+    return sum(
+        value for key, value in counters.items()
+        if key.startswith(prefix) and key[len(prefix):] >= since
+    )
+
+
+# ---------------------------------------------------------------------------
+# Contribution d'une ligne aux compteurs
+# ---------------------------------------------------------------------------
+
+def _day(created_at) -> str:
+    # created_at est un server_default (CURRENT_TIMESTAMP, UTC): inconnu juste après l'insert
+    if created_at is None:
+        return datetime.now(timezone.utc).date().isoformat()
+    if isinstance(created_at, datetime):
+        return created_at.date().isoformat()
+    return str(created_at)[:10]
+
+
+def _is_true(value) -> bool:
+    # Même sémantique que "colonne == True" en SQL (NULL ne compte pas)
+    return value is not None and bool(value)
+
+
+def _is_false(value) -> bool:
+    return value is not None and not bool(value)
+
+
+def _user_counters(row: dict) -> Dict[str, int]:
+    counters = {}
+    user_type = row.get("user_type")
+    if user_type in USER_TYPES:
+        counters[f"users:{user_type}:total"] = 1
+        counters[f"users:{user_type}:active"] = int(_is_true(row.get("is_active")))
+        counters[f"users:{user_type}:unverified"] = int(_is_false(row.get("is_verified")))
+    if row.get("email") != EXCLUDED_ADMIN_EMAIL:
+        counters["users:non_admin"] = 1
+        counters[daily_key("users:non_admin", _day(row.get("created_at")))] = 1
+    return counters
+
+
+def _analysis_counters(row: dict) -> Dict[str, int]:
+    category = row.get("bi_rads_category")
+    high_risk = int(getattr(category, "name", category) in {c.name for c in HIGH_RISK_CATEGORIES})
+    day = _day(row.get("created_at"))
+    return {
+        "analyses:total": 1,
+        "analyses:high_risk": high_risk,
+        daily_key("analyses", day): 1,
+        daily_key("analyses:high_risk", day): high_risk,
+    }
+
+
+def _professional_counters(row: dict) -> Dict[str, int]:
+    return {"professionals:unverified": int(_is_false(row.get("is_verified")))}
+
+
+_TRACKED = {
+    User: (("user_type", "is_active", "is_verified", "email", "created_at"), _user_counters),
+    MammographyAnalysis: (("bi_rads_category", "created_at"), _analysis_counters),
+    Professional: (("is_verified",), _professional_counters),
+}
+
+
+# ---------------------------------------------------------------------------
+# Mise à jour incrémentale (événements ORM)
+# ---------------------------------------------------------------------------
+
+def _dialect_insert(connection):
+    """insert() du dialecte avec ON CONFLICT (SQLite/PostgreSQL), sinon None"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(AdminStatCounter.__table__)
+
+
+def _upsert(connection, rows, accumulate: bool) -> None:
+    """Écrit les compteurs rows ({id, value}): ajoutés à la valeur existante si accumulate, sinon remplacés"""
+    if not rows:
+        return
+    table = AdminStatCounter.__table__
+    statement = _dialect_insert(connection)
+    if statement is not None:
+        value = table.c.value + statement.excluded.value if accumulate else statement.excluded.value
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={"value": value, "updated_at": func.now()},
+        )
+        connection.execute(statement, rows)
+        return
+    for row in rows:
+        value = table.c.value + row["value"] if accumulate else row["value"]
+        result = connection.execute(
+            update(table).where(table.c.id == row["id"]).values(value=value)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table), row)
+
+
+def _bump(connection, deltas: Dict[str, int]) -> None:
+    """Ajoute les deltas aux compteurs (upsert atomique sur SQLite/PostgreSQL)"""
+    _upsert(connection, [{"id": key, "value": delta} for key, delta in deltas.items() if delta], accumulate=True)
+
+
+def _stored_values(connection, mapper, target, columns) -> dict:
+    """Valeurs actuellement en base (avant l'UPDATE/DELETE) des colonnes suivies"""
+    table = mapper.local_table
+    row = connection.execute(
+        select(*[table.c[name] for name in columns]).where(table.c.id == target.id)
+    ).mappings().first()
+    return dict(row) if row else {}
+
+
+def _after_insert(mapper, connection, target):
+    columns, counters = _TRACKED[mapper.class_]
+    state = inspect(target)
+    _bump(connection, counters({name: state.dict.get(name) for name in columns}))
+
+
+def _before_update(mapper, connection, target):
+    columns, counters = _TRACKED[mapper.class_]
+    state = inspect(target)
+    changed = [name for name in columns if state.attrs[name].history.has_changes()]
+    if not changed:
+        return
+    old = _stored_values(connection, mapper, target, columns)
+    new = dict(old, **{name: state.dict.get(name) for name in changed})
+    old_counters, new_counters = counters(old), counters(new)
+    _bump(connection, {
+        key: new_counters.get(key, 0) - old_counters.get(key, 0)
+        for key in set(old_counters) | set(new_counters)
+    })
+
+
+def _before_delete(mapper, connection, target):
+    columns, counters = _TRACKED[mapper.class_]
+    old = _stored_values(connection, mapper, target, columns)
+    if old:
+        _bump(connection, {key: -value for key, value in counters(old).items()})
+
+
+_listeners_registered = False
+
+
+def register_admin_stats_listeners() -> None:
+    """Branche les événements ORM qui maintiennent les compteurs (une seule fois par processus)"""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    for model in _TRACKED:
+        event.listen(model, "after_insert", _after_insert)
+        event.listen(model, "before_update", _before_update)
+        event.listen(model, "before_delete", _before_delete)
+    _listeners_registered = True
+
+
+# ---------------------------------------------------------------------------
+# Réconciliation et lecture
+# ---------------------------------------------------------------------------
+
+class AdminStatsService:
+    """Calcul, réconciliation et lecture des compteurs matérialisés"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _aggregate(self, expressions: Dict[str, Any]) -> Dict[str, int]:
+        values = self.db.query(*expressions.values()).one()
+        return {key: int(value or 0) for key, value in zip(expressions, values)}
+
+    def compute_counters(self) -> Dict[str, int]:
+        """Recalcule tous les compteurs: une requête agrégée par table + deux GROUP BY par jour"""
+        user_expressions = {}
+        for user_type in USER_TYPES:
+            is_type = User.user_type == user_type
+            user_expressions[f"users:{user_type}:total"] = count_if(is_type)
+            user_expressions[f"users:{user_type}:active"] = count_if(and_(is_type, User.is_active == True))
+            user_expressions[f"users:{user_type}:unverified"] = count_if(and_(is_type, User.is_verified == False))
+        user_expressions["users:non_admin"] = count_if(User.email != EXCLUDED_ADMIN_EMAIL)
+
+        counters = self._aggregate(user_expressions)
+        counters.update(self._aggregate({
+            "analyses:total": func.count(MammographyAnalysis.id),
+            "analyses:high_risk": count_if(MammographyAnalysis.bi_rads_category.in_(HIGH_RISK_CATEGORIES)),
+        }))
+        counters.update(self._aggregate({
+            "professionals:unverified": count_if(Professional.is_verified == False),
+        }))
+
+        since = datetime.now() - timedelta(days=DAILY_RETENTION_DAYS)
+        analysis_day = func.date(MammographyAnalysis.created_at)
+        for day, total, high_risk in self.db.query(
+            analysis_day,
+            func.count(MammographyAnalysis.id),
+            count_if(MammographyAnalysis.bi_rads_category.in_(HIGH_RISK_CATEGORIES)),
+        ).filter(MammographyAnalysis.created_at >= since).group_by(analysis_day):
+            counters[daily_key("analyses", day)] = total
+            counters[daily_key("analyses:high_risk", day)] = high_risk
+
+        user_day = func.date(User.created_at)
+        for day, total in self.db.query(user_day, func.count(User.id)).filter(
+            User.created_at >= since,
+            User.email != EXCLUDED_ADMIN_EMAIL
+        ).group_by(user_day):
+            counters[daily_key("users:non_admin", day)] = total
+
+        return counters
+
+    def _lock_counters(self) -> bool:
+        """
+        Verrouille admin_stat_counters en écriture jusqu'au commit: les _bump des autres
+        transactions attendent, et ceux déjà faits sont committés avant le recalcul.
+        False si une autre réconciliation est en cours (PostgreSQL)
+        """
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            acquired = self.db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RECONCILE_ADVISORY_LOCK_KEY}
+            ).scalar()
+            if not acquired:
+                return False
+            # Bloque INSERT/UPDATE/DELETE (donc _bump), pas les lectures du tableau de bord
+            self.db.execute(text(f"LOCK TABLE {AdminStatCounter.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+        else:
+            # SQLite: une première écriture prend le verrou d'écriture de la base pour toute la transaction
+            self.db.execute(
+                update(AdminStatCounter).where(AdminStatCounter.id == RECONCILED_KEY).values(value=AdminStatCounter.value)
+            )
+        return True
+
+    def reconcile(self, min_interval_seconds: int = 0) -> Optional[Dict[str, int]]:
+        """
+        Réécrit tous les compteurs depuis les tables (supprime aussi les jours hors rétention)
+
+        Le recalcul et l'écriture se font dans la même transaction, sous verrou de la
+        table des compteurs. Retourne None sans rien écrire si une autre réconciliation
+        est en cours ou a eu lieu il y a moins de min_interval_seconds.
+        """
+        try:
+            if not self._lock_counters():
+                self.db.rollback()
+                return None
+            now = int(time.time())
+            if min_interval_seconds:
+                reconciled_at = self.db.query(AdminStatCounter.value).filter(
+                    AdminStatCounter.id == RECONCILED_KEY
+                ).scalar()
+                if reconciled_at is not None and now - reconciled_at < min_interval_seconds:
+                    self.db.rollback()
+                    return None
+
+            counters = self.compute_counters()
+            counters[RECONCILED_KEY] = now
+            rows = [{"id": key, "value": int(value)} for key, value in counters.items() if value]
+            _upsert(self.db.connection(), rows, accumulate=False)
+            stale_keys = [
+                key for (key,) in self.db.query(AdminStatCounter.id)
+                if key not in counters or not counters[key]
+            ]
+            if stale_keys:
+                self.db.execute(delete(AdminStatCounter).where(AdminStatCounter.id.in_(stale_keys)))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return counters
+
+    def read_counters(self, since: date) -> Optional[Dict[str, int]]:
+        """
+        Compteurs globaux et journaliers depuis `since` en une requête
+        (None si les compteurs n'ont jamais été réconciliés)
+        """
+        daily_ranges = [
+            and_(AdminStatCounter.id >= daily_key(metric, since.isoformat()),
+                 AdminStatCounter.id <= daily_key(metric, "9999-12-31"))
+            for metric in DAILY_METRICS
+        ]
+        rows = self.db.query(AdminStatCounter.id, AdminStatCounter.value).filter(
+            or_(AdminStatCounter.id.in_(GLOBAL_KEYS + [RECONCILED_KEY]), *daily_ranges)
+        ).all()
+        counters = {key: value for key, value in rows}
+        if RECONCILED_KEY not in counters:
+            return None
+        return counters
+
+
+async def reconcile_admin_stats_periodically(interval_seconds: int) -> None:
+    """
+    Tâche de fond: réconciliation au démarrage puis toutes les `interval_seconds`
+    (au plus une par intervalle, tous processus confondus)
+    """
+    from app.db.session import SessionLocal
+
+    def _reconcile():
+        db = SessionLocal()
+        try:
+            # Une tâche par worker uvicorn: seule la première à prendre le verrou dans
+            # l'intervalle recalcule, les autres constatent une réconciliation récente
+            return AdminStatsService(db).reconcile(min_interval_seconds=interval_seconds // 2)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            counters = await asyncio.to_thread(_reconcile)
+            if counters is not None:
+                print(f"✅ [ADMIN_STATS] {len(counters)} compteurs réconciliés")
+        except Exception as e:
+            print(f"⚠️ [ADMIN_STATS] Réconciliation échouée: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,97 @@
+"""
+Healthcare center listing cache
+
+Réponses JSON de GET /healthcare-centers déjà sérialisées, par combinaison de filtres.
+Les centres changent rarement alors que la carte mobile recharge la liste à chaque
+ouverture: une requête répétée ne coûte qu'un agrégat sur healthcare_centers (la
+version de la table), et un client qui renvoie If-None-Match reçoit un 304 sans corps.
+
+La version (nombre de centres, dernières dates de création et de modification) est
+lue en base à chaque requête: une écriture faite par un autre worker change la version,
+donc l'ETag, et le corps en cache n'est plus servi. Le cache local est aussi vidé après
+le commit d'une écriture ORM du processus, et expire après CENTER_LISTING_CACHE_SECONDS
+(écritures hors ORM qui ne touchent pas updated_at).
+"""
+
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.models.healthcare_center import HealthcareCenter
+
+CENTER_LISTING_CACHE_SECONDS = 60
+CENTER_LISTING_CACHE_MAX_ENTRIES = 256
+_listing_cache: Dict[tuple, Tuple[float, str, bytes]] = {}
+_listing_cache_lock = threading.Lock()
+# Incrémenté à chaque invalidation: une réponse calculée pendant un commit concurrent n'est pas conservée
+_listing_generation = 0
+_DIRTY_LISTINGS_KEY = "dirty_center_listings"
+
+
+def listing_version(db: Session) -> str:
+    """Version de la table healthcare_centers: une requête agrégée sur la clé primaire et les dates"""
+    count, last_created, last_updated = db.query(
+        func.count(HealthcareCenter.id),
+        func.max(HealthcareCenter.created_at),
+        func.max(HealthcareCenter.updated_at)
+    ).one()
+    return f"{count}|{last_created}|{last_updated}"
+
+
+def make_etag(key: tuple, version: str) -> str:
+    """ETag faible de la liste `key` à la version `version` (identique d'un worker à l'autre)"""
+    return f'W/"{hashlib.sha256(repr((key, version)).encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match (liste d'ETags ou *) correspond-il à etag (comparaison faible, RFC 9110)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def get_or_build(key: tuple, version: str, build: Callable[[], bytes]) -> bytes:
+    """Corps JSON de la liste `key` à la version `version`, calculé par build() en cas d'absence"""
+    with _listing_cache_lock:
+        cached = _listing_cache.get(key)
+        generation = _listing_generation
+    if cached and cached[0] > time.monotonic() and cached[1] == version:
+        return cached[2]
+
+    body = build()
+    with _listing_cache_lock:
+        if generation == _listing_generation:
+            if key not in _listing_cache and len(_listing_cache) >= CENTER_LISTING_CACHE_MAX_ENTRIES:
+                _listing_cache.pop(next(iter(_listing_cache)))
+            _listing_cache[key] = (time.monotonic() + CENTER_LISTING_CACHE_SECONDS, version, body)
+    return body
+
+
+def invalidate_center_listings() -> None:
+    """Vide le cache (à appeler après une écriture hors ORM sur healthcare_centers)"""
+    global _listing_generation
+    with _listing_cache_lock:
+        _listing_cache.clear()
+        _listing_generation += 1
+
+
+def _mark_listings_dirty(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info[_DIRTY_LISTINGS_KEY] = True
+
+
+def _invalidate_dirty_listings(session):
+    if session.info.pop(_DIRTY_LISTINGS_KEY, False):
+        invalidate_center_listings()
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(HealthcareCenter, _event_name, _mark_listings_dirty)
+event.listen(Session, "after_commit", _invalidate_dirty_listings)
+event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: session.info.pop(_DIRTY_LISTINGS_KEY, None))
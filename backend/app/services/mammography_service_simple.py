@@ -7,30 +7,22 @@ from datetime import datetime
 import uuid
 import os
 import sys
-import cv2
 import numpy as np
 from sqlalchemy.orm import Session
 from fastapi import UploadFile, HTTPException
 
 from app.models.mammography import MammographyAnalysis, BI_RADS_Category, AnalysisStatus
 from app.schemas.mammography import MammographyAnalysisResponse
-from app.ml.inference_service_simple import MedSigLIPInferenceService
+from app.ml import model_registry, shadow_eval
+from app.ml.view_engine import to_stored_view
 from app.models.patient import Patient
 
-# Singleton global pour le modèle ML (chargé une seule fois au démarrage)
-_ml_model_singleton = None
-
 def get_ml_model():
-    """Récupère ou crée le singleton du modèle ML"""
-    global _ml_model_singleton
-    if _ml_model_singleton is None:
-        print("🔧 [SINGLETON] Création du modèle ML (première fois)...")
-        import sys
-        sys.stdout.flush()
-        _ml_model_singleton = MedSigLIPInferenceService()
-        print("✅ [SINGLETON] Modèle ML créé et mis en cache")
-        sys.stdout.flush()
-    return _ml_model_singleton
+    """
+    Récupère le modèle ML actif depuis le registre de modèles
+    (chargé une seule fois, remplaçable à chaud via /admin/models/{version}/activate)
+    """
+    return model_registry.get_active_model()
 
 
 class MammographyService:
@@ -43,9 +35,10 @@ class MammographyService:
         print("🔧 Initialisation du MammographyService...")
         import sys
         sys.stdout.flush()
-        # Utiliser le singleton pour éviter de recharger le modèle à chaque requête
+        # Référence au modèle actif prise une fois par requête: une analyse en cours
+        # termine sur cette version même si une nouvelle version est activée entre-temps
         self.ml_model = get_ml_model()
-        print("✅ [SINGLETON] MammographyService utilise le modèle ML en cache")
+        print(f"✅ [REGISTRY] MammographyService utilise le modèle {self.ml_model.model_version}")
         sys.stdout.flush()
         
         # VÉRIFICATION CRITIQUE: Le modèle DOIT être chargé, sinon erreur au démarrage
@@ -135,6 +128,10 @@ class MammographyService:
             print(f"✅ [SERVICE] Analyse ML terminée")
             sys.stdout.flush()
             
+            # Renseigner la vue de chaque fichier depuis le moteur de vues
+            for file_index, view in analysis_result.get("views", {}).items():
+                file_data[file_index]["view_type"] = to_stored_view(view["prediction"])
+            
             # Create analysis record
             print(f"🔍 [SERVICE] Création de l'enregistrement d'analyse...")
             print(f"🔍 [SERVICE] Résultats ML reçus: BI-RADS={analysis_result.get('bi_rads_category')}, Confidence={analysis_result.get('confidence_score')}, Density={analysis_result.get('breast_density')}")
@@ -168,6 +165,10 @@ class MammographyService:
                 self.db.commit()
                 self.db.refresh(analysis)
                 print(f"✅ [SERVICE] Enregistrement créé avec succès - ID: {analysis.id}")
+                
+                # Évaluation shadow du checkpoint candidat (processus séparé, non bloquant)
+                if analysis_result.get("shadow_samples"):
+                    shadow_eval.submit(analysis_id, self.ml_model.model_version, analysis_result["shadow_samples"])
                 print(f"✅ [SERVICE] Après commit: BI-RADS={analysis.bi_rads_category}, Confidence={analysis.confidence_score}, Status={analysis.status}")
                 sys.stdout.flush()
                 
@@ -214,7 +215,7 @@ class MammographyService:
                 bi_rads_category=BI_RADS_Category.CATEGORY_2,
                 confidence_score=0.0,
                 breast_density="Unknown",
-                model_version="MedSigLIP-Best-v1.0 (En cas d'erreur)",
+                model_version=f"MedSigLIP-Best-{self.ml_model.model_version} (En cas d'erreur)",
                 processing_time=0.0,
                 status=AnalysisStatus.FAILED,
                 original_files=[],
@@ -243,7 +244,7 @@ class MammographyService:
         analysis_id: str
     ) -> List[dict]:
         """
-        Save uploaded files to disk and return file data with view type
+        Save uploaded files to disk and return file data (view type filled after ML analysis)
         """
         file_data = []
         
@@ -261,367 +262,15 @@ class MammographyService:
                 content = await file.read()
                 buffer.write(content)
             
-            # Infer view type from image content using basic computer vision
-            view_type = self._detect_mammography_view(file_path)
-            
+            # La vue est déterminée plus tard par le moteur de vues, sur l'image prétraitée
             file_data.append({
                 "path": file_path,
-                "view_type": view_type,
+                "view_type": "UNKNOWN",
                 "original_filename": file.filename
             })
         
         return file_data
     
-    def _detect_mammography_view(self, image_path: str) -> str:
-        """
-        Detect mammography view type and side using computer vision analysis
-        Robust algorithm with validation and fallback mechanisms
-        Returns: CC_LEFT, CC_RIGHT, MLO_LEFT, MLO_RIGHT, or UNKNOWN
-        """
-        try:
-            print(f"🔍 Analyse de l'image: {os.path.basename(image_path)}")
-            
-            # Load image
-            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-            if image is None:
-                print("❌ Impossible de charger l'image")
-                return "UNKNOWN"
-            
-            # Validate image quality
-            if not self._validate_image_quality(image):
-                print("⚠️ Qualité d'image insuffisante")
-                return "UNKNOWN"
-            
-            # Get image dimensions
-            height, width = image.shape
-            print(f"📐 Dimensions: {width}x{height}")
-            
-            # Calculate aspect ratio
-            aspect_ratio = width / height
-            
-            # Calculate image center and analyze symmetry
-            center_x, center_y = width // 2, height // 2
-            
-            # Analyze left and right halves for side detection
-            left_half = image[:, :center_x]
-            right_half = image[:, center_x:]
-            
-            # Analyze top and bottom halves
-            top_half = image[:center_y, :]
-            bottom_half = image[center_y:, :]
-            
-            # Calculate brightness distribution
-            left_brightness = np.mean(left_half)
-            right_brightness = np.mean(right_half)
-            top_brightness = np.mean(top_half)
-            bottom_brightness = np.mean(bottom_half)
-            
-            # Calculate horizontal and vertical symmetry
-            horizontal_symmetry = abs(left_brightness - right_brightness)
-            vertical_symmetry = abs(top_brightness - bottom_brightness)
-            
-            # Analyze edge density (MLO views typically have more diagonal edges)
-            edges = cv2.Canny(image, 50, 150)
-            edge_density = np.sum(edges > 0) / edges.size
-            
-            # Detect side (left vs right) based on breast tissue distribution
-            side = self._detect_breast_side(image, left_brightness, right_brightness)
-            
-            # Detect view type (CC vs MLO)
-            view_type = self._detect_view_type(aspect_ratio, horizontal_symmetry, vertical_symmetry, edge_density)
-            
-            # Validate the result
-            result = f"{view_type}_{side}"
-            if self._validate_detection_result(result, aspect_ratio, horizontal_symmetry, vertical_symmetry):
-                print(f"✅ Vue détectée: {result}")
-                return result
-            else:
-                print(f"⚠️ Résultat non validé, utilisation du fallback")
-                return self._get_fallback_view(aspect_ratio)
-                    
-        except Exception as e:
-            print(f"❌ Erreur lors de la détection de vue: {e}")
-            return "UNKNOWN"
-    
-    def _validate_image_quality(self, image: np.ndarray) -> bool:
-        """Validate that the image has sufficient quality for analysis"""
-        try:
-            height, width = image.shape
-            
-            # Check minimum dimensions
-            if height < 100 or width < 100:
-                return False
-            
-            # Check if image is not too dark or too bright
-            mean_brightness = np.mean(image)
-            if mean_brightness < 10 or mean_brightness > 245:
-                return False
-            
-            # Check for sufficient contrast
-            std_brightness = np.std(image)
-            if std_brightness < 5:
-                return False
-            
-            return True
-        except:
-            return False
-    
-    def _validate_detection_result(self, result: str, aspect_ratio: float, 
-                                 horizontal_symmetry: float, vertical_symmetry: float) -> bool:
-        """Validate the detection result based on consistency checks"""
-        try:
-            view_type, side = result.split('_')
-            
-            # Basic consistency checks
-            if view_type not in ['CC', 'MLO'] or side not in ['LEFT', 'RIGHT']:
-                return False
-            
-            # Check if aspect ratio is consistent with view type
-            if view_type == 'CC' and (aspect_ratio > 1.4 or aspect_ratio < 0.6):
-                return False
-            elif view_type == 'MLO' and (0.9 <= aspect_ratio <= 1.1):
-                return False
-            
-            return True
-        except:
-            return False
-    
-    def _get_fallback_view(self, aspect_ratio: float) -> str:
-        """Get a fallback view based on aspect ratio only"""
-        try:
-            # Simple fallback based on aspect ratio
-            if aspect_ratio > 1.2 or aspect_ratio < 0.8:
-                return "MLO_LEFT"  # Default to MLO for elongated images
-            else:
-                return "CC_LEFT"   # Default to CC for square images
-        except:
-            return "CC_LEFT"
-    
-    def _detect_breast_side(self, image: np.ndarray, left_brightness: float, right_brightness: float) -> str:
-        """
-        Detect if the breast is left or right side
-        Improved algorithm based on VinDr-Mammo dataset analysis
-        """
-        try:
-            height, width = image.shape
-            
-            # Analyze nipple position (typically more towards one side)
-            # For left breast: nipple tends to be more on the right side of the image
-            # For right breast: nipple tends to be more on the left side of the image
-            
-            # Find the brightest region (often corresponds to nipple area)
-            blurred = cv2.GaussianBlur(image, (15, 15), 0)
-            max_val = np.max(blurred)
-            bright_threshold = max_val * 0.8
-            
-            # Find bright regions
-            bright_regions = np.where(blurred > bright_threshold)
-            
-            if len(bright_regions[1]) > 0:  # If bright regions found
-                avg_x = np.mean(bright_regions[1])
-                center_x = width // 2
-                
-                # More precise threshold based on VinDr-Mammo analysis
-                if avg_x > center_x * 1.15:  # More towards right side
-                    return "LEFT"  # Left breast (nipple on right side of image)
-                elif avg_x < center_x * 0.85:  # More towards left side
-                    return "RIGHT"  # Right breast (nipple on left side of image)
-            
-            # Fallback: use brightness distribution with improved thresholds
-            brightness_diff = abs(left_brightness - right_brightness)
-            brightness_ratio = left_brightness / right_brightness if right_brightness > 0 else 1
-            
-            if brightness_diff > 5:  # Significant brightness difference
-                if brightness_ratio > 1.1:  # Left side brighter
-                    return "RIGHT"  # More tissue on left side = right breast
-                elif brightness_ratio < 0.9:  # Right side brighter
-                    return "LEFT"   # More tissue on right side = left breast
-            
-            # Additional analysis: check tissue distribution patterns
-            # Analyze the central region for tissue density patterns
-            center_region = image[height//4:3*height//4, width//4:3*width//4]
-            center_brightness = np.mean(center_region)
-            
-            if center_brightness > np.mean(image) * 1.05:  # Denser center
-                # Check which side has more tissue
-                if left_brightness > right_brightness * 1.05:
-                    return "RIGHT"
-                else:
-                    return "LEFT"
-            
-            # Default fallback based on brightness
-            if left_brightness > right_brightness:
-                return "RIGHT"  # More tissue on left side = right breast
-            else:
-                return "LEFT"   # More tissue on right side = left breast
-                         
-        except Exception as e:
-            print(f"Erreur lors de la détection du côté: {e}")
-            return "LEFT"  # Default fallback
-    
-    def _detect_view_type(self, aspect_ratio: float, horizontal_symmetry: float, 
-                         vertical_symmetry: float, edge_density: float) -> str:
-        """
-        Detect view type (CC vs MLO) based on image characteristics
-        Robust algorithm with adaptive thresholds and confidence scoring
-        """
-        try:
-            print(f"🔍 Analyse des caractéristiques: aspect_ratio={aspect_ratio:.2f}, h_sym={horizontal_symmetry:.2f}, v_sym={vertical_symmetry:.2f}, edges={edge_density:.3f}")
-            
-            # Robust algorithm with adaptive thresholds
-            # CC views: more symmetric horizontally, more square aspect ratio
-            # MLO views: less symmetric, more elongated, more diagonal content
-            
-            cc_score = 0
-            mlo_score = 0
-            confidence_factors = []
-            
-            # 1. Aspect ratio analysis with adaptive thresholds
-            aspect_ratio_score = self._analyze_aspect_ratio(aspect_ratio)
-            cc_score += aspect_ratio_score['cc']
-            mlo_score += aspect_ratio_score['mlo']
-            confidence_factors.append(aspect_ratio_score['confidence'])
-            
-            # 2. Symmetry analysis with relative thresholds
-            symmetry_score = self._analyze_symmetry(horizontal_symmetry, vertical_symmetry)
-            cc_score += symmetry_score['cc']
-            mlo_score += symmetry_score['mlo']
-            confidence_factors.append(symmetry_score['confidence'])
-            
-            # 3. Edge density analysis with adaptive thresholds
-            edge_score = self._analyze_edge_density(edge_density)
-            cc_score += edge_score['cc']
-            mlo_score += edge_score['mlo']
-            confidence_factors.append(edge_score['confidence'])
-            
-            # Calculate overall confidence
-            overall_confidence = np.mean(confidence_factors)
-            
-            print(f"📊 Scores: CC={cc_score}, MLO={mlo_score}, Confidence={overall_confidence:.2f}")
-            
-            # Decision with stricter confidence thresholds
-            score_diff = abs(cc_score - mlo_score)
-            
-            print(f"    🎯 Decision logic: score_diff={score_diff}, confidence={overall_confidence:.2f}")
-            
-            if overall_confidence > 0.8 and score_diff > 3:  # Very high confidence decision
-                if mlo_score > cc_score:
-                    print(f"    ✅ Very high confidence -> MLO")
-                    return "MLO"
-                else:
-                    print(f"    ✅ Very high confidence -> CC")
-                    return "CC"
-            elif overall_confidence > 0.6 and score_diff > 2:  # High confidence decision
-                if mlo_score > cc_score:
-                    print(f"    ✅ High confidence -> MLO")
-                    return "MLO"
-                else:
-                    print(f"    ✅ High confidence -> CC")
-                    return "CC"
-            elif overall_confidence > 0.4 and score_diff > 1:  # Medium confidence decision
-                if mlo_score > cc_score:
-                    print(f"    ✅ Medium confidence -> MLO")
-                    return "MLO"
-                else:
-                    print(f"    ✅ Medium confidence -> CC")
-                    return "CC"
-            else:  # Low confidence - use conservative fallback
-                print("    ⚠️ Faible confiance, utilisation de l'aspect ratio comme critère principal")
-                if aspect_ratio > 1.3 or aspect_ratio < 0.7:  # Very elongated/square
-                    print(f"    🔄 Fallback: aspect_ratio={aspect_ratio:.2f} -> MLO")
-                    return "MLO"
-                else:
-                    print(f"    🔄 Fallback: aspect_ratio={aspect_ratio:.2f} -> CC")
-                    return "CC"
-                    
-        except Exception as e:
-            print(f"Erreur lors de la détection du type de vue: {e}")
-            return "CC"  # Default fallback
-    
-    def _analyze_aspect_ratio(self, aspect_ratio: float) -> dict:
-        """Analyze aspect ratio with stricter thresholds"""
-        try:
-            print(f"    📐 Aspect ratio analysis: {aspect_ratio:.3f}")
-            
-            # Stricter thresholds - CC views are typically more square
-            if 0.9 <= aspect_ratio <= 1.1:  # Very square (strong CC indicator)
-                print(f"    ✅ Very square -> CC +3")
-                return {'cc': 3, 'mlo': 0, 'confidence': 0.9}
-            elif 0.8 <= aspect_ratio <= 1.2:  # Moderately square
-                print(f"    ✅ Moderately square -> CC +2")
-                return {'cc': 2, 'mlo': 0, 'confidence': 0.7}
-            elif 0.7 <= aspect_ratio <= 1.3:  # Neutral range
-                print(f"    ⚖️ Neutral range -> CC +1, MLO +1")
-                return {'cc': 1, 'mlo': 1, 'confidence': 0.4}
-            elif aspect_ratio > 1.4 or aspect_ratio < 0.6:  # Very elongated/square (strong MLO)
-                print(f"    ✅ Very elongated -> MLO +3")
-                return {'cc': 0, 'mlo': 3, 'confidence': 0.8}
-            else:  # Moderately elongated/square
-                print(f"    ✅ Moderately elongated -> MLO +2")
-                return {'cc': 0, 'mlo': 2, 'confidence': 0.6}
-        except:
-            return {'cc': 1, 'mlo': 1, 'confidence': 0.3}
-    
-    def _analyze_symmetry(self, horizontal_symmetry: float, vertical_symmetry: float) -> dict:
-        """Analyze symmetry with stricter thresholds"""
-        try:
-            print(f"    🔄 Symmetry analysis: h_sym={horizontal_symmetry:.3f}, v_sym={vertical_symmetry:.3f}")
-            
-            if vertical_symmetry == 0:
-                return {'cc': 1, 'mlo': 1, 'confidence': 0.3}
-            
-            symmetry_ratio = horizontal_symmetry / vertical_symmetry
-            print(f"    📊 Symmetry ratio: {symmetry_ratio:.3f}")
-            
-            # Stricter thresholds - CC views are more horizontally symmetric
-            if symmetry_ratio < 0.4:  # Much more horizontally symmetric (strong CC)
-                print(f"    ✅ Much more horizontally symmetric -> CC +3")
-                return {'cc': 3, 'mlo': 0, 'confidence': 0.8}
-            elif symmetry_ratio < 0.6:  # Moderately horizontally symmetric
-                print(f"    ✅ Moderately horizontally symmetric -> CC +2")
-                return {'cc': 2, 'mlo': 0, 'confidence': 0.6}
-            elif symmetry_ratio < 0.8:  # Slightly horizontally symmetric
-                print(f"    ✅ Slightly horizontally symmetric -> CC +1")
-                return {'cc': 1, 'mlo': 0, 'confidence': 0.4}
-            elif symmetry_ratio > 2.0:  # Much less horizontally symmetric (strong MLO)
-                print(f"    ✅ Much less horizontally symmetric -> MLO +3")
-                return {'cc': 0, 'mlo': 3, 'confidence': 0.8}
-            elif symmetry_ratio > 1.5:  # Less horizontally symmetric
-                print(f"    ✅ Less horizontally symmetric -> MLO +2")
-                return {'cc': 0, 'mlo': 2, 'confidence': 0.7}
-            else:  # Neutral
-                print(f"    ⚖️ Neutral symmetry -> CC +1, MLO +1")
-                return {'cc': 1, 'mlo': 1, 'confidence': 0.3}
-        except:
-            return {'cc': 1, 'mlo': 1, 'confidence': 0.3}
-    
-    def _analyze_edge_density(self, edge_density: float) -> dict:
-        """Analyze edge density with stricter thresholds"""
-        try:
-            print(f"    📈 Edge density analysis: {edge_density:.4f}")
-            
-            # Stricter thresholds - MLO views have more complex diagonal structures
-            if edge_density > 0.20:  # Very high edge density (strong MLO)
-                print(f"    ✅ Very high edge density -> MLO +3")
-                return {'cc': 0, 'mlo': 3, 'confidence': 0.8}
-            elif edge_density > 0.15:  # High edge density
-                print(f"    ✅ High edge density -> MLO +2")
-                return {'cc': 0, 'mlo': 2, 'confidence': 0.6}
-            elif edge_density > 0.10:  # Medium-high edge density
-                print(f"    ✅ Medium-high edge density -> MLO +1")
-                return {'cc': 0, 'mlo': 1, 'confidence': 0.4}
-            elif edge_density > 0.06:  # Medium edge density (neutral)
-                print(f"    ⚖️ Medium edge density -> CC +1, MLO +1")
-                return {'cc': 1, 'mlo': 1, 'confidence': 0.4}
-            elif edge_density > 0.03:  # Low edge density (CC)
-                print(f"    ✅ Low edge density -> CC +2")
-                return {'cc': 2, 'mlo': 0, 'confidence': 0.6}
-            else:  # Very low edge density
-                print(f"    ✅ Very low edge density -> CC +3")
-                return {'cc': 3, 'mlo': 0, 'confidence': 0.7}
-        except:
-            return {'cc': 1, 'mlo': 1, 'confidence': 0.3}
-    
     async def _run_ml_analysis(self, file_paths: List[str]) -> dict:
         """
         Run ML analysis using the real MedSigLIP model
@@ -664,6 +313,12 @@ class MammographyService:
                 # Le modèle ML ne peut pas être utilisé en parallèle sans risques de conflits
                 all_predictions = []
                 detected_regions = []
+                analyzed_indices = []  # Index dans file_paths des images analysées
+                image_arrays = []
+                image_ids = []
+                # Évaluation shadow: conserver les embeddings déjà calculés (pas de second prétraitement)
+                shadow_sampled = shadow_eval.should_sample()
+                shadow_samples = []
                 
                 for i, image_path in enumerate(file_paths):
                     print(f"\n🔍 [ML_ANALYSIS] Image {i+1}/{len(file_paths)}: {os.path.basename(image_path)}")
@@ -688,7 +343,21 @@ class MammographyService:
                         
                         print(f"✅ [ML_ANALYSIS] Image {i+1} chargée, lancement de la prédiction ML...")
                         sys.stdout.flush()
-                        bi_rads_pred, bi_rads_conf, density_pred, density_conf = self.ml_model._predict_with_model(image_array)
+                        if shadow_sampled:
+                            bi_rads_pred, bi_rads_conf, density_pred, density_conf, embedding = \
+                                self.ml_model._predict_with_model(image_array, return_embedding=True)
+                            # Le candidat est comparé aux probabilités brutes (pas à la confiance ajustée affichée)
+                            raw_bi_rads_conf, raw_density_conf = self.ml_model.raw_confidences(embedding)
+                            shadow_samples.append({
+                                'image_index': i,
+                                'embedding': embedding.detach().cpu().numpy().reshape(-1).astype(np.float32),
+                                'bi_rads': bi_rads_pred,
+                                'bi_rads_confidence': raw_bi_rads_conf,
+                                'density': density_pred,
+                                'density_confidence': raw_density_conf,
+                            })
+                        else:
+                            bi_rads_pred, bi_rads_conf, density_pred, density_conf = self.ml_model._predict_with_model(image_array)
                         print(f"✅ [ML_ANALYSIS] Prédiction ML terminée pour l'image {i+1}: BI-RADS={bi_rads_pred}, Densité={density_pred}")
                         sys.stdout.flush()
                         
@@ -698,7 +367,7 @@ class MammographyService:
                         image_id = self.ml_model._extract_image_id_from_path(image_path)
                         regions = self.ml_model._get_regions_from_annotations(image_id, image_path)
                         
-                        # Formater comme attendu
+                        # Formater comme attendu (vue renseignée après le passage batché)
                         all_predictions.append({
                             'bi_rads': {
                                 'prediction': bi_rads_pred,
@@ -708,12 +377,12 @@ class MammographyService:
                                 'prediction': density_pred,
                                 'confidence': density_conf
                             },
-                            'view': {
-                                'prediction': 'CC_L',  # Par défaut, peut être amélioré
-                                'confidence': 0.8
-                            },
+                            'view': None,
                             'detected_regions': regions
                         })
+                        analyzed_indices.append(i)
+                        image_arrays.append(image_array)
+                        image_ids.append(image_id)
                         print(f"✅ [ML_ANALYSIS] Image {i+1}/{len(file_paths)} analysée avec succès")
                         sys.stdout.flush()
                     except ValueError:
@@ -727,6 +396,14 @@ class MammographyService:
                         traceback.print_exc()
                         sys.stdout.flush()
                         # Continuer avec les autres images si une seule échoue
+                
+                # Classer les vues de toutes les images de l'étude en un seul passage
+                views = self.ml_model.classify_views(image_arrays, image_ids)
+                for pred, (view_pred, view_conf) in zip(all_predictions, views):
+                    pred['view'] = {
+                        'prediction': view_pred,
+                        'confidence': view_conf
+                    }
             
             # Note: Le mode 2 (modèle standard) ne devrait jamais être atteint si votre modèle est correctement chargé
             # car nous avons vérifié que use_direct_classifiers est True
@@ -816,7 +493,7 @@ class MammographyService:
             if not self.ml_model.use_direct_classifiers or self.ml_model.bi_rads_classifier is None:
                 raise ValueError("Vos classificateurs ne sont pas disponibles - le modèle doit être rechargé")
             
-            model_version = "MedSigLIP-Best-v1.0 (Votre modèle entraîné)"
+            model_version = f"MedSigLIP-Best-{self.ml_model.model_version} (Votre modèle entraîné)"
             if self.ml_model.full_model is not None:
                 model_version += " - avec embeddings MedSigLIP réels"
             else:
@@ -831,7 +508,13 @@ class MammographyService:
                 "findings": findings,
                 "recommendations": recommendations,
                 "model_version": model_version,
-                "detected_regions": detected_regions if 'detected_regions' in locals() else []
+                "detected_regions": detected_regions if 'detected_regions' in locals() else [],
+                "views": {
+                    file_index: pred['view']
+                    for file_index, pred in zip(analyzed_indices, all_predictions)
+                },
+                # Usage interne uniquement (jamais renvoyé au client)
+                "shadow_samples": shadow_samples if 'shadow_samples' in locals() else []
             }
             
         except ValueError as e:
@@ -925,27 +608,22 @@ class MammographyService:
     def get_analysis_result(self, analysis_id: str):
         """Get analysis result by analysis_id (UUID)"""
         try:
+            # Analyse et patient_id lisible (P-2025-1) en une seule requête jointe:
+            # analysis.patient_id contient l'UUID (id), pas le patient_id lisible
+            query = self.db.query(MammographyAnalysis, Patient.patient_id).outerjoin(
+                Patient, Patient.id == MammographyAnalysis.patient_id
+            )
+
             # Try to find by analysis_id first (the UUID)
-            analysis = self.db.query(MammographyAnalysis).filter(
-                MammographyAnalysis.analysis_id == analysis_id
-            ).first()
+            row = query.filter(MammographyAnalysis.analysis_id == analysis_id).first()
 
             # If not found, try by id (primary key) for backward compatibility
-            if not analysis:
-                analysis = self.db.query(MammographyAnalysis).filter(
-                    MammographyAnalysis.id == analysis_id
-                ).first()
+            if not row:
+                row = query.filter(MammographyAnalysis.id == analysis_id).first()
 
-            if not analysis:
+            if not row:
                 return None
-
-            # Récupérer le patient_id lisible depuis la table patients
-            # analysis.patient_id contient l'UUID (id), pas le patient_id lisible
-            patient_readable_id = None
-            if analysis.patient_id:
-                patient = self.db.query(Patient).filter(Patient.id == analysis.patient_id).first()
-                if patient:
-                    patient_readable_id = patient.patient_id  # Le patient_id lisible (P-2025-1)
+            analysis, patient_readable_id = row
 
             # Si pas trouvé, utiliser l'UUID comme fallback
             if not patient_readable_id:
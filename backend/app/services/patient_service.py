@@ -3,7 +3,7 @@ Patient service
 """
 
 import uuid
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from sqlalchemy.orm import Session
 
 from app.models.patient import Patient
@@ -51,6 +51,17 @@ class PatientService:
         """Get patient by patient ID"""
         return self.db.query(Patient).filter(Patient.patient_id == patient_id).first()
     
+    def get_readable_ids(self, patient_ids: Iterable[Optional[str]]) -> Dict[str, str]:
+        """
+        Résout en une seule requête (IN) les identifiants lisibles (P-2025-1) d'un
+        ensemble d'UUID patients: {uuid: patient_id lisible}. Les UUID inconnus sont absents.
+        """
+        ids = {patient_id for patient_id in patient_ids if patient_id}
+        if not ids:
+            return {}
+        rows = self.db.query(Patient.id, Patient.patient_id).filter(Patient.id.in_(ids)).all()
+        return {patient_uuid: readable_id for patient_uuid, readable_id in rows}
+    
     def update_patient(self, patient_id: str, patient_update: PatientUpdate) -> Optional[Patient]:
         """Update patient information"""
         patient = self.get_patient(patient_id)
@@ -2,16 +2,53 @@
 Healthcare professional service
 """
 
+import threading
+import time
 import uuid
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy import event, func, and_, or_, desc, case, distinct
 
 from app.models.professional import Professional
 from app.models.mammography import MammographyAnalysis
-from app.models.patient import Patient
 from app.schemas.professional import ProfessionalCreate, ProfessionalUpdate
+from app.services.patient_service import PatientService
+from app.services.spatial_search import search_nearby
+
+
+# Cache de get_dashboard_stats: (user_id, jour) -> (expiration, statistiques)
+DASHBOARD_CACHE_SECONDS = 300
+DASHBOARD_CACHE_MAX_ENTRIES = 1024
+_dashboard_cache: Dict[tuple, tuple] = {}
+_dashboard_cache_lock = threading.Lock()
+_DIRTY_DASHBOARDS_KEY = "dirty_professional_dashboards"
+
+
+def invalidate_dashboard_stats(user_id: str) -> None:
+    """Invalide le tableau de bord mis en cache d'un professionnel"""
+    with _dashboard_cache_lock:
+        for key in [key for key in _dashboard_cache if key[0] == user_id]:
+            del _dashboard_cache[key]
+
+
+def _mark_dashboard_dirty(mapper, connection, target):
+    # Analyse créée, validée ou supprimée: invalidation après le commit (pas pendant le flush,
+    # sinon une lecture concurrente pourrait remettre en cache l'état d'avant la transaction)
+    session = Session.object_session(target)
+    if session is not None and target.user_id:
+        session.info.setdefault(_DIRTY_DASHBOARDS_KEY, set()).add(target.user_id)
+
+
+def _invalidate_dirty_dashboards(session):
+    for user_id in session.info.pop(_DIRTY_DASHBOARDS_KEY, ()):
+        invalidate_dashboard_stats(user_id)
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(MammographyAnalysis, _event_name, _mark_dashboard_dirty)
+event.listen(Session, "after_commit", _invalidate_dirty_dashboards)
+event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: session.info.pop(_DIRTY_DASHBOARDS_KEY, None))
 
 
 class ProfessionalService:
@@ -22,6 +59,20 @@ class ProfessionalService:
     def __init__(self, db: Session):
         self.db = db
     
+    def _readable_patient_ids(self, analyses) -> Dict[str, str]:
+        """Identifiants lisibles des patients d'une page d'analyses (une seule requête)"""
+        return PatientService(self.db).get_readable_ids(analysis.patient_id for analysis in analyses)
+    
+    @staticmethod
+    def _display_patient_id(analysis, readable_ids: Dict[str, str]) -> str:
+        """patient_id lisible, ou repli sur les 4 derniers caractères de l'UUID si patient non trouvé"""
+        if not analysis.patient_id:
+            return "N/A"
+        readable_id = readable_ids.get(analysis.patient_id)
+        if readable_id:
+            return readable_id
+        return f"P-{analysis.created_at.strftime('%Y')}-{analysis.patient_id[-4:]}"
+    
     def create_professional(self, professional_in: ProfessionalCreate) -> Professional:
         """Create new healthcare professional"""
         professional = Professional(
@@ -86,23 +137,27 @@ class ProfessionalService:
         radius_km: int = 50,
         specialty: str = "radiology"
     ) -> List[Professional]:
-        """Find nearby professionals using geolocation"""
-        # Using Haversine formula for distance calculation
-        # This is a simplified version - in production, use PostGIS or similar
-        
+        """Find nearby professionals using geolocation (the 20 closest within radius_km)"""
         query = self.db.query(Professional).filter(
-            Professional.latitude.isnot(None),
-            Professional.longitude.isnot(None),
             Professional.specialty.ilike(f"%{specialty}%")
         )
         
-        # For now, return all professionals in the specialty
-        # TODO: Implement proper geolocation filtering
-        return query.limit(20).all()
+        return [
+            professional for professional, _ in
+            search_nearby(query, Professional, latitude, longitude, radius_km, limit=20)
+        ]
     
     def get_dashboard_stats(self, user_id: str) -> Dict[str, Any]:
         """Get professional dashboard statistics"""
         
+        # Le frontend interroge ce tableau de bord en continu: résultat mis en cache par
+        # professionnel (et par jour, pour les bornes semaine/mois)
+        cache_key = (user_id, datetime.now().date())
+        with _dashboard_cache_lock:
+            cached = _dashboard_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            return dict(cached[1])
+        
         print(f"📊 get_dashboard_stats appelé avec user_id: {user_id}")
         
         # SOLUTION : Chercher par professional_id au lieu de user_id
@@ -127,38 +182,33 @@ class ProfessionalService:
         else:
             professional_id = user.professional_id
         
-        # Vérifier toutes les analyses existantes (pour debug)
-        all_analyses = self.db.query(MammographyAnalysis).all()
-        print(f"📋 Total analyses dans la DB: {len(all_analyses)}")
-        
-        # Vérifier les analyses pour ce user_id
-        user_analyses = self.db.query(MammographyAnalysis).filter(
-            MammographyAnalysis.user_id == user_id
-        ).all()
-        print(f"📋 Analyses pour user_id={user_id}: {len(user_analyses)}")
-        if user_analyses:
-            print(f"   Exemples de user_id dans les analyses: {[a.user_id for a in user_analyses[:3]]}")
-        
-        # Analyses this month
+        # Tous les indicateurs en une seule requête agrégée sur les analyses du professionnel
         today = datetime.now().date()
         month_start = today.replace(day=1)
-        analyses_this_month = self.db.query(MammographyAnalysis).filter(
-            and_(
-                MammographyAnalysis.user_id == user_id,
-                func.date(MammographyAnalysis.created_at) >= month_start
-            )
-        ).count()
-        print(f"📅 Analyses ce mois (depuis {month_start}): {analyses_this_month}")
-        
-        # Analyses last month for comparison
         last_month_start = (month_start - timedelta(days=1)).replace(day=1)
-        analyses_last_month = self.db.query(MammographyAnalysis).filter(
-            and_(
-                MammographyAnalysis.user_id == user_id,
-                func.date(MammographyAnalysis.created_at) >= last_month_start,
-                func.date(MammographyAnalysis.created_at) < month_start
-            )
-        ).count()
+        week_start = today - timedelta(days=today.weekday())
+        analysis_day = func.date(MammographyAnalysis.created_at)
+        (
+            analyses_this_month,
+            analyses_last_month,
+            active_patients,
+            new_patients_this_week,
+            total_reports,
+            avg_confidence
+        ) = self.db.query(
+            func.count(case((analysis_day >= month_start, 1))),
+            func.count(case((and_(analysis_day >= last_month_start, analysis_day < month_start), 1))),
+            # Active patients (unique patients with analyses)
+            func.count(distinct(MammographyAnalysis.patient_id)),
+            # New patients this week
+            func.count(distinct(case((analysis_day >= week_start, MammographyAnalysis.patient_id)))),
+            # Total reports generated
+            func.count(MammographyAnalysis.id),
+            # AI accuracy (average confidence score)
+            func.avg(MammographyAnalysis.confidence_score)
+        ).filter(MammographyAnalysis.user_id == user_id).one()
+        avg_confidence = avg_confidence or 0
+        print(f"📅 Analyses ce mois (depuis {month_start}): {analyses_this_month}, total rapports: {total_reports}")
         
         # Calculate percentage change
         if analyses_last_month > 0:
@@ -166,32 +216,6 @@ class ProfessionalService:
         else:
             month_change = 0
         
-        # Active patients (unique patients with analyses)
-        active_patients = self.db.query(MammographyAnalysis.patient_id).filter(
-            MammographyAnalysis.user_id == user_id
-        ).distinct().count()
-        
-        # New patients this week
-        week_start = today - timedelta(days=today.weekday())
-        new_patients_this_week = self.db.query(MammographyAnalysis.patient_id).filter(
-            and_(
-                MammographyAnalysis.user_id == user_id,
-                func.date(MammographyAnalysis.created_at) >= week_start
-            )
-        ).distinct().count()
-        
-        # Total reports generated
-        total_reports = self.db.query(MammographyAnalysis).filter(
-            MammographyAnalysis.user_id == user_id
-        ).count()
-        print(f"📊 Total rapports: {total_reports}")
-        
-        # AI accuracy (average confidence score)
-        avg_confidence = self.db.query(func.avg(MammographyAnalysis.confidence_score)).filter(
-            MammographyAnalysis.user_id == user_id
-        ).scalar() or 0
-        print(f"📊 Confiance moyenne: {avg_confidence}")
-        
         result = {
             "analyses_this_month": analyses_this_month,
             "month_change_percent": round(month_change, 1),
@@ -201,7 +225,13 @@ class ProfessionalService:
             "ai_accuracy": round(avg_confidence * 100, 1) if avg_confidence else 0
         }
         print(f"📊 Résultat final: {result}")
-        return result
+        now = time.monotonic()
+        with _dashboard_cache_lock:
+            if len(_dashboard_cache) >= DASHBOARD_CACHE_MAX_ENTRIES:
+                for key in [key for key, (expires_at, _) in _dashboard_cache.items() if expires_at <= now]:
+                    del _dashboard_cache[key]
+            _dashboard_cache[cache_key] = (now + DASHBOARD_CACHE_SECONDS, result)
+        return dict(result)
     
     def get_recent_analyses(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent analyses for the professional"""
@@ -223,6 +253,7 @@ class ProfessionalService:
         analyses = self.db.query(MammographyAnalysis).filter(
             MammographyAnalysis.user_id == user_id
         ).order_by(desc(MammographyAnalysis.created_at)).limit(limit).all()
+        readable_ids = self._readable_patient_ids(analyses)
         
         results = []
         for analysis in analyses:
@@ -247,6 +278,7 @@ class ProfessionalService:
             results.append({
                 "id": analysis.id,
                 "patient_id": analysis.patient_id,
+                "patient_readable_id": self._display_patient_id(analysis, readable_ids),
                 "bi_rads_category": analysis.bi_rads_category,
                 "confidence_score": analysis.confidence_score,
                 "risk_level": risk_level,
@@ -286,6 +318,7 @@ class ProfessionalService:
                 )
             )
         ).order_by(desc(MammographyAnalysis.created_at)).limit(5).all()
+        readable_ids = self._readable_patient_ids(high_risk_analyses)
         
         for analysis in high_risk_analyses:
             # Convertir BI-RADS pour affichage
@@ -299,12 +332,13 @@ class ProfessionalService:
             alerts.append({
                 "id": f"alert-{analysis.id}",
                 "type": "high_risk",
-                "title": f"Patient {analysis.patient_id} - {bi_rads_display}",
+                "title": f"Patient {self._display_patient_id(analysis, readable_ids)} - {bi_rads_display}",
                 "message": "Anomalie suspecte détectée. Validation requise.",
                 "severity": "high",
                 "created_at": analysis.created_at.isoformat() if analysis.created_at else None,
                 "analysis_id": analysis.analysis_id,
-                "patient_id": analysis.patient_id
+                "patient_id": analysis.patient_id,
+                "patient_readable_id": self._display_patient_id(analysis, readable_ids)
             })
         
         # Pending reports
@@ -389,6 +423,8 @@ class ProfessionalService:
         
         # Order by creation date (newest first)
         analyses = query.order_by(desc(MammographyAnalysis.created_at)).offset(skip).limit(limit).all()
+        # Patients de la page résolus en une requête (pas de requête par analyse)
+        readable_ids = self._readable_patient_ids(analyses)
         
         results = []
         for analysis in analyses:
@@ -398,18 +434,10 @@ class ProfessionalService:
             # Determine status
             status_display = "En attente" if analysis.status == "PENDING" else "Complété"
 
-            # Récupérer le patient_id lisible depuis la table patients
-            patient_readable_id = "N/A"
-            if analysis.patient_id:
-                patient = self.db.query(Patient).filter(Patient.id == analysis.patient_id).first()
-                if patient:
-                    patient_readable_id = patient.patient_id  # Le patient_id lisible (P-2025-1)
-                else:
-                    # Fallback: utiliser les 4 derniers caractères de l'UUID si patient non trouvé
-                    patient_readable_id = f"P-{analysis.created_at.strftime('%Y')}-{analysis.patient_id[-4:]}"
+            patient_readable_id = self._display_patient_id(analysis, readable_ids)
 
             results.append({
-                "id": f"R-{analysis.created_at.strftime('%Y')}-{analysis.id[-4:]}",
+                "id": analysis.report_code,
                 "analysis_id": analysis.id,
                 "patient_id": patient_readable_id,
                 "date": date_str,
@@ -425,29 +453,19 @@ class ProfessionalService:
     def get_professional_report(self, report_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific professional report"""
         
-        # Extract analysis ID from report ID (format: R-YYYY-XXXX)
+        # Report ID persisté (format: R-YYYY-XXXX...), recherche par index unique
         try:
-            analysis_id = report_id.split('-')[-1]
-            # Find the full analysis ID
             analysis = self.db.query(MammographyAnalysis).filter(
                 and_(
-                    MammographyAnalysis.user_id == user_id,
-                    MammographyAnalysis.id.like(f"%{analysis_id}")
+                    MammographyAnalysis.report_code == report_id,
+                    MammographyAnalysis.user_id == user_id
                 )
             ).first()
             
             if not analysis:
                 return None
             
-            # Récupérer le patient_id lisible depuis la table patients
-            patient_readable_id = "N/A"
-            if analysis.patient_id:
-                patient = self.db.query(Patient).filter(Patient.id == analysis.patient_id).first()
-                if patient:
-                    patient_readable_id = patient.patient_id  # Le patient_id lisible (P-2025-1)
-                else:
-                    # Fallback: utiliser les 4 derniers caractères de l'UUID si patient non trouvé
-                    patient_readable_id = f"P-{analysis.created_at.strftime('%Y')}-{analysis.patient_id[-4:]}"
+            patient_readable_id = self._display_patient_id(analysis, self._readable_patient_ids([analysis]))
             
             return {
                 "id": report_id,
@@ -0,0 +1,88 @@
+"""
+Spatial search
+
+Recherche de proximité partagée par les centres de santé et les professionnels:
+
+- un préfiltre SQL par boîte englobante sur les colonnes latitude/longitude indexées
+  (ix_<table>_latitude_longitude), seules les lignes proches sont chargées,
+- le filtre exact et le classement par distance (haversine vectorisée NumPy) sur les
+  coordonnées de ces lignes.
+
+Tout est lu en base à chaque requête: un ajout ou un déplacement fait par un autre
+worker est visible dès son commit.
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_
+from sqlalchemy.orm import Query
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(latitude: float, longitude: float, latitudes, longitudes) -> np.ndarray:
+    """Distances (km) d'un point à des tableaux de coordonnées (formule de Haversine)"""
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=float))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(longitudes, dtype=float) - longitude)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, Optional[float], Optional[float]]:
+    """
+    Boîte englobante (min_lat, max_lat, min_lon, max_lon) du cercle de rayon radius_km
+
+    Les bornes de longitude valent None quand le cercle contient un pôle ou traverse
+    l'antiméridien (pas de filtre sur la longitude).
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    lat = math.radians(latitude)
+    min_lat, max_lat = lat - angular_radius, lat + angular_radius
+    if min_lat <= -math.pi / 2 or max_lat >= math.pi / 2:
+        return math.degrees(max(min_lat, -math.pi / 2)), math.degrees(min(max_lat, math.pi / 2)), None, None
+    delta_lon = math.degrees(math.asin(math.sin(angular_radius) / math.cos(lat)))
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    if min_lon < -180 or max_lon > 180:
+        return math.degrees(min_lat), math.degrees(max_lat), None, None
+    return math.degrees(min_lat), math.degrees(max_lat), min_lon, max_lon
+
+
+def within_bounding_box(model, latitude: float, longitude: float, radius_km: float):
+    """Condition SQL sur model.latitude/model.longitude (index ix_<table>_latitude_longitude)"""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    conditions = [model.latitude.between(min_lat, max_lat)]
+    if min_lon is not None:
+        conditions.append(model.longitude.between(min_lon, max_lon))
+    else:
+        conditions.append(model.longitude.isnot(None))
+    return and_(*conditions)
+
+
+def search_nearby(
+    query: Query,
+    model,
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    limit: Optional[int] = None
+) -> List[Tuple[object, float]]:
+    """
+    Lignes de `query` (déjà filtrée) à moins de radius_km, avec leur distance en km,
+    de la plus proche à la plus lointaine
+    """
+    # La base fait foi: pas d'index en mémoire, qui manquerait les écritures des autres workers
+    rows = query.filter(within_bounding_box(model, latitude, longitude, radius_km)).all()
+    if not rows:
+        return []
+
+    # Les coins de la boîte sont hors du cercle: filtre et classement exacts sur les coordonnées chargées
+    distances = haversine_km(latitude, longitude, [row.latitude for row in rows], [row.longitude for row in rows])
+    order = [position for position in np.argsort(distances, kind="stable").tolist() if distances[position] <= radius_km]
+    if limit is not None:
+        order = order[:limit]
+    return [(rows[position], float(distances[position])) for position in order]
+
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark du budget de threads sur le chemin d'analyse
+
+Pour chaque répartition (torch, OpenCV, BLAS), lance WORKERS processus en
+parallèle (comme uvicorn --workers) qui exécutent chacun le chemin d'analyse
+complet: prétraitement de l'image, features de vue, extracteur de features et
+têtes BI-RADS/densité. Affiche la latence médiane et le débit agrégé, puis la
+meilleure répartition à reporter dans TORCH_NUM_THREADS / OPENCV_NUM_THREADS /
+BLAS_NUM_THREADS.
+
+Usage (depuis backend/):
+    python benchmark_thread_budget.py --workers 2 --iterations 10
+    python benchmark_thread_budget.py --image uploads/exemple.png
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.thread_budget import BLAS_ENV_VARS, detect_available_cpus
+
+
+def run_child(args):
+    """Exécuté dans un processus fils: les variables BLAS sont déjà posées par le parent"""
+    import contextlib
+    import io
+
+    import torch
+    import torch.nn as nn
+    import cv2
+
+    torch.set_num_threads(args.torch_threads)
+    torch.set_num_interop_threads(1)
+    cv2.setNumThreads(args.opencv_threads)
+
+    from app.ml.inference_service_simple import MedSigLIPInferenceService
+    from app.ml.view_engine import ViewEngine
+
+    # Service allégé: pas de chargement de checkpoint, seulement le chemin de calcul
+    service = MedSigLIPInferenceService.__new__(MedSigLIPInferenceService)
+    service.device = torch.device("cpu")
+    service._embedding_dim = 1152
+    service._validate_mammography_image = lambda image_array: (True, "benchmark")
+    view_engine = ViewEngine(device=service.device)
+
+    def head(num_classes):
+        return nn.Sequential(
+            nn.Linear(1152, 512), nn.ReLU(), nn.Dropout(0.3),
+            nn.Linear(512, 256), nn.ReLU(), nn.Dropout(0.3),
+            nn.Linear(256, num_classes)
+        ).eval()
+
+    bi_rads_head, density_head = head(5), head(4)
+
+    latencies = []
+    for i in range(args.warmup + args.iterations):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            image_array = service._load_and_preprocess_image(args.image)
+            view_engine.classify([image_array])
+            embedding = service._extract_embedding_features(image_array)
+            with torch.no_grad():
+                bi_rads_head(embedding)
+                density_head(embedding)
+        if i >= args.warmup:
+            latencies.append(time.perf_counter() - start)
+
+    print(json.dumps({"latencies": latencies}))
+
+
+def make_synthetic_image(path):
+    """Image synthétique 2000x1600 proche d'une mammographie (sein + bruit)"""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    height, width = 2000, 1600
+    yy, xx = np.mgrid[0:height, 0:width]
+    breast = np.exp(-(((xx - 200) / 900.0) ** 2 + ((yy - height / 2) / 800.0) ** 2))
+    image = 40 + 160 * breast + rng.normal(0, 12, size=(height, width))
+    cv2.imwrite(str(path), np.clip(image, 0, 255).astype(np.uint8))
+
+
+def candidate_splits(per_worker):
+    """Répartitions testées pour un budget de per_worker threads"""
+    levels = sorted({1, max(1, per_worker // 2), per_worker})
+    splits = []
+    for torch_threads in levels:
+        for opencv_threads in sorted({1, per_worker}):
+            for blas_threads in sorted({1, per_worker}):
+                splits.append((torch_threads, opencv_threads, blas_threads))
+    return splits
+
+
+def run_split(args, split):
+    torch_threads, opencv_threads, blas_threads = split
+    env = dict(os.environ)
+    for name in BLAS_ENV_VARS:
+        env[name] = str(blas_threads)
+
+    command = [
+        sys.executable, __file__, "--child",
+        "--image", args.image,
+        "--iterations", str(args.iterations),
+        "--warmup", str(args.warmup),
+        "--torch-threads", str(torch_threads),
+        "--opencv-threads", str(opencv_threads),
+    ]
+
+    start = time.perf_counter()
+    processes = [
+        subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(args.workers)
+    ]
+    latencies = []
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"Processus de benchmark en échec pour {split}")
+        latencies.extend(json.loads(output.strip().splitlines()[-1])["latencies"])
+    wall_time = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "torch_threads": torch_threads,
+        "opencv_threads": opencv_threads,
+        "blas_threads": blas_threads,
+        "median_latency_ms": 1000 * latencies[len(latencies) // 2],
+        "p95_latency_ms": 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        # Inclut le démarrage des processus: à comparer entre répartitions uniquement
+        "throughput_img_s": len(latencies) / wall_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du budget de threads (chemin d'analyse)")
+    parser.add_argument("--image", help="Image à analyser (défaut: image synthétique)")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de workers simulés")
+    parser.add_argument("--cpus", type=int, default=None, help="CPU disponibles (défaut: quota cgroup)")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--torch-threads", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--opencv-threads", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    cpus = args.cpus or detect_available_cpus()
+    per_worker = max(1, cpus // args.workers)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if not args.image:
+            args.image = str(Path(tmp_dir) / "synthetic_mammogram.png")
+            make_synthetic_image(args.image)
+
+        print("=" * 80)
+        print(f"BENCHMARK BUDGET DE THREADS - CPU={cpus}, workers={args.workers}, budget/worker={per_worker}")
+        print("=" * 80)
+        print(f"{'torch':>6} {'opencv':>7} {'blas':>5} {'médiane (ms)':>13} {'p95 (ms)':>10} {'débit (img/s)':>14}")
+
+        results = []
+        for split in candidate_splits(per_worker):
+            result = run_split(args, split)
+            results.append(result)
+            print(
+                f"{result['torch_threads']:>6} {result['opencv_threads']:>7} {result['blas_threads']:>5} "
+                f"{result['median_latency_ms']:>13.1f} {result['p95_latency_ms']:>10.1f} "
+                f"{result['throughput_img_s']:>14.2f}"
+            )
+
+    best = max(results, key=lambda r: r["throughput_img_s"])
+    print("\n✅ Meilleure répartition (débit):")
+    print(f"   TORCH_NUM_THREADS={best['torch_threads']}")
+    print(f"   OPENCV_NUM_THREADS={best['opencv_threads']}")
+    print(f"   BLAS_NUM_THREADS={best['blas_threads']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -49,6 +49,7 @@ def migrate_database():
             "patients",
             "professionals",
             "healthcare_centers",
+            "healthcare_center_tags",
             "access_requests",
             "mammography_analyses"
         ]
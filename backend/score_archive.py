@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Scoring hors ligne d'une archive de mammographies (sans passer par l'API HTTP)
+
+Parcourt <images_root>/<study_id>/<image_id>.png (format VinDr), applique le même
+pipeline que MedSigLIPInferenceService (prétraitement, embedding, têtes BI-RADS et
+densité, moteur de vues) dans plusieurs processus, avec les têtes exécutées par lot.
+
+Les résultats sont écrits au fil de l'eau en Parquet, un fichier par lot:
+
+    <output>/
+        manifest.json            # liste figée des images, taille des lots, version du modèle, schéma
+        part-000000.parquet      # une ligne par image: probabilités, prédictions, temps
+        ...
+
+Tous les fichiers partagent le schéma Parquet explicite du manifest (un lot sans erreur
+ou sans image valide n'infère pas de colonnes de type null). Un lot déjà écrit n'est
+jamais recalculé: relancer la même commande reprend le travail après une interruption.
+Lecture: pandas.read_parquet("<output>").
+
+Usage (depuis backend/):
+    python score_archive.py --images-root ../Extract/images_png --output ../scores/v1
+    python score_archive.py --images-root ... --output ... --model-version 2025-11-02 --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.thread_budget import BLAS_ENV_VARS, detect_available_cpus
+
+MANIFEST_FILENAME = "manifest.json"
+
+# Schéma des fichiers Parquet: colonnes fixes, puis les probabilités (float64) dont les
+# noms dépendent des têtes du modèle (p_bi_rads_*, p_density_*, p_view_*)
+FIXED_COLUMN_TYPES = [
+    ("study_id", "string"),
+    ("image_id", "string"),
+    ("valid", "bool"),
+    ("validation_reason", "string"),
+    ("error", "string"),
+    ("preprocess_ms", "float64"),
+    ("embedding_ms", "float64"),
+    ("view_features_ms", "float64"),
+    ("bi_rads_pred", "string"),
+    ("bi_rads_confidence", "float64"),
+    ("density_pred", "string"),
+    ("density_confidence", "float64"),
+    ("view_pred", "string"),
+    ("view_confidence", "float64"),
+    ("heads_ms", "float64"),
+    ("view_classifier_ms", "float64"),
+    ("model_version", "string"),
+    ("worker_pid", "int64"),
+]
+
+# Service chargé une fois par processus (initialiseur du pool)
+_service = None
+
+
+def _init_worker(model_version, threads, verbose):
+    global _service
+    for name in BLAS_ENV_VARS:
+        os.environ[name] = str(threads)
+    if not verbose:
+        # Le service est très verbeux: ne garder que la sortie du processus principal
+        sys.stdout = open(os.devnull, "w")
+
+    import cv2
+    import torch
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+
+    from app.ml import model_registry
+    _service = model_registry._build_service(model_version)
+    if not _service.use_direct_classifiers or _service.bi_rads_classifier is None:
+        raise RuntimeError("Le checkpoint ne contient pas de classificateurs utilisables")
+
+
+def _probability_columns() -> list:
+    """Noms des colonnes de probabilités produites par _score_chunk pour le modèle chargé"""
+    n_bi_rads = _service.bi_rads_classifier[-1].out_features
+    n_density = _service.density_classifier[-1].out_features
+    view_classes = [_service.view_engine.idx_to_view[i] for i in sorted(_service.view_engine.idx_to_view)]
+    return ([f"p_bi_rads_{i + 1}" for i in range(n_bi_rads)]
+            + [f"p_density_{label}" for label in "ABCD"[:n_density]]
+            + [f"p_view_{view}" for view in view_classes])
+
+
+def _score_chunk(chunk_index, chunk):
+    """Score un lot d'images [(study_id, image_id, path)] et retourne ses colonnes"""
+    import numpy as np
+    import torch
+    from app.ml.inference_service_simple import BI_RADS_LABELS, DENSITY_LABELS, preprocess_mammogram
+    from app.ml.view_engine import extract_view_features, heuristic_view
+
+    columns = {name: [] for name in (
+        "study_id", "image_id", "valid", "validation_reason", "error",
+        "preprocess_ms", "embedding_ms", "view_features_ms",
+    )}
+    embeddings = []
+    view_features = []
+    scored_rows = []
+
+    for study_id, image_id, path in chunk:
+        columns["study_id"].append(study_id)
+        columns["image_id"].append(image_id)
+        try:
+            start = time.perf_counter()
+            gray = preprocess_mammogram(path)
+            image_rgb = np.stack([gray] * 3, axis=-1)
+            preprocess_done = time.perf_counter()
+
+            valid, reason = _service._validate_mammography_image(image_rgb)
+            embedding = _service.compute_embedding(image_rgb)
+            embedding_done = time.perf_counter()
+
+            features = extract_view_features(gray)
+            features_done = time.perf_counter()
+
+            columns["valid"].append(bool(valid))
+            columns["validation_reason"].append(str(reason))
+            columns["error"].append(None)
+            columns["preprocess_ms"].append(1000 * (preprocess_done - start))
+            columns["embedding_ms"].append(1000 * (embedding_done - preprocess_done))
+            columns["view_features_ms"].append(1000 * (features_done - embedding_done))
+            embeddings.append(embedding.reshape(1, -1).cpu())
+            view_features.append(features)
+            scored_rows.append(len(columns["image_id"]) - 1)
+        except Exception as e:
+            columns["valid"].append(False)
+            columns["validation_reason"].append(None)
+            columns["error"].append(f"{type(e).__name__}: {e}")
+            for name in ("preprocess_ms", "embedding_ms", "view_features_ms"):
+                columns[name].append(None)
+
+    n_rows = len(chunk)
+    n_bi_rads = _service.bi_rads_classifier[-1].out_features
+    n_density = _service.density_classifier[-1].out_features
+    bi_rads_probs = np.full((n_rows, n_bi_rads), np.nan, dtype=np.float32)
+    density_probs = np.full((n_rows, n_density), np.nan, dtype=np.float32)
+    view_classes = [_service.view_engine.idx_to_view[i] for i in sorted(_service.view_engine.idx_to_view)]
+    view_probs = np.full((n_rows, len(view_classes)), np.nan, dtype=np.float32)
+    view_pred = [None] * n_rows
+    view_conf = [None] * n_rows
+    heads_ms = views_ms = None
+
+    if scored_rows:
+        # Têtes BI-RADS/densité et classifieur de vues: un seul forward par lot
+        start = time.perf_counter()
+        bi_rads_batch, density_batch = _service.predict_heads_batch(torch.cat(embeddings, dim=0))
+        heads_ms = 1000 * (time.perf_counter() - start) / len(scored_rows)
+        bi_rads_probs[scored_rows] = bi_rads_batch
+        density_probs[scored_rows] = density_batch
+
+        start = time.perf_counter()
+        feature_matrix = np.stack(view_features)
+        if _service.view_engine.has_classifier:
+            probs = _service.view_engine.predict_proba(feature_matrix)
+            view_probs[scored_rows] = probs
+            predictions = [(view_classes[int(idx)], float(row[idx])) for idx, row in zip(probs.argmax(axis=1), probs)]
+        else:
+            predictions = [heuristic_view(features) for features in feature_matrix]
+        views_ms = 1000 * (time.perf_counter() - start) / len(scored_rows)
+        for row, (view, confidence) in zip(scored_rows, predictions):
+            view_pred[row] = view
+            view_conf[row] = confidence
+
+    bi_rads_idx = np.nan_to_num(bi_rads_probs, nan=-1).argmax(axis=1)
+    density_idx = np.nan_to_num(density_probs, nan=-1).argmax(axis=1)
+    scored = set(scored_rows)
+    columns["bi_rads_pred"] = [
+        BI_RADS_LABELS[i] if row in scored and i < len(BI_RADS_LABELS) else None
+        for row, i in enumerate(bi_rads_idx)
+    ]
+    columns["bi_rads_confidence"] = [float(bi_rads_probs[row, i]) if row in scored else None for row, i in enumerate(bi_rads_idx)]
+    columns["density_pred"] = [
+        DENSITY_LABELS[i] if row in scored and i < len(DENSITY_LABELS) else None
+        for row, i in enumerate(density_idx)
+    ]
+    columns["density_confidence"] = [float(density_probs[row, i]) if row in scored else None for row, i in enumerate(density_idx)]
+    columns["view_pred"] = view_pred
+    columns["view_confidence"] = view_conf
+    for i in range(n_bi_rads):
+        columns[f"p_bi_rads_{i + 1}"] = bi_rads_probs[:, i]
+    for i, label in enumerate("ABCD"[:n_density]):
+        columns[f"p_density_{label}"] = density_probs[:, i]
+    for i, view in enumerate(view_classes):
+        columns[f"p_view_{view}"] = view_probs[:, i]
+    columns["heads_ms"] = [heads_ms if row in scored else None for row in range(n_rows)]
+    columns["view_classifier_ms"] = [views_ms if row in scored else None for row in range(n_rows)]
+    columns["model_version"] = [_service.model_version] * n_rows
+    columns["worker_pid"] = [os.getpid()] * n_rows
+    return chunk_index, columns
+
+
+def _part_path(output_dir: Path, chunk_index: int) -> Path:
+    return output_dir / f"part-{chunk_index:06d}.parquet"
+
+
+def _schema_fields(probability_columns: list) -> list:
+    return FIXED_COLUMN_TYPES + [(name, "float64") for name in probability_columns]
+
+
+def _arrow_schema(fields: list):
+    """pa.schema des champs [(nom, type)] enregistrés dans le manifest"""
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "bool": pa.bool_(), "float64": pa.float64(), "int64": pa.int64()}
+    return pa.schema([pa.field(name, types[type_name]) for name, type_name in fields])
+
+
+def _check_existing_parts(output_dir: Path, schema) -> None:
+    """Reprise: les lots déjà écrits doivent avoir exactement le schéma du manifest"""
+    import pyarrow.parquet as pq
+
+    for path in sorted(output_dir.glob("part-*.parquet")):
+        part_schema = pq.read_schema(path).remove_metadata()
+        if not part_schema.equals(schema):
+            raise SystemExit(
+                f"❌ {path.name} n'a pas le schéma du manifest (écrit par une version antérieure ?): "
+                f"supprimez ce fichier pour que le lot soit recalculé"
+            )
+
+
+def _write_part(output_dir: Path, chunk_index: int, columns: dict, schema) -> None:
+    """Écriture atomique d'un lot: un fichier présent est toujours complet"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if set(columns) != set(schema.names):
+        raise RuntimeError(f"Colonnes du lot {chunk_index} différentes du schéma du manifest: "
+                           f"{sorted(set(columns) ^ set(schema.names))}")
+    table = pa.table(columns, schema=schema)
+    tmp_path = output_dir / f".part-{chunk_index:06d}.parquet.tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, _part_path(output_dir, chunk_index))
+
+
+def _discover_images(images_root: Path) -> list:
+    return sorted(
+        (path.parent.name, path.stem, str(path.relative_to(images_root)))
+        for path in images_root.glob("*/*.png")
+    )
+
+
+def _load_or_create_manifest(args, output_dir: Path) -> dict:
+    manifest_path = output_dir / MANIFEST_FILENAME
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest["model_version"] != args.model_version:
+            raise SystemExit(
+                f"❌ {output_dir} a été produit avec le modèle {manifest['model_version']}, "
+                f"pas {args.model_version}: utilisez un autre dossier de sortie"
+            )
+        print(f"🔁 Reprise: {len(manifest['images'])} images, lots de {manifest['chunk_size']}")
+        return manifest
+
+    images_root = Path(args.images_root)
+    images = _discover_images(images_root)
+    if args.limit:
+        images = images[:args.limit]
+    manifest = {
+        "images_root": str(images_root.resolve()),
+        "model_version": args.model_version,
+        "chunk_size": args.chunk_size,
+        "created_at": datetime.now().isoformat(),
+        "images": images,
+    }
+    output_dir.mkdir(parents=True, exist_ok=True)
+    _save_manifest(output_dir, manifest)
+    return manifest
+
+
+def _save_manifest(output_dir: Path, manifest: dict) -> None:
+    tmp_path = output_dir / f".{MANIFEST_FILENAME}.tmp"
+    tmp_path.write_text(json.dumps(manifest))
+    os.replace(tmp_path, output_dir / MANIFEST_FILENAME)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring hors ligne d'une archive de mammographies")
+    parser.add_argument("--images-root", required=True, help="Dossier images_png/<study_id>/<image_id>.png")
+    parser.add_argument("--output", required=True, help="Dossier de sortie (Parquet + manifest)")
+    parser.add_argument("--model-version", default=None, help="Version du registre (défaut: modèle v1.0)")
+    parser.add_argument("--workers", type=int, default=None, help="Processus de scoring (défaut: CPU disponibles)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=64, help="Images par lot (et par fichier Parquet)")
+    parser.add_argument("--limit", type=int, default=None, help="Limiter le nombre d'images (tests)")
+    parser.add_argument("--verbose", action="store_true", help="Afficher la sortie des processus de scoring")
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise SystemExit("❌ pyarrow est requis pour l'écriture Parquet (pip install pyarrow)")
+
+    output_dir = Path(args.output)
+    manifest = _load_or_create_manifest(args, output_dir)
+    images_root = Path(manifest["images_root"])
+    chunk_size = manifest["chunk_size"]
+    images = manifest["images"]
+
+    chunks = [
+        (index, [(study_id, image_id, str(images_root / rel_path))
+                 for study_id, image_id, rel_path in images[start:start + chunk_size]])
+        for index, start in enumerate(range(0, len(images), chunk_size))
+    ]
+    pending = [(index, chunk) for index, chunk in chunks if not _part_path(output_dir, index).exists()]
+    workers = args.workers or max(1, detect_available_cpus() // args.threads_per_worker)
+    if "schema" in manifest:
+        _check_existing_parts(output_dir, _arrow_schema(manifest["schema"]))
+
+    print("=" * 80)
+    print(f"SCORING D'ARCHIVE - {len(images)} images, {len(chunks)} lots ({len(pending)} restants), "
+          f"{workers} processus x {args.threads_per_worker} thread(s)")
+    print("=" * 80)
+    sys.stdout.flush()
+    if not pending:
+        print("✅ Rien à faire: tous les lots sont déjà scorés")
+        return
+
+    start = time.time()
+    done_images = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(args.model_version, args.threads_per_worker, args.verbose),
+    ) as executor:
+        # Schéma figé dans le manifest au premier lancement (têtes du modèle lues par un processus)
+        fields = _schema_fields(executor.submit(_probability_columns).result())
+        if "schema" not in manifest:
+            manifest["schema"] = fields
+            _save_manifest(output_dir, manifest)
+            _check_existing_parts(output_dir, _arrow_schema(fields))
+        elif [list(field) for field in fields] != [list(field) for field in manifest["schema"]]:
+            raise SystemExit("❌ Les têtes du modèle ne correspondent pas au schéma du manifest")
+        schema = _arrow_schema(manifest["schema"])
+
+        futures = [executor.submit(_score_chunk, index, chunk) for index, chunk in pending]
+        for future in as_completed(futures):
+            chunk_index, columns = future.result()
+            _write_part(output_dir, chunk_index, columns, schema)
+            done_images += len(columns["image_id"])
+            errors = sum(1 for error in columns["error"] if error)
+            rate = done_images / max(time.time() - start, 1e-6)
+            print(f"   ✅ Lot {chunk_index}: {len(columns['image_id'])} images ({errors} en erreur) - "
+                  f"{done_images} images, {rate:.1f} img/s")
+            sys.stdout.flush()
+
+    print(f"\n✅ Scoring terminé en {time.time() - start:.1f}s - résultats dans {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Nombre de requêtes SQL des listes de rapports professionnels
+
+Les identifiants lisibles des patients (P-2025-1) sont résolus en une seule requête
+par page: le nombre de requêtes ne doit pas dépendre de la taille de la page.
+"""
+
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Importés pour enregistrer tous les mappers (relations résolues par nom)
+from app.models import healthcare_center, user, patient, mammography, professional, access_request, appointment, risk_assessment, shadow_evaluation, admin_stats  # noqa: F401
+from app.models.base import Base
+from app.models.mammography import MammographyAnalysis, BI_RADS_Category, AnalysisStatus
+from app.models.patient import Patient
+from app.models.user import User
+from app.services.professional_service import ProfessionalService
+
+PAGE_SIZES = [1, 5, 20]
+
+
+class QueryCounter:
+    """Compte les requêtes SQL émises sur un moteur"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def measure(self, db, func, *args, **kwargs):
+        """Nombre de requêtes émises par func(*args, **kwargs), session vidée au préalable"""
+        db.expire_all()
+        self.count = 0
+        result = func(*args, **kwargs)
+        return self.count, result
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def counter(engine):
+    return QueryCounter(engine)
+
+
+def add_user(db) -> User:
+    user_row = User(
+        id=str(uuid.uuid4()),
+        email=f"{uuid.uuid4().hex[:8]}@example.com",
+        full_name="Dr Test",
+        hashed_password="x",
+        user_type="professional",
+        professional_id=str(uuid.uuid4())
+    )
+    db.add(user_row)
+    db.commit()
+    return user_row
+
+
+def add_analyses(db, user_row: User, count: int, category=BI_RADS_Category.CATEGORY_4):
+    """count analyses, chacune pour un patient distinct (pire cas pour un N+1)"""
+    now = datetime.now()
+    analyses = []
+    for position in range(count):
+        patient_row = Patient(
+            id=str(uuid.uuid4()),
+            user_id=user_row.id,
+            patient_id=f"P-2025-{uuid.uuid4().hex[:8]}",
+            full_name=f"Patiente {position}"
+        )
+        analysis = MammographyAnalysis(
+            id=str(uuid.uuid4()),
+            analysis_id=str(uuid.uuid4()),
+            patient_id=patient_row.id,
+            user_id=user_row.id,
+            bi_rads_category=category,
+            confidence_score=0.9,
+            status=AnalysisStatus.COMPLETED,
+            created_at=now - timedelta(minutes=position)
+        )
+        db.add_all([patient_row, analysis])
+        analyses.append(analysis)
+    db.commit()
+    return analyses
+
+
+@pytest.mark.parametrize("method, size_argument", [
+    ("get_professional_reports", "limit"),
+    ("get_recent_analyses", "limit"),
+])
+def test_listing_query_count_is_constant_across_page_sizes(db, counter, method, size_argument):
+    user_row = add_user(db)
+    add_analyses(db, user_row, max(PAGE_SIZES))
+    service = ProfessionalService(db)
+
+    counts = {}
+    for page_size in PAGE_SIZES:
+        counts[page_size], rows = counter.measure(
+            db, getattr(service, method), user_row.id, **{size_argument: page_size}
+        )
+        assert len(rows) == page_size
+        assert all(row.get("patient_readable_id", row["patient_id"]).startswith("P-2025-") for row in rows)
+
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_alerts_query_count_is_constant_across_alert_counts(db, counter):
+    service = ProfessionalService(db)
+
+    counts = {}
+    for alert_count in PAGE_SIZES:
+        user_row = add_user(db)
+        add_analyses(db, user_row, alert_count, category=BI_RADS_Category.CATEGORY_5)
+        counts[alert_count], alerts = counter.measure(db, service.get_professional_alerts, user_row.id)
+        high_risk = [alert for alert in alerts if alert["type"] == "high_risk"]
+        assert len(high_risk) == min(alert_count, 5)
+        assert all(alert["patient_readable_id"].startswith("P-2025-") for alert in high_risk)
+
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_get_analysis_result_is_a_single_query(db, counter):
+    # Le module du service importe la pile ML (torch, cv2)
+    pytest.importorskip("torch")
+    pytest.importorskip("cv2")
+    from app.services.mammography_service_simple import MammographyService
+
+    user_row = add_user(db)
+    analysis = add_analyses(db, user_row, 1)[0]
+    # Sans __init__: le constructeur charge le modèle ML, inutile pour une lecture en base
+    service = MammographyService.__new__(MammographyService)
+    service.db = db
+
+    queries, result = counter.measure(db, service.get_analysis_result, analysis.analysis_id)
+
+    assert queries == 1
+    assert result["analysis_id"] == analysis.analysis_id
+    assert result["patient_id"].startswith("P-2025-")